@@ -1,9 +1,35 @@
 import os
 from app.services.controller.controller import MotorController
+from app.core.serialization import SnapshotCache
 
 # 1. Motor Controller Singleton
 # This must be shared across all request
-controller = MotorController()
+# Physics rate, publish rate and integrator are tunable per deployment; the
+# defaults are the original 10 Hz single-step Euler loop, e.g. AMT_PUBLISH_HZ=20
+# AMT_PHYSICS_HZ=1000 AMT_INTEGRATOR=rk4 opts into 1 kHz RK4 sub-stepping.
+# AMT_PHYSICS_MODE=process runs the physics in its own process, shared by
+# every uvicorn worker through shared memory (see ProcessMotorController).
+# AMT_MOTOR_PROFILE names a stored (e.g. calibrated) profile to start with.
+_physics_config = dict(
+    publish_dt=1.0 / float(os.environ.get("AMT_PUBLISH_HZ", "10")),
+    physics_dt=1.0 / float(os.environ["AMT_PHYSICS_HZ"]) if os.environ.get("AMT_PHYSICS_HZ") else None,
+    integrator=os.environ.get("AMT_INTEGRATOR", "euler")
+)
+if os.environ.get("AMT_MOTOR_PROFILE"):
+    from app.services.motor.profiles import profile_store
+    _physics_config["profile"] = profile_store.load(os.environ["AMT_MOTOR_PROFILE"])
+if os.environ.get("AMT_PHYSICS_MODE", "thread") == "process":
+    from app.services.controller.process_controller import ProcessMotorController
+    controller = ProcessMotorController(
+        shm_name=os.environ.get("AMT_PHYSICS_SHM", "amt_motor_state"),
+        port=int(os.environ.get("AMT_PHYSICS_PORT", "47800")),
+        **_physics_config
+    )
+else:
+    controller = MotorController(**_physics_config)
+
+# Latest status, encoded once per tick and shared by every poller
+status_cache = SnapshotCache(controller)
 
 # 2. Test Engine State
 class TestState:
@@ -22,12 +48,18 @@ test_state = TestState()
 # Assuming run from root: /AMT/TestConfigs
 # Adjust path if needed.
 # Since we run `python -m backend.main` from root, root is CWD.
+# Readers treat a missing directory as empty; nothing is created at import.
 TEST_DIR = os.path.join(os.getcwd(), "configs")
-if not os.path.exists(TEST_DIR):
-    os.makedirs(TEST_DIR)
+
+# 4. Job Queue Storage
+JOB_DB_PATH = os.environ.get("AMT_JOB_DB", os.path.join(os.getcwd(), "data", "jobs.db"))
+QUEUE_CONCURRENCY = int(os.environ.get("AMT_QUEUE_CONCURRENCY", "1"))
 
 def get_controller() -> MotorController:
     return controller
 
+def get_status_cache() -> SnapshotCache:
+    return status_cache
+
 def get_test_state() -> TestState:
     return test_state
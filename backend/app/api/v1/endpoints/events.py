@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from app.services.logger import logger
+from app.core.serialization import encoded_response
 
 router = APIRouter(
     prefix="/events",
@@ -7,6 +8,6 @@ router = APIRouter(
 )
 
 @router.get("")
-def get_events(limit: int = Query(50, ge=1, le=100)):
+def get_events(request: Request, limit: int = Query(50, ge=1, le=100)):
     """Get recent system events."""
-    return logger.get_logs(limit)
+    return encoded_response(request, logger.get_logs(limit))
@@ -1,5 +1,9 @@
-from fastapi import APIRouter, Depends
-from app.api.deps import get_controller
+from dataclasses import asdict
+from typing import Any, Dict, List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import BaseModel, Field
+from app.api.deps import get_controller, get_status_cache
+from app.core.serialization import SnapshotCache, encoded_response
 from app.services.controller.controller import MotorController
 
 router = APIRouter(
@@ -8,9 +12,9 @@ router = APIRouter(
 )
 
 @router.get("/status")
-def get_status(controller: MotorController = Depends(get_controller)):
-    """Get real-time motor telemetry."""
-    return controller.get_status()
+def get_status(request: Request, cache: SnapshotCache = Depends(get_status_cache)):
+    """Get real-time motor telemetry (JSON, or MessagePack via Accept)."""
+    return cache.response(request)
 
 @router.post("/start")
 def start_motor(controller: MotorController = Depends(get_controller)):
@@ -35,3 +39,153 @@ def set_load(nm: float, controller: MotorController = Depends(get_controller)):
     """Set mechanical load in Nm."""
     controller.set_load(nm)
     return {"target_load_nm": nm}
+
+
+class SetpointChange(BaseModel):
+    command: Literal["start", "stop", "speed", "load"]
+    value: float = 0.0
+    at_s: float = Field(0.0, ge=0, description="Seconds from now (0 = next tick)")
+    tick: Optional[int] = Field(None, description="Absolute tick; overrides at_s")
+
+class ScheduleRequest(BaseModel):
+    changes: List[SetpointChange]
+
+@router.post("/schedule")
+def schedule_setpoints(request: ScheduleRequest, controller: MotorController = Depends(get_controller)):
+    """Apply a batch of timestamped setpoint changes at exact physics ticks."""
+    try:
+        handle = controller.schedule([c.model_dump() for c in request.changes])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "scheduled": len(handle.entries),
+        "first_tick": handle.first_tick,
+        "last_tick": handle.last_tick,
+        "tick_period_s": controller.motor.dt
+    }
+
+@router.post("/profile/{target}")
+def start_profile(
+    target: Literal["speed", "load"],
+    spec: Dict[str, Any],
+    controller: MotorController = Depends(get_controller)
+):
+    """Drive speed or load from a waveform (ramp, step, sine, pwm, piecewise, csv)."""
+    try:
+        table = controller.build_profile(spec)
+        if target == "speed":
+            controller.set_speed_profile(table)
+        else:
+            controller.set_load_profile(table)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid profile: {e}")
+    return {"target": target, "type": spec.get("type"), "duration_s": table.duration_s, "samples": len(table.samples)}
+
+@router.delete("/profile/{target}")
+def clear_profile(target: Literal["speed", "load"], controller: MotorController = Depends(get_controller)):
+    """Stop a running profile; the setpoint holds its last value."""
+    controller.clear_profile(target)
+    return {"target": target, "status": "cleared"}
+
+@router.get("/operating-map")
+def get_operating_map(
+    request: Request,
+    speed_step: float = Query(100.0, gt=0),
+    speed_max: Optional[float] = Query(None, gt=0),
+    load_step: float = Query(0.5, gt=0),
+    load_max: float = Query(20.0, ge=0),
+    ambient: str = "15,25,35,45",
+    controller: MotorController = Depends(get_controller)
+):
+    """Steady-state speed/temperature, settling and overheat times over a target x load x ambient grid."""
+    from app.services.motor.operating_map import operating_maps
+
+    try:
+        ambients = [float(a) for a in ambient.split(",") if a.strip()]
+        operating_map = operating_maps.get(
+            controller.profile, speed_step=speed_step, speed_max=speed_max,
+            load_step=load_step, load_max=load_max, ambients=ambients
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded_response(request, operating_map.to_dict())
+
+
+class CalibrateRequest(BaseModel):
+    artifacts: List[str] = Field(default_factory=list, description="Telemetry artifact paths in the test-reports bucket")
+    traces: List[Dict[str, List[float]]] = Field(
+        default_factory=list,
+        description="Inline traces with t_s, speed_rpm, temperature_c, target_speed_rpm and load_nm columns"
+    )
+    ambient_temp_c: float = 25.0
+    name: Optional[str] = Field(None, description="Store the fitted profile under this name")
+    activate: bool = Field(False, description="Switch the running motor to the fitted profile")
+
+@router.post("/profiles/calibrate")
+def calibrate_profile(request: CalibrateRequest, controller: MotorController = Depends(get_controller)):
+    """Fit inertia, thermal resistance and the load/speed coefficients to recorded traces."""
+    from app.core.supabase import get_supabase
+    from app.services.motor.calibration import TRACE_COLUMNS, CalibrationError, calibrate
+    from app.services.motor.profiles import profile_store
+    from app.services.reporting.telemetry import open_artifact
+
+    traces = list(request.traces)
+    if request.artifacts:
+        client = get_supabase()
+        for path in request.artifacts:
+            try:
+                traces.append(open_artifact(client, path).read_arrays(columns=list(TRACE_COLUMNS)))
+            except Exception as e:
+                print(f"[API] Failed to read telemetry {path}: {e}")
+                raise HTTPException(status_code=404, detail=f"Telemetry artifact not usable: {path}")
+    if not traces:
+        raise HTTPException(status_code=400, detail="No traces given")
+
+    try:
+        result = calibrate(traces, controller.profile, ambient_temp_c=request.ambient_temp_c)
+    except CalibrationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    profile = result["profile"]
+    if request.name:
+        try:
+            profile_store.save(request.name, profile, {
+                "source": "calibration",
+                "artifacts": request.artifacts,
+                "fit": result["fit"]
+            })
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if request.activate:
+        controller.set_motor_profile(profile)
+    return {"name": request.name, "profile": asdict(profile), "fit": result["fit"], "active": request.activate}
+
+@router.get("/profiles")
+def list_profiles(controller: MotorController = Depends(get_controller)):
+    """Stored motor profiles, plus the one the motor is running."""
+    from app.services.motor.profiles import profile_store
+    return {"active": asdict(controller.profile), "profiles": profile_store.list()}
+
+@router.get("/profiles/{name}")
+def get_profile(name: str):
+    from app.services.motor.profiles import profile_store
+    try:
+        entry = profile_store.get(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return entry
+
+@router.post("/profiles/{name}/activate")
+def activate_profile(name: str, controller: MotorController = Depends(get_controller)):
+    """Switch the running motor to a stored profile."""
+    from app.services.motor.profiles import profile_store
+    try:
+        profile = profile_store.load(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    controller.set_motor_profile(profile)
+    return {"name": name, "profile": asdict(profile)}
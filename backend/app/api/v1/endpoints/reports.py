@@ -1,12 +1,18 @@
 import os
-from typing import List
-from fastapi import APIRouter, HTTPException, Response
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Response, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from app.services.reporting.generator import REPORT_DIR
+from app.services.reporting.telemetry import open_artifact
+from app.services.reporting.analytics import get_analytics
 from app.core.supabase import get_supabase
+from app.core.serialization import encoded_response
 import json
-from datetime import datetime
-from jinja2 import Template
-from weasyprint import HTML
+
+# PDF rendering (weasyprint, jinja2) and the comparison module (numpy) are
+# imported inside the endpoints that need them, so they don't slow down process startup.
 
 router = APIRouter(
     prefix="/reports",
@@ -31,7 +37,7 @@ def get_local_report(filename: str):
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail="Report not found")
         
-    with open(filepath, 'r') as f:
+    with open(filepath, 'rb') as f:
         content = f.read()
         
     return Response(content=content, media_type="application/json")
@@ -67,27 +73,188 @@ def list_reports_from_db():
         print(f"[API] Failed to fetch reports: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/analytics")
+def get_run_analytics(days: int = Query(30, ge=1, le=365), test_id: Optional[str] = None):
+    """Pass rates, duration percentiles, max temperature trends and failure reasons, by day."""
+    return get_analytics().query(days=days, test_key=test_id)
+
+class CompareBatchRequest(BaseModel):
+    base: str
+    candidates: List[str]
+    tolerances: Optional[Dict[str, float]] = None
+
+def _load_run(client, report_path: str, with_telemetry: bool = True):
+    """Report JSON plus the time/speed/temperature columns of its telemetry artifact."""
+    from app.services.reporting.compare import RunData, telemetry_arrays
+    data = client.storage.from_("test-reports").download(report_path)
+    report = json.loads(data.decode('utf-8'))
+    telemetry = None
+    artifact = report.get("artifacts", {}).get("telemetry")
+    if with_telemetry and artifact:
+        try:
+            reader = open_artifact(client, artifact["path"])
+            telemetry = telemetry_arrays(reader.read_arrays(columns=["t_s", "speed_rpm", "temperature_c"]))
+        except Exception as e:
+            print(f"[API] Telemetry unavailable for {report_path}: {e}")
+    return RunData(report_path, report, telemetry)
+
+def _compare_tolerances(speed_rms_tol: Optional[float], temp_rms_tol: Optional[float], duration_tol_s: Optional[float]) -> Dict[str, float]:
+    tolerances = {}
+    if speed_rms_tol is not None:
+        tolerances["speed_rpm_rms"] = speed_rms_tol
+    if temp_rms_tol is not None:
+        tolerances["temperature_c_rms"] = temp_rms_tol
+    if duration_tol_s is not None:
+        tolerances["duration_s"] = duration_tol_s
+    return tolerances
+
+@router.get("/compare")
+def compare_reports(
+    base: str,
+    candidate: str,
+    telemetry: bool = True,
+    speed_rms_tol: Optional[float] = Query(None, gt=0),
+    temp_rms_tol: Optional[float] = Query(None, gt=0),
+    duration_tol_s: Optional[float] = Query(None, gt=0)
+):
+    """Step-aligned comparison of a candidate run against a baseline run."""
+    from app.services.reporting.compare import compare_runs
+    client = get_supabase()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            base_run, candidate_run = pool.map(lambda path: _load_run(client, path, telemetry), (base, candidate))
+    except Exception as e:
+        print(f"[API] Failed to load reports for comparison: {e}")
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    return compare_runs(base_run, candidate_run, _compare_tolerances(speed_rms_tol, temp_rms_tol, duration_tol_s))
+
+@router.post("/compare/batch")
+def compare_reports_batch(request: CompareBatchRequest, telemetry: bool = True):
+    """Compare many candidate runs against one baseline (baseline is loaded once)."""
+    from app.services.reporting.compare import compare_runs
+    client = get_supabase()
+    try:
+        base_run = _load_run(client, request.base, telemetry)
+    except Exception as e:
+        print(f"[API] Failed to load baseline {request.base}: {e}")
+        raise HTTPException(status_code=404, detail="Baseline report not found")
+
+    def compare_one(path: str) -> Dict:
+        try:
+            return compare_runs(base_run, _load_run(client, path, telemetry), request.tolerances)
+        except Exception as e:
+            print(f"[API] Comparison failed for {path}: {e}")
+            return {"base": request.base, "candidate": path, "verdict": "ERROR", "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=min(8, max(1, len(request.candidates)))) as pool:
+        results = list(pool.map(compare_one, request.candidates))
+
+    return {
+        "base": request.base,
+        "total": len(results),
+        "regressions": sum(1 for r in results if r["verdict"] == "REGRESSION"),
+        "errors": sum(1 for r in results if r["verdict"] == "ERROR"),
+        "results": results
+    }
+
 @router.get("/download/{report_path}")
 def download_report(report_path: str):
     """Download a specific report JSON from Supabase Storage."""
     try:
         client = get_supabase()
         
-        # Download from storage
+        # Download from storage; the stored JSON is passed through as bytes
         data = client.storage.from_("test-reports").download(report_path)
         
-        # Convert bytes to string
-        content = data.decode('utf-8')
-        
-        return Response(content=content, media_type="application/json")
+        return Response(content=data, media_type="application/json")
     except Exception as e:
         print(f"[API] Failed to download report: {e}")
         raise HTTPException(status_code=404, detail="Report not found")
 
+@router.get("/telemetry/{artifact_path}")
+def read_telemetry(
+    request: Request,
+    artifact_path: str,
+    start: int = Query(0, ge=0),
+    stop: Optional[int] = Query(None, ge=0),
+    columns: Optional[str] = None
+):
+    """Read a row/column slice of a run's full-rate telemetry artifact."""
+    import zlib
+    import requests
+
+    try:
+        client = get_supabase()
+        reader = open_artifact(client, artifact_path)
+    except (ValueError, zlib.error) as e:
+        raise HTTPException(status_code=422, detail=f"Corrupt telemetry artifact: {e}")
+    except requests.RequestException as e:
+        raise HTTPException(status_code=502, detail=f"Telemetry storage unavailable: {e}")
+    except Exception as e:
+        print(f"[API] Failed to open telemetry: {e}")
+        raise HTTPException(status_code=404, detail="Telemetry artifact not found")
+
+    selected = columns.split(",") if columns else None
+    try:
+        data = reader.read(start, stop, selected)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (ValueError, zlib.error) as e:
+        raise HTTPException(status_code=422, detail=f"Corrupt telemetry artifact: {e}")
+    except requests.RequestException as e:
+        raise HTTPException(status_code=502, detail=f"Telemetry storage unavailable: {e}")
+
+    return encoded_response(request, {
+        "rows": reader.rows,
+        "start": start,
+        "stop": min(stop, reader.rows) if stop is not None else reader.rows,
+        "sample_period_s": reader.index.get("meta", {}).get("sample_period_s"),
+        "columns": data
+    })
+
+class BulkExportRequest(BaseModel):
+    report_paths: List[str] = Field(..., min_length=1)
+
+@router.post("/export/bulk")
+def export_reports_bulk(request: BulkExportRequest):
+    """
+    Render many reports to PDF and stream them back as a ZIP, entry by entry.
+    The export id is returned in the X-Export-Id header for progress queries.
+    """
+    from app.services.reporting.bulk_export import BulkExport, register_export
+
+    try:
+        client = get_supabase()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    export = register_export(BulkExport(request.report_paths))
+    return StreamingResponse(
+        export.stream(client),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=reports_{export.id}.zip",
+            "X-Export-Id": export.id
+        }
+    )
+
+@router.get("/export/bulk/{export_id}")
+def get_bulk_export_progress(export_id: str):
+    """Progress of a running (or recently finished) bulk export."""
+    from app.services.reporting.bulk_export import get_export
+
+    export = get_export(export_id)
+    if export is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return export.progress()
+
 @router.get("/export/{report_path}/pdf")
 def export_report_pdf(report_path: str):
     """Generate and download PDF report from JSON stored in Supabase."""
     try:
+        from app.services.reporting.pdf import render_report_pdf
+
         client = get_supabase()
         
         # 1. Download JSON from storage
@@ -95,23 +262,11 @@ def export_report_pdf(report_path: str):
         data = client.storage.from_("test-reports").download(report_path)
         report_json = json.loads(data.decode('utf-8'))
         
-        # 2. Load HTML template
-        template_path = os.path.join(os.path.dirname(__file__), "../../../../templates/report_template.html")
-        with open(template_path, 'r', encoding='utf-8') as f:
-            template_str = f.read()
-        
-        # 3. Render template with report data
-        template = Template(template_str)
-        html_content = template.render(
-            report=report_json,
-            generation_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        )
-        
-        # 4. Generate PDF
+        # 2. Render the report template and generate the PDF
         print(f"[PDF Export] Generating PDF...")
-        pdf_bytes = HTML(string=html_content).write_pdf()
+        pdf_bytes = render_report_pdf(report_json)
         
-        # 5. Return PDF as download
+        # 3. Return PDF as download
         filename = report_path.replace('.json', '.pdf')
         return Response(
             content=pdf_bytes,
@@ -123,4 +278,3 @@ def export_report_pdf(report_path: str):
     except Exception as e:
         print(f"[PDF Export] Failed: {e}")
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
-
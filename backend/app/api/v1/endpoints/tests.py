@@ -1,22 +1,28 @@
 import os
-import threading
 import time
-from typing import List
-from fastapi import APIRouter, Depends
-from app.api.deps import get_controller, get_test_state, TEST_DIR, TestState
+import yaml
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.api.deps import get_controller, get_test_state, TEST_DIR, TestState, JOB_DB_PATH, QUEUE_CONCURRENCY
 from app.services.controller.controller import MotorController
 from app.services.engine.test_engine import TestRunner
-from pydantic import BaseModel
+from app.services.engine.job_queue import JobQueue
+from app.services.engine.definition_cache import DefinitionCache
+from pydantic import BaseModel, Field
 from app.core.supabase import get_supabase
-import uuid
+from app.core.serialization import encoded_response
 
 router = APIRouter(
     prefix="/tests",
     tags=["Test Engine"]
 )
 
-def _run_test_thread(filename: str, controller: MotorController, state: TestState, db_test_id: str = None, test_name: str = None):
-    """Background worker to run the test."""
+def _run_test_thread(filename: str, controller: MotorController, state: TestState, db_test_id: str = None, test_name: str = None, register_runner=None, config: dict = None) -> Tuple[str, Optional[str]]:
+    """
+    Background worker to run the test. Returns the overall status and, if it
+    did not pass, the failure reason.
+    If `config` (an already parsed definition) is given, `filename` is only used as a label.
+    """
     state.running = True
     state.current_test = test_name or filename
     state.last_error = None
@@ -25,7 +31,11 @@ def _run_test_thread(filename: str, controller: MotorController, state: TestStat
     state.current_step_name = "Initializing..."
     
     runner = TestRunner(controller)
+    if register_runner:
+        register_runner(runner)
     filepath = os.path.join(TEST_DIR, filename)
+    status = "FAIL"
+    error = None
 
     def progress_callback(index, total, name):
         state.current_step_index = index + 1
@@ -34,17 +44,22 @@ def _run_test_thread(filename: str, controller: MotorController, state: TestStat
     
     try:
         print(f"[API] Starting Test: {filename}")
-        runner.run(filepath, db_test_id=db_test_id, progress_callback=progress_callback)
-        print(f"[API] Test {filename} Completed Successfully")
+        if config is not None:
+            status = runner.run_config(config, base_dir=TEST_DIR, db_test_id=db_test_id, progress_callback=progress_callback)
+        else:
+            status = runner.run(filepath, db_test_id=db_test_id, progress_callback=progress_callback)
+        error = runner.failure_reason
+        print(f"[API] Test {filename} Completed: {status}")
         state.current_step_index = state.total_steps # Ensure 100% at end
         state.last_completed = {
-            "status": "PASS",
+            "status": status,
             "test": test_name or filename,
             "time": time.time()
         }
     except Exception as e:
         print(f"[API] Test {filename} Failed: {e}")
-        state.last_error = str(e)
+        error = str(e)
+        state.last_error = error
         state.last_completed = {
             "status": "FAIL",
             "test": test_name or filename,
@@ -55,14 +70,54 @@ def _run_test_thread(filename: str, controller: MotorController, state: TestStat
         state.running = False
         state.current_test = None
         state.current_step_name = ""
-        
-        # Cleanup temp file
-        if filename.startswith("temp_") and os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-                print(f"[API] Cleaned up temp file: {filename}")
-            except Exception as e:
-                print(f"[API] Failed to cleanup temp file: {e}")
+
+    return status, error
+
+
+# Cloud definitions are cached locally (content-addressed, LRU, revalidated)
+definition_cache = DefinitionCache()
+
+def _execute_job(job: dict, register_runner) -> Tuple[str, Optional[str]]:
+    """Queue executor: runs one job on the shared controller."""
+    config = None
+    if job["source"] == "cloud":
+        config, digest = definition_cache.get(get_supabase(), job["storage_path"])
+        filename = job["storage_path"]
+        print(f"[API] Using definition {filename} (sha256 {digest[:12]})")
+    else:
+        filename = job["filename"]
+    return _run_test_thread(
+        filename, get_controller(), get_test_state(),
+        db_test_id=job.get("db_test_id"),
+        test_name=job.get("test_name") or filename,
+        register_runner=register_runner,
+        config=config
+    )
+
+
+# Tests are executed one after another (or up to AMT_QUEUE_CONCURRENCY at once)
+job_queue = JobQueue(JOB_DB_PATH, executor=_execute_job, concurrency=QUEUE_CONCURRENCY)
+
+def _queued_response(job: dict, test: str) -> dict:
+    return {
+        "status": "queued",
+        "test": test,
+        "job_id": job["id"],
+        "position": job["position"],
+        "eta_start_s": job.get("eta_start_s")
+    }
+
+
+def _load_local(filepath: str) -> dict:
+    """Parse a local definition; malformed YAML is the client's error (400)."""
+    try:
+        with open(filepath, 'r') as f:
+            config = yaml.safe_load(f) or {}
+    except yaml.YAMLError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid test definition: {e}")
+    if not isinstance(config, dict):
+        raise HTTPException(status_code=400, detail="Invalid test definition: expected a mapping")
+    return config
 
 
 @router.get("/")
@@ -74,78 +129,109 @@ def list_tests() -> List[str]:
     return files
 
 @router.post("/run/{filename}")
-def run_test(
-    filename: str, 
-    controller: MotorController = Depends(get_controller),
-    state: TestState = Depends(get_test_state)
-):
-    """Trigger a test execution in the background."""
-    if state.running:
-        return {"status": "error", "message": f"Test '{state.current_test}' is already running"}
-    
+def run_test(filename: str, priority: int = 0):
+    """Queue a local test for execution."""
     filepath = os.path.join(TEST_DIR, filename)
     if not os.path.exists(filepath):
         return {"status": "error", "message": "File not found"}
 
-    # Start background thread
-    t = threading.Thread(
-        target=_run_test_thread, 
-        args=(filename, controller, state), 
-        daemon=True
-    )
-    t.start()
-    
-    return {"status": "started", "test": filename}
+    # Malformed files are rejected now. Whether the sequence can pass is
+    # predicted when the run starts (TestRunner.run_config), from the state it
+    # actually starts in, the same as for /execute and /queue jobs.
+    _load_local(filepath)
+
+    job = job_queue.submit([{"source": "local", "filename": filename, "priority": priority}])[0]
+    return _queued_response(job, filename)
+
+@router.get("/predict/{filename}")
+def predict_test(filename: str, controller: MotorController = Depends(get_controller)):
+    """Predict, from the motor model, whether each monitor step of a local test can pass."""
+    filepath = os.path.join(TEST_DIR, filename)
+    if not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail="File not found")
+    config = _load_local(filepath)
+    try:
+        return TestRunner(controller).predict(config)
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise HTTPException(status_code=422, detail=f"Cannot predict sequence: {e}")
 
 @router.get("/active")
-def get_active_test(state: TestState = Depends(get_test_state)):
+def get_active_test(request: Request, state: TestState = Depends(get_test_state)):
     """Check if a test is currently running."""
-    return {
+    return encoded_response(request, {
         "running": state.running,
         "test": state.current_test,
         "last_error": state.last_error,
         "current_step": state.current_step_index,
         "total_steps": state.total_steps,
         "step_name": state.current_step_name,
-        "last_completed": state.last_completed
-    }
+        "last_completed": state.last_completed,
+        "queue": job_queue.summary()
+    })
 
 class TestExecutionRequest(BaseModel):
     test_id: str
     storage_path: str
     test_name: str = "Unknown Test"
+    priority: int = 0
 
 @router.post("/execute")
-def execute_test(
-    request: TestExecutionRequest,
-    controller: MotorController = Depends(get_controller),
-    state: TestState = Depends(get_test_state)
-):
-    """Trigger a cloud-hosted test execution."""
-    if state.running:
-        return {"status": "error", "message": f"Test '{state.current_test}' is already running"}
-    
-    # Download file from Supabase
-    try:
-        supabase = get_supabase()
-        temp_filename = f"temp_{uuid.uuid4().hex}.yaml"
-        local_path = os.path.join(TEST_DIR, temp_filename)
-        
-        print(f"[API] Downloading test {request.storage_path} to {local_path}")
-        with open(local_path, 'wb') as f:
-            res = supabase.storage.from_("test-files").download(request.storage_path)
-            f.write(res)
-            
-    except Exception as e:
-        print(f"[API] Failed to download test: {e}")
-        return {"status": "error", "message": f"Failed to download test: {str(e)}"}
-
-    # Start background thread
-    t = threading.Thread(
-        target=_run_test_thread, 
-        args=(temp_filename, controller, state, request.test_id, request.test_name), 
-        daemon=True
-    )
-    t.start()
-    
-    return {"status": "started", "test": request.storage_path, "local_temp": temp_filename}
+def execute_test(request: TestExecutionRequest):
+    """Queue a cloud-hosted test for execution."""
+    job = job_queue.submit([{
+        "source": "cloud",
+        "storage_path": request.storage_path,
+        "db_test_id": request.test_id,
+        "test_name": request.test_name,
+        "priority": request.priority
+    }])[0]
+    return _queued_response(job, request.storage_path)
+
+class QueueItem(BaseModel):
+    filename: Optional[str] = Field(None, description="Local file in configs/")
+    storage_path: Optional[str] = Field(None, description="Path in the test-files bucket")
+    test_id: Optional[str] = None
+    test_name: Optional[str] = None
+    priority: int = 0
+
+class QueueRequest(BaseModel):
+    jobs: List[QueueItem]
+
+@router.post("/queue")
+def submit_jobs(request: QueueRequest):
+    """Queue a batch of tests (local files and/or cloud definitions)."""
+    jobs = []
+    for item in request.jobs:
+        if bool(item.filename) == bool(item.storage_path):
+            raise HTTPException(status_code=400, detail="Each job needs exactly one of 'filename' or 'storage_path'")
+        if item.filename and not os.path.exists(os.path.join(TEST_DIR, item.filename)):
+            raise HTTPException(status_code=404, detail=f"File not found: {item.filename}")
+        jobs.append({
+            "source": "local" if item.filename else "cloud",
+            "filename": item.filename,
+            "storage_path": item.storage_path,
+            "db_test_id": item.test_id,
+            "test_name": item.test_name,
+            "priority": item.priority
+        })
+    return {"status": "queued", "jobs": job_queue.submit(jobs)}
+
+@router.get("/queue")
+def list_jobs(include_finished: bool = False, limit: int = 100):
+    """Running and queued jobs with position and ETA (plus recent history)."""
+    return job_queue.list(include_finished=include_finished, limit=limit)
+
+@router.get("/queue/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.delete("/queue/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued job, or abort a running one after its current step."""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,375 @@
+"""
+End-to-end load harness: concurrent dashboards and test clients against an
+in-process server.
+
+    python -m app.core.loadtest [--clients 1,10,50,100,200] [--duration 10]
+                                [--submit-every 10] [--slo-ms 250] [--json out.json]
+
+Run from the backend directory. The app is started under uvicorn on a local
+port in this process, with Supabase replaced by the in-memory stand-in
+(AMT_SUPABASE=local) and a scratch working directory for the job DB, reports
+and caches (the local `configs/` is copied in). One stage runs per client
+count:
+
+* each dashboard polls like the frontend does: /motor/status every 0.5 s,
+  /events?limit=20 every 2 s and /tests/active every 1 s. Polls are
+  open-loop (fired on schedule whether or not the previous one returned),
+  so a slow server shows up as latency instead of as less load;
+* one test client submits a short sequence through POST /tests/run every
+  `--submit-every` seconds, keeping the physics loop and test engine busy.
+
+Per stage it reports request latency percentiles per endpoint alongside the
+physics loop's tick jitter (deviation of each tick interval from the publish
+period) measured over the same window, and marks the stage saturated when
+p99 latency exceeds the SLO, requests fail, or ticks start running late.
+Load generator and server share one interpreter (and GIL); `generator_lag`
+shows when the generator itself falls behind. With AMT_PHYSICS_MODE=process
+ticks are observed through the controller's mirror thread.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Dashboard polling, as in frontend/app/page.tsx and contexts/test-status-context.tsx
+DASHBOARD_POLLS = (
+    ("/motor/status", 0.5),
+    ("/events?limit=20", 2.0),
+    ("/tests/active", 1.0),
+)
+RUN_ENDPOINT = "/tests/run"
+
+LOAD_TEST_NAME = "loadtest_run.yaml"
+LOAD_TEST_YAML = """\
+test_info:
+  name: "Load Test Run"
+  description: "Short sequence submitted by app.core.loadtest"
+  author: "loadtest"
+  version: "1.0"
+
+global_settings:
+  sample_rate_hz: 20
+  max_test_time_s: 60
+
+sequence:
+  - step: start_motor
+  - step: set_speed
+    rpm: 1500
+  - step: wait
+    duration_s: 2
+  - step: apply_load
+    load_nm: 3.0
+  - step: monitor
+    duration_s: 3
+    criteria:
+      speed_rpm:
+        min: 0
+        max: 5000
+      temperature_c:
+        max: 140
+  - step: remove_load
+  - step: stop_motor
+"""
+
+
+def _percentiles(values: List[float], points=(50, 90, 99)) -> Dict[str, Optional[float]]:
+    """Nearest-rank percentiles plus max, in the input's unit."""
+    if not values:
+        return {**{f"p{p}": None for p in points}, "max": None}
+    ordered = sorted(values)
+    out = {f"p{p}": ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] for p in points}
+    out["max"] = ordered[-1]
+    return out
+
+
+def _ms(stats: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+    return {k: (round(v * 1000, 2) if v is not None else None) for k, v in stats.items()}
+
+
+class TickProbe:
+    """Tick listener timestamping every physics update."""
+    def __init__(self, controller):
+        self.controller = controller
+        self.dt = controller.motor.dt
+        self._stamps: List[float] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, tick, motor):
+        now = time.monotonic()
+        with self._lock:
+            self._stamps.append(now)
+
+    def attach(self):
+        self.controller.add_tick_listener(self)
+
+    def detach(self):
+        self.controller.remove_tick_listener(self)
+
+    def window(self, start: float, end: float) -> Dict:
+        # Swapped under the lock: the physics listener appends concurrently
+        with self._lock:
+            pending, self._stamps = self._stamps, []
+        stamps = [s for s in pending if start <= s <= end]
+        later = [s for s in pending if s > end]
+        if later:
+            with self._lock:
+                self._stamps[:0] = later
+        intervals = [b - a for a, b in zip(stamps, stamps[1:])]
+        jitter = [abs(i - self.dt) for i in intervals]
+        elapsed = end - start
+        return {
+            "expected": int(elapsed / self.dt),
+            "observed": len(stamps),
+            "rate_hz": round(len(stamps) / elapsed, 2) if elapsed > 0 else None,
+            "jitter_ms": _ms(_percentiles(jitter)),
+            "late": sum(1 for i in intervals if i > 1.5 * self.dt),
+        }
+
+
+class Stage:
+    """One load level: `clients` dashboards plus the test client for `duration` seconds."""
+    def __init__(self, base_url: str, clients: int, duration: float, warmup: float,
+                 submit_every: float, test_name: str, timeout: float = 10.0):
+        self.base_url = base_url
+        self.clients = clients
+        self.duration = duration
+        self.warmup = warmup
+        self.submit_every = submit_every
+        self.test_name = test_name
+        self.timeout = timeout
+        # (endpoint, scheduled_at, latency_s or None, ok, lag_s)
+        self.samples: List[tuple] = []
+        self._inflight = set()
+
+    async def _request(self, http, method: str, path: str, label: str, scheduled: float, measured: bool):
+        sent = time.monotonic()
+        ok = False
+        latency = None
+        try:
+            response = await http.request(method, path)
+            latency = time.monotonic() - sent
+            ok = response.status_code < 400
+            if ok and method == "POST":
+                # /tests/run reports problems in the body
+                ok = response.json().get("status") != "error"
+        except Exception:
+            latency = time.monotonic() - sent
+        if measured:
+            self.samples.append((label, scheduled, latency, ok, sent - scheduled))
+
+    async def _poll(self, http, method: str, path: str, period: float, label: str,
+                    start: float, measure_from: float, stop_at: float, phase: float):
+        scheduled = start + phase
+        while scheduled < stop_at:
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(self._request(http, method, path, label, scheduled, scheduled >= measure_from))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+            scheduled += period
+
+    async def run(self, probe: TickProbe) -> Dict:
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.clients * len(DASHBOARD_POLLS) + 8, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.timeout) as http:
+            start = time.monotonic()
+            measure_from = start + self.warmup
+            stop_at = measure_from + self.duration
+            pollers = []
+            for _ in range(self.clients):
+                for path, period in DASHBOARD_POLLS:
+                    pollers.append(self._poll(http, "GET", path, period, path.split("?")[0],
+                                              start, measure_from, stop_at, random.uniform(0, period)))
+            pollers.append(self._poll(http, "POST", f"{RUN_ENDPOINT}/{self.test_name}", self.submit_every,
+                                      RUN_ENDPOINT, start, measure_from, stop_at, 0.0))
+            await asyncio.gather(*pollers)
+            # Pollers return once their last request is scheduled; let the window close
+            await asyncio.sleep(max(0.0, stop_at - time.monotonic()))
+            ticks = probe.window(measure_from, stop_at)
+            if self._inflight:
+                await asyncio.wait(set(self._inflight), timeout=self.timeout)
+        return self._summarize(ticks)
+
+    def _summarize(self, ticks: Dict) -> Dict:
+        offered = self.clients * sum(1.0 / period for _, period in DASHBOARD_POLLS)
+        endpoints = {}
+        for label in sorted({s[0] for s in self.samples}):
+            rows = [s for s in self.samples if s[0] == label]
+            endpoints[label] = {
+                "requests": len(rows),
+                "errors": sum(1 for s in rows if not s[3]),
+                **_ms(_percentiles([s[2] for s in rows if s[3]]))
+            }
+        polls = [s for s in self.samples if s[0] != RUN_ENDPOINT]
+        completed = [s for s in polls if s[3]]
+        errors = len(polls) - len(completed)
+        latency = _ms(_percentiles([s[2] for s in completed]))
+        return {
+            "clients": self.clients,
+            "duration_s": self.duration,
+            "offered_rps": round(offered, 1),
+            "achieved_rps": round(len(completed) / self.duration, 1),
+            "requests": len(polls),
+            "errors": errors,
+            "latency_ms": latency,
+            "endpoints": endpoints,
+            "generator_lag_ms": _ms(_percentiles([s[4] for s in self.samples])),
+            "ticks": ticks,
+        }
+
+
+def _saturation(result: Dict, slo_ms: float, dt: float) -> List[str]:
+    reasons = []
+    p99 = result["latency_ms"]["p99"]
+    if p99 is not None and p99 > slo_ms:
+        reasons.append(f"p99 {p99:.0f} ms > {slo_ms:.0f} ms")
+    if result["requests"] and result["errors"] / result["requests"] > 0.01:
+        reasons.append(f"{result['errors']} errors")
+    lag = result["generator_lag_ms"]["p99"]
+    if lag is not None and lag > slo_ms:
+        # Same process: the generator being starved is part of the same saturation
+        reasons.append(f"generator lag p99 {lag:.0f} ms")
+    jitter = result["ticks"]["jitter_ms"]["p99"]
+    if result["ticks"]["late"] or (jitter is not None and jitter > dt * 1000 / 2):
+        reasons.append(f"tick jitter p99 {jitter} ms, {result['ticks']['late']} late ticks")
+    return reasons
+
+
+def _print_stage(result: Dict, out):
+    lat, ticks = result["latency_ms"], result["ticks"]
+    fmt = lambda v: "-" if v is None else f"{v:.1f}"
+    print(f"{result['clients']:>7} {result['offered_rps']:>8} {result['achieved_rps']:>8} "
+          f"{fmt(lat['p50']):>7} {fmt(lat['p90']):>7} {fmt(lat['p99']):>7} {fmt(lat['max']):>8} {result['errors']:>5} "
+          f"{fmt(ticks['rate_hz']):>7} {fmt(ticks['jitter_ms']['p99']):>9} {ticks['late']:>5}  "
+          f"{'SATURATED: ' + '; '.join(result['saturated']) if result['saturated'] else 'ok'}", file=out, flush=True)
+
+
+def _prepare_workdir() -> str:
+    """Scratch cwd for the app (reports, job DB, caches), with the local configs copied in."""
+    workdir = tempfile.mkdtemp(prefix="amt-loadtest-")
+    configs = os.path.join(os.getcwd(), "configs")
+    if os.path.isdir(configs):
+        shutil.copytree(configs, os.path.join(workdir, "configs"))
+    else:
+        os.makedirs(os.path.join(workdir, "configs"))
+    with open(os.path.join(workdir, "configs", LOAD_TEST_NAME), 'w') as f:
+        f.write(LOAD_TEST_YAML)
+    return workdir
+
+
+def _start_server(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if not thread.is_alive() or time.time() > deadline:
+            raise RuntimeError("Server failed to start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def run(clients: List[int], duration: float = 10.0, warmup: float = 1.0, submit_every: float = 10.0,
+        slo_ms: float = 250.0, port: int = 8765, test_name: str = LOAD_TEST_NAME,
+        stop_at_saturation: bool = False, keep_workdir: bool = False, verbose: bool = False) -> Dict:
+    """Run one stage per client count and return the results (see module docstring)."""
+    os.environ["AMT_SUPABASE"] = "local"
+    cwd = os.getcwd()
+    workdir = _prepare_workdir()
+    os.chdir(workdir)
+    out = sys.stdout
+    log = lambda *args: print(*args, file=out, flush=True)
+    log(f"[LoadTest] Working directory: {workdir}{' (kept)' if keep_workdir else ''}")
+    if not verbose:
+        # The app logs every request and test step; keep the table readable
+        sys.stdout = open(os.devnull, 'w')
+    server = None
+    try:
+        from app.main import app
+        from app.api.deps import controller
+
+        server, thread = _start_server(app, port)
+        probe = TickProbe(controller)
+        probe.attach()
+        base_url = f"http://127.0.0.1:{port}"
+        results = []
+        log(f"[LoadTest] Serving on {base_url}; {len(clients)} stage(s) of {duration:.0f} s, SLO p99 {slo_ms:.0f} ms")
+        log(f"{'clients':>7} {'offered':>8} {'req/s':>8} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} {'max ms':>8} "
+              f"{'err':>5} {'tick Hz':>7} {'jitter99':>9} {'late':>5}")
+        for count in clients:
+            stage = Stage(base_url, count, duration, warmup, submit_every, test_name)
+            result = asyncio.run(stage.run(probe))
+            result["saturated"] = _saturation(result, slo_ms, probe.dt)
+            results.append(result)
+            _print_stage(result, out)
+            if result["saturated"] and stop_at_saturation:
+                break
+        probe.detach()
+
+        healthy = [r["clients"] for r in results if not r["saturated"]]
+        saturated = [r["clients"] for r in results if r["saturated"]]
+        summary = {
+            "slo_ms": slo_ms,
+            "tick_period_s": probe.dt,
+            "max_healthy_clients": max(healthy) if healthy else None,
+            "saturation_clients": min(saturated) if saturated else None,
+            "stages": results,
+        }
+        if saturated:
+            log(f"[LoadTest] Saturated at {summary['saturation_clients']} clients "
+                  f"(last healthy: {summary['max_healthy_clients']})")
+        else:
+            log(f"[LoadTest] No saturation up to {max(clients)} clients")
+        return summary
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=10)
+        if sys.stdout is not out:
+            sys.stdout.close()
+            sys.stdout = out
+        os.chdir(cwd)
+        if not keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.core.loadtest", description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--clients", default="1,10,50,100,200", help="Comma-separated dashboard counts, one stage each")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per stage")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds at the start of each stage")
+    parser.add_argument("--submit-every", type=float, default=10.0, help="Seconds between POST /tests/run submissions")
+    parser.add_argument("--test", default=LOAD_TEST_NAME, help="Test file in configs/ to submit")
+    parser.add_argument("--slo-ms", type=float, default=250.0, help="p99 latency above which a stage counts as saturated")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stop-at-saturation", action="store_true")
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own log output")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    summary = run(
+        clients=[int(c) for c in args.clients.split(",") if c.strip()],
+        duration=args.duration, warmup=args.warmup, submit_every=args.submit_every,
+        slo_ms=args.slo_ms, port=args.port, test_name=args.test,
+        stop_at_saturation=args.stop_at_saturation, keep_workdir=args.keep_workdir, verbose=args.verbose
+    )
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
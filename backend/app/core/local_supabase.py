@@ -0,0 +1,173 @@
+"""
+In-memory stand-in for the Supabase client, selected with AMT_SUPABASE=local.
+
+Covers the subset of the client the backend uses: storage buckets
+(upload/download/list; signed URLs raise SignedUrlsUnsupported, so telemetry
+falls back to full downloads) and tables (insert plus select with eq/order/limit). Data lives
+for the life of the process. Meant for load tests and offline development,
+not as a database.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+
+class SignedUrlsUnsupported(Exception):
+    """The storage backend cannot hand out signed URLs (local mode)."""
+
+
+class _Result:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, table: "_Table"):
+        self._table = table
+        self._rows: Optional[List[Dict[str, Any]]] = None
+        self._filters = []
+        self._order = None
+        self._limit = None
+
+    def select(self, *columns, **kwargs) -> "_Query":
+        # Embedded relations ("*, other(col)") are not resolved
+        return self
+
+    def insert(self, rows) -> "_Query":
+        self._rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def eq(self, column: str, value) -> "_Query":
+        self._filters.append((column, value))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "_Query":
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count: int) -> "_Query":
+        self._limit = count
+        return self
+
+    def execute(self) -> _Result:
+        if self._rows is not None:
+            return _Result(self._table.insert(self._rows))
+        rows = self._table.rows()
+        for column, value in self._filters:
+            rows = [r for r in rows if r.get(column) == value]
+        if self._order:
+            column, desc = self._order
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return _Result(rows)
+
+
+class _Table:
+    def __init__(self):
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc).isoformat()
+        stored = [{"id": str(uuid.uuid4()), "created_at": now, **row} for row in rows]
+        with self._lock:
+            self._rows.extend(stored)
+        return [dict(r) for r in stored]
+
+    def rows(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self._rows]
+
+
+class _Bucket:
+    def __init__(self, name: str):
+        self.name = name
+        self._objects: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def upload(self, path: str, file, file_options: Optional[Dict] = None):
+        content = file if isinstance(file, bytes) else bytes(file)
+        with self._lock:
+            self._objects[path] = {
+                "content": content,
+                "eTag": hashlib.md5(content).hexdigest(),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+        return {"path": path}
+
+    def download(self, path: str) -> bytes:
+        with self._lock:
+            obj = self._objects.get(path)
+        if obj is None:
+            raise FileNotFoundError(f"{self.name}/{path} not found")
+        return obj["content"]
+
+    def list(self, folder: str = "", options: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        prefix = f"{folder}/" if folder else ""
+        search = (options or {}).get("search", "")
+        with self._lock:
+            items = list(self._objects.items())
+        out = []
+        for path, obj in items:
+            if not path.startswith(prefix):
+                continue
+            name = path[len(prefix):]
+            if "/" in name or search not in name:
+                continue
+            out.append({
+                "name": name,
+                "updated_at": obj["updated_at"],
+                "metadata": {"eTag": obj["eTag"], "size": len(obj["content"])}
+            })
+        return out
+
+    def remove(self, paths: List[str]):
+        with self._lock:
+            for path in paths:
+                self._objects.pop(path, None)
+
+    def create_signed_url(self, path: str, expires_in: int):
+        raise SignedUrlsUnsupported("Signed URLs are not available in local mode")
+
+
+class _Storage:
+    def __init__(self):
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def from_(self, bucket: str) -> _Bucket:
+        with self._lock:
+            if bucket not in self._buckets:
+                self._buckets[bucket] = _Bucket(bucket)
+            return self._buckets[bucket]
+
+
+class LocalSupabaseClient:
+    def __init__(self):
+        self.storage = _Storage()
+        self._tables: Dict[str, _Table] = {}
+        self._lock = threading.Lock()
+        self.created_at = time.time()
+
+    def table(self, name: str) -> _Query:
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = _Table()
+            return _Query(self._tables[name])
+
+
+_client: Optional[LocalSupabaseClient] = None
+_client_lock = threading.Lock()
+
+def get_local_client() -> LocalSupabaseClient:
+    """The process-wide local client (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LocalSupabaseClient()
+    return _client
@@ -0,0 +1,125 @@
+"""
+Response encoding for the high-rate polling endpoints.
+
+Codecs are picked per request from the Accept header: MessagePack when the
+client asks for it (and `msgpack` is installed), otherwise JSON encoded with
+`orjson` when available. Responses are built as raw bytes, bypassing
+FastAPI's validation/jsonable_encoder pass.
+
+`SnapshotCache` keeps the encoded motor snapshot of the latest controller
+tick, so any number of pollers within one tick share a single
+snapshot + encode.
+"""
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional codec
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _encode_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode('utf-8')
+
+
+def _encode_msgpack(obj: Any) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+CODECS: Dict[str, Callable[[Any], bytes]] = {JSON: _encode_json}
+if msgpack is not None:
+    CODECS[MSGPACK] = _encode_msgpack
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Media type to respond with for an Accept header (JSON unless MessagePack is preferred)."""
+    if not accept or msgpack is None:
+        return JSON
+    best, best_q = JSON, 0.0
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in _MSGPACK_ALIASES:
+            media = MSGPACK
+        elif media in (JSON, "application/*", "*/*"):
+            media = JSON
+        else:
+            continue
+        # Ties go to JSON, the default representation
+        if q > best_q or (q == best_q and media == JSON):
+            best, best_q = media, q
+    return best
+
+
+def encode(obj: Any, media_type: str = JSON) -> bytes:
+    return CODECS[media_type](obj)
+
+
+def encoded_response(request: Request, obj: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encode `obj` with the codec the client asked for."""
+    media_type = negotiate(request.headers.get("accept"))
+    return Response(content=encode(obj, media_type), media_type=media_type,
+                    headers={"Vary": "Accept", **(headers or {})})
+
+
+class SnapshotCache:
+    """
+    Encoded `controller.get_status()` for the current tick, per media type.
+
+    The first reader after a tick takes the snapshot and encodes it; every
+    other reader in that tick gets the same bytes.
+    """
+    def __init__(self, controller):
+        self.controller = controller
+        self._lock = threading.Lock()
+        # (tick, snapshot, {media_type: bytes}), swapped as a whole
+        self._entry = None
+
+    def get(self, media_type: str = JSON) -> Tuple[int, bytes]:
+        tick = self.controller.tick
+        entry = self._entry
+        if entry is not None and entry[0] == tick:
+            cached = entry[2].get(media_type)
+            if cached is not None:
+                return tick, cached
+
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != tick:
+                # Tick and status from the same read (the tick may have moved on since)
+                entry = (*self.controller.get_tick_status(), {})
+                self._entry = entry
+            cached = entry[2].get(media_type)
+            if cached is None:
+                cached = encode(entry[1], media_type)
+                entry[2][media_type] = cached
+            return entry[0], cached
+
+    def response(self, request: Request) -> Response:
+        media_type = negotiate(request.headers.get("accept"))
+        tick, content = self.get(media_type)
+        return Response(content=content, media_type=media_type,
+                        headers={"Vary": "Accept", "X-Tick": str(tick)})
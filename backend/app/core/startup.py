@@ -0,0 +1,100 @@
+"""
+Startup-time accounting for the API process.
+
+`startup_report.phase(name)` times a block of the startup path (module
+imports in app.main, controller start, ...). The breakdown is logged once
+the app is ready, checked against AMT_STARTUP_BUDGET_MS and served at
+GET /startup.
+
+For a per-module breakdown of the import graph, run:
+
+    python -m app.core.startup [--top N]
+
+which imports app.main in a fresh interpreter under `-X importtime` and
+exits non-zero when the cold import exceeds the budget.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+STARTUP_BUDGET_MS = float(os.environ.get("AMT_STARTUP_BUDGET_MS", "1000"))
+
+
+class StartupReport:
+    def __init__(self, budget_ms: float = STARTUP_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.t0 = time.perf_counter()
+        self.phases: List[Dict] = []
+        self.ready_ms = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"phase": name, "ms": round((time.perf_counter() - start) * 1000, 1)})
+
+    def ready(self) -> Dict:
+        """Mark the app as ready to serve and log the breakdown."""
+        self.ready_ms = round((time.perf_counter() - self.t0) * 1000, 1)
+        report = self.as_dict()
+        status = "within" if report["within_budget"] else "OVER"
+        print(f"[Startup] Ready in {self.ready_ms} ms ({status} budget of {self.budget_ms:.0f} ms)")
+        for phase in self.phases:
+            print(f"[Startup]   {phase['ms']:>8.1f} ms  {phase['phase']}")
+        return report
+
+    def as_dict(self) -> Dict:
+        return {
+            "ready_ms": self.ready_ms,
+            "budget_ms": self.budget_ms,
+            "within_budget": self.ready_ms is not None and self.ready_ms <= self.budget_ms,
+            "phases": self.phases
+        }
+
+
+startup_report = StartupReport()
+
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def measure_imports(module: str = "app.main") -> List[Dict]:
+    """Import `module` in a fresh interpreter and return per-module import times."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.getcwd()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            entries.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": len(match.group(3)) // 2
+            })
+    return entries
+
+
+def main(argv: List[str]) -> int:
+    top = int(argv[argv.index("--top") + 1]) if "--top" in argv else 20
+    entries = measure_imports()
+    total = next((e["cumulative_ms"] for e in entries if e["module"] == "app.main"), 0.0)
+
+    print(f"Cold import of app.main: {total:.1f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)")
+    print(f"{'cumulative':>11} {'self':>9}  module")
+    for entry in sorted(entries, key=lambda e: -e["cumulative_ms"])[:top]:
+        print(f"{entry['cumulative_ms']:>9.1f}ms {entry['self_ms']:>7.1f}ms  {'  ' * entry['depth']}{entry['module']}")
+    return 0 if total <= STARTUP_BUDGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
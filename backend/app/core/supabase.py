@@ -1,14 +1,24 @@
 import os
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 SUPABASE_URL = os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
 # Prefer Service Key for backend operations to bypass RLS
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY") or os.environ.get("SUPABASE_ANON_KEY")
+# "local" swaps in an in-memory stand-in (load tests, offline development)
+SUPABASE_MODE = os.environ.get("AMT_SUPABASE", "remote")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
+if SUPABASE_MODE != "local" and (not SUPABASE_URL or not SUPABASE_KEY):
     print("[WARNING] Supabase credentials missing in backend environment")
 
-def get_supabase() -> Client:
+def get_supabase() -> "Client":
+    if SUPABASE_MODE == "local":
+        from app.core.local_supabase import get_local_client
+        return get_local_client()
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError("Supabase credentials not configured")
+    # The client library is heavy; load it on first use, not at startup
+    from supabase import create_client
     return create_client(SUPABASE_URL, SUPABASE_KEY)
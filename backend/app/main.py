@@ -1,15 +1,31 @@
-from fastapi import FastAPI
+import threading
+from app.core.startup import startup_report
+
+with startup_report.phase("import fastapi"):
+    from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from app.api.deps import controller
-from app.api.v1.endpoints import motor, tests, reports, events
+with startup_report.phase("import app.api.deps (controller)"):
+    from app.api.deps import controller
+with startup_report.phase("import reporting"):
+    from app.services.reporting.generator import recover_partial_reports
+with startup_report.phase("import routers"):
+    from app.api.v1.endpoints import motor, tests, reports, events
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("[System] Starting Motor Controller Loop...")
-    controller.start_background_loop()
+    with startup_report.phase("start controller loop"):
+        controller.start_background_loop()
+    # Rebuild reports interrupted by a previous crash (uploads may be slow)
+    threading.Thread(target=recover_partial_reports, daemon=True).start()
+    with startup_report.phase("start job queue"):
+        tests.job_queue.start()
+    startup_report.ready()
     yield
     # Shutdown
+    tests.job_queue.stop()
+    tests.definition_cache.flush()
     print("[System] Stopping Motor Controller Loop...")
     controller.stop_background_loop()
 
@@ -38,3 +54,8 @@ app.include_router(events.router)
 @app.get("/")
 def home():
     return {"system": "Motor Test Bench", "status": "ONLINE", "version": "1.0.0"}
+
+@app.get("/startup")
+def startup():
+    """Startup-time breakdown of this process, against AMT_STARTUP_BUDGET_MS."""
+    return startup_report.as_dict()
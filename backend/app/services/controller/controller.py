@@ -1,27 +1,129 @@
+import heapq
+import itertools
 import threading
 import time
 import sys
 import os
+from typing import Dict, List, Optional
 
 
 from app.services.motor.motor_simulator import MotorSimulator, MotorProfile
+from app.services.motor.waveforms import WaveformTable, build_waveform
 
 from app.services.logger import logger
 
+COMMANDS = ("start", "stop", "speed", "load")
+
+
+def resolve_schedule(changes: List[Dict], current_tick: int, dt: float) -> List[tuple]:
+    """
+    Turn setpoint changes into (tick, command, value) entries.
+    Each change has "command", optional "value", and either an absolute "tick"
+    or "at_s" seconds from now (0 = the next tick).
+    """
+    entries = []
+    for change in changes:
+        command = change["command"]
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown command: {command}")
+        if change.get("tick") is not None:
+            tick = int(change["tick"])
+            if tick <= current_tick:
+                raise ValueError(f"Tick {tick} is in the past (current tick {current_tick})")
+        else:
+            tick = current_tick + 1 + round(float(change.get("at_s", 0.0)) / dt)
+        entries.append((tick, command, float(change.get("value", 0.0))))
+    return entries
+
+
+class ScheduleHandle:
+    """
+    Tracks a batch of scheduled setpoint changes until all are applied.
+    `first_tick`/`last_tick` are the target ticks; `applied_first_tick`/
+    `applied_last_tick` are the ticks the changes actually landed on, and
+    `late` counts changes that reached the physics loop after their target.
+    """
+    def __init__(self, entries: List[tuple]):
+        self.entries = entries
+        self.remaining = len(entries)
+        self.first_tick = min((e[0] for e in entries), default=None)
+        self.last_tick = max((e[0] for e in entries), default=None)
+        self.applied_first_tick = None
+        self.applied_last_tick = None
+        self.late = 0
+        # Identifies the batch across processes (ProcessMotorController)
+        self.batch_id = None
+        self.done = threading.Event()
+        if not entries:
+            self.done.set()
+
+    def _applied(self, tick: int, target_tick: int):
+        if self.applied_first_tick is None or tick < self.applied_first_tick:
+            self.applied_first_tick = tick
+        if self.applied_last_tick is None or tick > self.applied_last_tick:
+            self.applied_last_tick = tick
+        if tick > target_tick:
+            self.late += 1
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.done.set()
+
+    def _complete(self, applied_first_tick: int, applied_last_tick: int, late: int):
+        """Completion reported by the physics process."""
+        self.applied_first_tick = applied_first_tick
+        self.applied_last_tick = applied_last_tick
+        self.late = late
+        self.remaining = 0
+        self.done.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until every change in the batch has been applied."""
+        return self.done.wait(timeout)
+
+
+def _model_state(motor, stopping: bool) -> dict:
+    return {
+        "speed_rpm": motor.state.speed_rpm,
+        "temperature_c": motor.state.temperature_c,
+        "running": motor.state.running,
+        "stopping": stopping,
+        "target_speed_rpm": motor.inputs.target_speed_rpm,
+        "load_nm": motor.inputs.load_nm,
+        "ambient_temp_c": motor.inputs.ambient_temp_c,
+    }
+
+
+def default_profile() -> MotorProfile:
+    """The bench motor's profile."""
+    return MotorProfile(
+        rated_speed_rpm=3000,
+        max_temp_c=150,  # Increased to prevent overheat
+        inertia=10.0,
+        thermal_resistance=10.0  # Decreased to improve cooling
+    )
+
+
 class MotorController:
     """
     A simple controller that manages the MotorSimulator in a background thread.
     Use this to start/stop the motor and get its status.
     """
-    def __init__(self):
+    def __init__(self, publish_dt: float = 0.1, physics_dt: Optional[float] = None, integrator: str = "euler",
+                 profile: MotorProfile = None):
+        """
+        publish_dt: period of the control loop / published snapshots (10 Hz default).
+        physics_dt: integration step inside each publish period (default: one step per tick).
+        integrator: "euler" (default), "rk4" or "adaptive" (see MotorSimulator).
+        profile: motor parameters (default_profile() if not given).
+        """
         # 1. Setup the Motor Physics
-        self.profile = MotorProfile(
-            rated_speed_rpm=3000,
-            max_temp_c=150,  # Increased to prevent overheat
-            inertia=10.0,
-            thermal_resistance=10.0  # Decreased to improve cooling
+        self.profile = profile or default_profile()
+        self.motor = MotorSimulator(
+            self.profile,
+            update_dt=publish_dt,
+            physics_dt=physics_dt,
+            integrator=integrator
         )
-        self.motor = MotorSimulator(self.profile, update_dt=0.1)
         
         # 2. Threading Control
         self.running = False
@@ -32,6 +134,19 @@ class MotorController:
         # Soft Stop Control
         self.stopping = False
 
+        # Tick Listeners (called under the lock after every physics update)
+        self.tick = 0
+        self._tick_listeners = []
+        # Notified after every tick, for threads that block on physics progress
+        self.tick_condition = threading.Condition()
+
+        # Setpoint Schedule: heap of (tick, seq, command, value, handle)
+        self._schedule = []
+        self._schedule_seq = itertools.count()
+        # Called under the lock at the start of every tick, before scheduled
+        # setpoints (the physics process drains its command socket here)
+        self._before_tick = None
+
     def start_background_loop(self):
         """Starts the background thread that simulates physics."""
         if self.running:
@@ -47,15 +162,21 @@ class MotorController:
         """Stops the background physics thread."""
         self.running = False
         self.stop_event.set()
+        with self.tick_condition:
+            self.tick_condition.notify_all()
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=1.0)
         print("[Controller] Background physics loop stopped.")
 
     def _loop(self):
-        """The actual loop running at 10Hz (0.1s)."""
+        """The control loop, one physics update per publish period."""
+        next_tick = time.monotonic()
         while not self.stop_event.is_set():
             # Lock the physics engine while updating
             with self.lock:
+                if self._before_tick:
+                    self._before_tick()
+
                 # Soft Stop Logic
                 if self.stopping:
                     self.motor.set_target_speed(0)
@@ -64,38 +185,155 @@ class MotorController:
                         self.stopping = False
                         print("[Controller] Soft stop complete. Motor OFF.")
 
+                # Scheduled setpoints land exactly on their tick
+                next_tick_index = self.tick + 1
+                while self._schedule and self._schedule[0][0] <= next_tick_index:
+                    target_tick, _, command, value, handle = heapq.heappop(self._schedule)
+                    self._apply(command, value)
+                    if handle:
+                        handle._applied(next_tick_index, target_tick)
+
                 self.motor.update()
+                self.tick += 1
+                for listener in self._tick_listeners:
+                    listener(self.tick, self.motor)
+
+            with self.tick_condition:
+                self.tick_condition.notify_all()
             
-            # TODO: Here we will later add 'Test Sequence' logic
-            
-            # Sleep to maintain roughly 10Hz
-            time.sleep(self.motor.dt)
+            # Sleep until the next tick deadline (no drift from work time)
+            next_tick += self.motor.dt
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            elif delay < -self.motor.dt:
+                # Fell behind (e.g. process stalled): resync instead of bursting
+                next_tick = time.monotonic()
 
     # --- Public API ---
 
-    def start_motor(self):
+    def add_tick_listener(self, listener):
+        """Register listener(tick, motor), called after every physics update."""
+        with self.lock:
+            self._tick_listeners = self._tick_listeners + [listener]
+
+    def remove_tick_listener(self, listener):
         with self.lock:
+            self._tick_listeners = [l for l in self._tick_listeners if l is not listener]
+
+    def wait_for_tick(self, after_tick: int, timeout: float = None) -> int:
+        """
+        Block until the loop has completed a tick later than `after_tick`.
+        Returns the current tick, which is still <= after_tick on timeout or shutdown.
+        """
+        with self.tick_condition:
+            self.tick_condition.wait_for(lambda: self.tick > after_tick or self.stop_event.is_set(), timeout)
+        return self.tick
+
+    def _apply(self, command: str, value=0.0) -> bool:
+        """Apply a control command to the motor. Caller must hold the lock.
+        Returns False if the command was ignored."""
+        if command == "start":
             self.stopping = False
             self.motor.start()
+        elif command == "stop":
+            self.stopping = True
+            self.motor.set_target_speed(0)
+        elif command == "speed":
+            if self.stopping:
+                return False
+            self.motor.set_target_speed(value)
+        elif command == "load":
+            self.motor.set_load(value)
+        elif command == "speed_profile":
+            if self.stopping and value is not None:
+                return False
+            self.motor.set_speed_profile(value)
+        elif command == "load_profile":
+            self.motor.set_load_profile(value)
+        else:
+            raise ValueError(f"Unknown command: {command}")
+        return True
+
+    def _push_schedule(self, entries: List[tuple], handle: ScheduleHandle = None):
+        """Queue resolved entries. Caller must hold the lock."""
+        for tick, command, value in entries:
+            heapq.heappush(self._schedule, (tick, next(self._schedule_seq), command, value, handle))
+
+    def schedule(self, changes: List[Dict]) -> ScheduleHandle:
+        """
+        Queue a batch of setpoint changes to be applied inside the physics
+        loop at exact ticks (see resolve_schedule for the change format).
+        """
+        with self.lock:
+            entries = resolve_schedule(changes, self.tick, self.motor.dt)
+            handle = ScheduleHandle(entries)
+            self._push_schedule(entries, handle)
+        if entries:
+            logger.info(f"Scheduled {len(entries)} setpoint change(s) for ticks {handle.first_tick}-{handle.last_tick}")
+        return handle
+
+    def start_motor(self):
+        with self.lock:
+            self._apply("start")
             logger.success("Motor started")
 
     def stop_motor(self):
         with self.lock:
-            self.stopping = True
-            self.motor.set_target_speed(0)
+            self._apply("stop")
             logger.warning("Motor stopping (Soft Stop initiated)")
 
     def set_speed(self, rpm: float):
         with self.lock:
-            if not self.stopping:
-                self.motor.set_target_speed(rpm)
+            if self._apply("speed", rpm):
                 logger.info(f"Target speed set to {rpm} RPM")
 
     def set_load(self, nm: float):
         with self.lock:
-            self.motor.set_load(nm)
+            self._apply("load", nm)
             logger.info(f"Load set to {nm} Nm")
 
+    def build_profile(self, spec, base_dir: str = None) -> WaveformTable:
+        """Precompute a profile spec into a table sampled at the tick rate."""
+        return build_waveform(spec, self.motor.dt, base_dir=base_dir)
+
+    def set_speed_profile(self, profile):
+        """Drive target speed from a profile (spec dict or prebuilt WaveformTable)."""
+        table = profile if isinstance(profile, WaveformTable) else self.build_profile(profile)
+        with self.lock:
+            if self._apply("speed_profile", table):
+                logger.info(f"Speed profile '{table.spec.get('type')}' started ({table.duration_s:.1f}s)")
+
+    def set_load_profile(self, profile):
+        """Drive load from a profile (spec dict or prebuilt WaveformTable)."""
+        table = profile if isinstance(profile, WaveformTable) else self.build_profile(profile)
+        with self.lock:
+            self._apply("load_profile", table)
+            logger.info(f"Load profile '{table.spec.get('type')}' started ({table.duration_s:.1f}s)")
+
+    def clear_profile(self, target: str):
+        """Stop a running profile; the setpoint holds its current value."""
+        with self.lock:
+            self._apply(f"{target}_profile", None)
+            logger.info(f"{target.capitalize()} profile cleared")
+
+    def set_motor_profile(self, profile: MotorProfile):
+        """Swap the motor's parameters (e.g. a calibrated profile); state carries over."""
+        with self.lock:
+            self.profile = profile
+            self.motor.profile = profile
+        logger.info(f"Motor profile updated (inertia {profile.inertia:.3g}, thermal resistance {profile.thermal_resistance:.3g})")
+
     def get_status(self):
         with self.lock:
             return self.motor.snapshot()
+
+    def get_tick_status(self):
+        """(tick, get_status()) taken together, so the status belongs to that tick."""
+        with self.lock:
+            return self.tick, self.motor.snapshot()
+
+    def get_model_state(self) -> dict:
+        """Unrounded state and setpoints, the starting point for model predictions."""
+        with self.lock:
+            return _model_state(self.motor, self.stopping)
@@ -0,0 +1,726 @@
+import collections
+import json
+import os
+import secrets
+import socket
+import struct
+import threading
+import time
+import multiprocessing
+from dataclasses import asdict
+from multiprocessing import shared_memory, resource_tracker
+from typing import Optional
+
+from app.services.controller.controller import MotorController, ScheduleHandle, _model_state, default_profile, resolve_schedule
+from app.services.motor.waveforms import WaveformTable, build_waveform
+from app.services.motor.motor_simulator import MotorInputs, MotorProfile, MotorState
+from app.services.motor.profiles import profile_from_dict
+from app.services.logger import logger
+
+# Shared state block, guarded by a sequence lock (seq is odd while writing):
+#   seq, tick, heartbeat, dt,
+#   speed, torque, temperature, target speed, load, ambient,
+#   running, stopping, fault, command token
+SEQ_FMT = "<Q"
+BODY_FMT = "<Qdd6dBB16s8s"
+SEQ_SIZE = struct.calcsize(SEQ_FMT)
+# followed by a ring of recently completed schedule batches (same sequence lock):
+#   count, then per slot: batch id, first applied tick, last applied tick, late changes
+RING_OFFSET = SEQ_SIZE + struct.calcsize(BODY_FMT)
+RING_COUNT_FMT = "<Q"
+RING_SLOT_FMT = "<4Q"
+RING_SLOTS = 256
+RING_SLOTS_OFFSET = RING_OFFSET + struct.calcsize(RING_COUNT_FMT)
+# and a ring of per-tick records, slot = tick % TICK_SLOTS, so readers that
+# poll slower than the tick rate can replay the ticks they missed:
+#   tick, speed, torque, temperature, target speed, load, ambient, running, stopping, fault
+TICKS_OFFSET = RING_SLOTS_OFFSET + RING_SLOTS * struct.calcsize(RING_SLOT_FMT)
+TICK_FMT = "<Q6dBB16s"
+TICK_SIZE = struct.calcsize(TICK_FMT)
+TICK_SLOTS = 256
+BLOCK_SIZE = TICKS_OFFSET + TICK_SLOTS * TICK_SIZE
+
+# How long a command may wait for the physics process's acknowledgement
+COMMAND_TIMEOUT_S = 10.0
+
+# An owner that has not ticked for this long is considered dead
+STALE_AFTER_S = 5.0
+
+# Per-run secret in the shared block (mode 0600); commands without it are ignored
+TOKEN_SIZE = 8
+
+
+class SharedStateBlock:
+    """Single-writer / many-reader view over the shared-memory state block."""
+
+    def __init__(self, buf):
+        self.buf = buf
+
+    def _pack(self, *body, applied=()):
+        seq = struct.unpack_from(SEQ_FMT, self.buf, 0)[0]
+        struct.pack_into(SEQ_FMT, self.buf, 0, seq + 1)
+        struct.pack_into(BODY_FMT, self.buf, SEQ_SIZE, *body)
+        if body[0]:
+            record = body[:1] + body[3:12]
+            struct.pack_into(TICK_FMT, self.buf, TICKS_OFFSET + (body[0] % TICK_SLOTS) * TICK_SIZE, *record)
+        if applied:
+            count = struct.unpack_from(RING_COUNT_FMT, self.buf, RING_OFFSET)[0]
+            for record in applied:
+                slot = RING_SLOTS_OFFSET + (count % RING_SLOTS) * struct.calcsize(RING_SLOT_FMT)
+                struct.pack_into(RING_SLOT_FMT, self.buf, slot, *record)
+                count += 1
+            struct.pack_into(RING_COUNT_FMT, self.buf, RING_OFFSET, count)
+        struct.pack_into(SEQ_FMT, self.buf, 0, seq + 2)
+
+    def write(self, tick: int, motor, stopping: bool, token: bytes, applied=()):
+        """Publish a tick; `applied` holds (batch id, first tick, last tick, late) for batches completed on it."""
+        self._pack(
+            tick, time.time(), motor.dt,
+            motor.state.speed_rpm, motor.state.torque_nm, motor.state.temperature_c,
+            motor.inputs.target_speed_rpm, motor.inputs.load_nm, motor.inputs.ambient_temp_c,
+            motor.state.running, stopping, (motor.fault or "").encode('utf-8')[:16], token,
+            applied=applied
+        )
+
+    def claim(self, token: bytes):
+        """
+        Reset the block for a new physics process: tick 0 (until its first
+        tick lands), a fresh heartbeat so attachers don't mistake the starting
+        owner for a dead one, and the new command token.
+        """
+        self._pack(0, time.time(), 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, False, False, b"", token)
+
+    def close(self):
+        """Mark the block dead (heartbeat 0) so attached readers notice straight away."""
+        body = list(self.read())
+        body[1] = 0.0
+        self._pack(*body)
+
+    def read(self) -> tuple:
+        """Consistent copy of the body; retries while the writer is mid-update."""
+        while True:
+            seq1 = struct.unpack_from(SEQ_FMT, self.buf, 0)[0]
+            if seq1 & 1:
+                time.sleep(0)
+                continue
+            body = struct.unpack_from(BODY_FMT, self.buf, SEQ_SIZE)
+            if struct.unpack_from(SEQ_FMT, self.buf, 0)[0] == seq1:
+                return body
+
+    def read_applied(self) -> dict:
+        """{batch id: (first applied tick, last applied tick, late changes)} for recently completed batches."""
+        fmt = f"<{4 * RING_SLOTS}Q"
+        while True:
+            seq1 = struct.unpack_from(SEQ_FMT, self.buf, 0)[0]
+            if seq1 & 1:
+                time.sleep(0)
+                continue
+            slots = struct.unpack_from(fmt, self.buf, RING_SLOTS_OFFSET)
+            if struct.unpack_from(SEQ_FMT, self.buf, 0)[0] == seq1:
+                break
+        return {slots[i]: slots[i + 1:i + 4] for i in range(0, len(slots), 4) if slots[i]}
+
+    def read_ticks(self, after: int, upto: int) -> list:
+        """Per-tick records for ticks after `after` up to `upto`, oldest first (only those still in the ring)."""
+        while True:
+            seq1 = struct.unpack_from(SEQ_FMT, self.buf, 0)[0]
+            if seq1 & 1:
+                time.sleep(0)
+                continue
+            raw = bytes(self.buf[TICKS_OFFSET:TICKS_OFFSET + TICK_SLOTS * TICK_SIZE])
+            if struct.unpack_from(SEQ_FMT, self.buf, 0)[0] == seq1:
+                break
+        records = []
+        for tick in range(max(after + 1, upto - TICK_SLOTS + 1), upto + 1):
+            record = struct.unpack_from(TICK_FMT, raw, (tick % TICK_SLOTS) * TICK_SIZE)
+            if record[0] == tick:
+                records.append(record)
+        return records
+
+
+class SharedMotorView:
+    """Read-only stand-in for MotorSimulator, populated from the shared block."""
+
+    def __init__(self):
+        self.state = MotorState()
+        self.inputs = MotorInputs()
+        self.dt = 0.0
+        self.fault: Optional[str] = None
+        self.stopping = False
+        self.tick = 0
+        self.heartbeat = 0.0
+        self.token = b""
+
+    def load(self, body: tuple):
+        (self.tick, self.heartbeat, self.dt,
+         self.state.speed_rpm, self.state.torque_nm, self.state.temperature_c,
+         self.inputs.target_speed_rpm, self.inputs.load_nm, self.inputs.ambient_temp_c,
+         running, stopping, fault, self.token) = body
+        self.state.running = bool(running)
+        self.stopping = bool(stopping)
+        self.fault = fault.rstrip(b"\x00").decode('utf-8') or None
+
+    def load_tick(self, record: tuple):
+        """Populate from a per-tick ring record (dt and token are left as they are)."""
+        (self.tick,
+         self.state.speed_rpm, self.state.torque_nm, self.state.temperature_c,
+         self.inputs.target_speed_rpm, self.inputs.load_nm, self.inputs.ambient_temp_c,
+         running, stopping, fault) = record
+        self.state.running = bool(running)
+        self.stopping = bool(stopping)
+        self.fault = fault.rstrip(b"\x00").decode('utf-8') or None
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.heartbeat > STALE_AFTER_S
+
+    def snapshot(self) -> dict:
+        return {
+            "speed_rpm": round(self.state.speed_rpm, 2),
+            "torque_nm": round(self.state.torque_nm, 2),
+            "temperature_c": round(self.state.temperature_c, 2),
+            "running": self.state.running,
+            "fault": self.fault,
+        }
+
+
+class _BatchTracker:
+    """Physics-side counterpart of a ScheduleHandle: collects the ticks its changes land on."""
+
+    def __init__(self, batch_id: int, total: int, completed: list):
+        self.batch_id = batch_id
+        self.remaining = total
+        self.first = self.last = None
+        self.late = 0
+        self._completed = completed
+
+    def _applied(self, tick: int, target_tick: int):
+        self.first = tick if self.first is None else min(self.first, tick)
+        self.last = tick if self.last is None else max(self.last, tick)
+        if tick > target_tick:
+            self.late += 1
+        self.remaining -= 1
+        if self.remaining == 0:
+            self._completed.append((self.batch_id, self.first, self.last, self.late))
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    # Only the owner may unlink the block; stop the tracker doing it on exit
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _physics_main(shm_name: str, port: int, token: str, publish_dt: float, physics_dt: float, integrator: str,
+                  profile: dict = None):
+    """Entry point of the physics process. `token` (hex) must accompany every command."""
+    token_bytes = bytes.fromhex(token)
+    # Shares the owner's resource tracker, so a plain attach is enough
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = SharedStateBlock(shm.buf)
+
+    # Commands arrive over TCP (one JSON line each, acknowledged once queued);
+    # connection threads never share a lock with the physics loop
+    server = socket.create_server(("127.0.0.1", port))
+
+    controller = MotorController(publish_dt=publish_dt, physics_dt=physics_dt, integrator=integrator,
+                                 profile=profile_from_dict(profile) if profile else None)
+
+    # Commands accepted by the connection threads, applied by the loop before the next tick
+    inbox = collections.deque()
+    # Ids of recently accepted commands, so a client's retry is not applied twice
+    seen_ids = collections.deque(maxlen=1024)
+    accept_lock = threading.Lock()
+
+    # Schedule batches still being applied, and those completed since the last publish
+    batches = {}
+    completed = []
+
+    def accept(command: dict):
+        """Validate and preprocess a command off the tick (tables are built here), then queue it."""
+        if not secrets.compare_digest(str(command.get("token", "")), token):
+            print("[Physics] Ignoring command without a valid token")
+            raise PermissionError("invalid command token")
+        name = command["cmd"]
+        with accept_lock:
+            if command.get("id") in seen_ids:
+                return
+            if name == "shutdown":
+                controller.stop_event.set()
+            elif name == "schedule":
+                entries = [(int(tick), str(cmd), float(value)) for tick, cmd, value in command["entries"]]
+                inbox.append(("schedule", (command["batch"], entries)))
+            elif name == "motor_model":
+                inbox.append((name, profile_from_dict(command["spec"])))
+            elif name in ("speed_profile", "load_profile"):
+                spec = command.get("spec")
+                inbox.append((name, build_waveform(spec, publish_dt) if spec else None))
+            elif name in ("start", "stop", "speed", "load"):
+                inbox.append((name, float(command.get("value", 0.0))))
+            else:
+                raise ValueError(f"Unknown command: {name}")
+            seen_ids.append(command.get("id"))
+
+    def serve(conn):
+        with conn, conn.makefile("rb") as lines:
+            for line in lines:
+                try:
+                    accept(json.loads(line))
+                    reply = {"ok": True}
+                except Exception as e:
+                    reply = {"ok": False, "error": str(e)}
+                try:
+                    conn.sendall(json.dumps(reply).encode('utf-8') + b"\n")
+                except OSError:
+                    return
+
+    def accept_loop():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=serve, args=(conn,), daemon=True).start()
+
+    def drain_commands():
+        # Called under the controller lock before each tick, so a command that
+        # arrived during the sleep is applied (or scheduled) on the very next tick
+        while inbox:
+            name, value = inbox.popleft()
+            try:
+                if name == "schedule":
+                    batch_id, entries = value
+                    batch = batches[batch_id] = _BatchTracker(batch_id, len(entries), completed)
+                    controller._push_schedule(entries, batch)
+                elif name == "motor_model":
+                    # Already under the controller lock
+                    controller.profile = controller.motor.profile = value
+                else:
+                    controller._apply(name, value)
+            except Exception as e:
+                print(f"[Physics] Failed to apply '{name}': {e}")
+
+    def on_tick(tick, motor):
+        # Called under the controller lock, right after the physics update
+        block.write(tick, motor, controller.stopping, token_bytes, completed)
+        for record in completed:
+            batches.pop(record[0], None)
+        completed.clear()
+
+    controller._before_tick = drain_commands
+    controller.add_tick_listener(on_tick)
+    threading.Thread(target=accept_loop, daemon=True).start()
+    print(f"[Physics] Process {os.getpid()} running (shm={shm_name}, port={port})")
+    try:
+        controller._loop()
+    finally:
+        server.close()
+        shm.close()
+        print("[Physics] Process stopped.")
+
+
+class ProcessMotorController:
+    """
+    Drop-in replacement for MotorController that runs the physics loop in a
+    dedicated process, so it never competes for this process's GIL.
+
+    State is published through a named shared-memory block (sequence-locked,
+    readers never block the writer); commands go over a local TCP connection
+    to the physics process, carrying the per-run token from the block, and
+    each is acknowledged once queued (so a lost command raises instead of
+    vanishing). Any
+    process of the same user that knows the block name and port can attach,
+    so several uvicorn workers share one motor. The first worker to start
+    creates the block and spawns the physics process; if the physics process
+    stops publishing (its owner stopped or crashed), the next worker to read
+    the block takes over and restarts it.
+    """
+    def __init__(
+        self,
+        publish_dt: float = 0.1,
+        physics_dt: Optional[float] = None,
+        integrator: str = "euler",
+        shm_name: str = "amt_motor_state",
+        port: int = 47800,
+        profile: MotorProfile = None,
+    ):
+        self.publish_dt = publish_dt
+        self.physics_dt = physics_dt
+        self.integrator = integrator
+        self.shm_name = shm_name
+        self.port = port
+
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.block: Optional[SharedStateBlock] = None
+        self.process = None
+        self.owner = False
+        self.running = False
+        self.motor = SharedMotorView()
+        self.motor.dt = publish_dt
+        # Same profile the physics process runs (used for model-based predictions)
+        self.profile = profile or default_profile()
+
+        # Persistent command connection, one request/acknowledgement at a time
+        self._conn: Optional[socket.socket] = None
+        self._conn_file = None
+        self._conn_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self._recover_lock = threading.Lock()
+        # Mappings of replaced blocks; kept open since readers may still hold them
+        self._retired = []
+
+        # Tick listeners are fed by a mirror thread polling the shared block;
+        # (listener, tick it was added on), so it only sees later ticks
+        self._tick_listeners = []
+        self._mirror_thread = None
+        self._mirror_stop = threading.Event()
+        self.tick_condition = threading.Condition()
+        self._tick_waiters = 0
+
+        # Schedule handles completed by the mirror thread once the physics process reports them applied
+        self._pending_schedules = []
+
+    # --- Lifecycle ---
+
+    def start_background_loop(self):
+        """Attach to a live physics process, or create one."""
+        if self.running:
+            return
+        self._connect()
+        self.running = True
+        self._mirror_stop.clear()
+        self._mirror_thread = threading.Thread(target=self._mirror_loop, daemon=True)
+        self._mirror_thread.start()
+
+    def _connect(self):
+        """Attach to the shared block, creating it or taking it over (and starting physics) if needed."""
+        created = False
+        try:
+            shm = shared_memory.SharedMemory(name=self.shm_name, create=True, size=BLOCK_SIZE)
+            created = owner = True
+        except FileExistsError:
+            shm = _attach(self.shm_name)
+            view = SharedMotorView()
+            view.load(SharedStateBlock(shm.buf).read())
+            owner = view.stale
+            if owner:
+                # Owner died without cleaning up: take over the block
+                print("[Controller] Stale physics block found, restarting physics process.")
+
+        self.shm = shm
+        self.block = SharedStateBlock(shm.buf)
+        self.owner = owner
+        if not owner:
+            print(f"[Controller] Attached to running physics process (shm={self.shm_name}).")
+            return
+        try:
+            self._spawn_physics()
+        except Exception:
+            if created:
+                shm.close()
+                shm.unlink()
+                self.shm = self.block = None
+            raise
+
+    def _spawn_physics(self):
+        token = secrets.token_bytes(TOKEN_SIZE)
+        self.block.claim(token)
+        ctx = multiprocessing.get_context("spawn")
+        self.process = ctx.Process(
+            target=_physics_main,
+            args=(self.shm_name, self.port, token.hex(), self.publish_dt, self.physics_dt, self.integrator,
+                  asdict(self.profile)),
+            daemon=True
+        )
+        self.process.start()
+
+        # Commands sent before the server is listening would be refused: wait for the first tick
+        deadline = time.time() + STALE_AFTER_S
+        view = self._read_block()
+        while time.time() < deadline and self.process.is_alive():
+            if view.tick > 0 and view.token == token:
+                print(f"[Controller] Physics process started (pid {self.process.pid}).")
+                return
+            time.sleep(0.01)
+            view = self._read_block()
+
+        if view.tick > 0 and view.token != token and not view.stale:
+            # Another worker's takeover won the port; use its physics process
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+            self.owner = False
+            print(f"[Controller] Attached to physics process restarted by another worker (shm={self.shm_name}).")
+            return
+
+        exitcode = self.process.exitcode
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+        raise RuntimeError(
+            f"Physics process failed to start (exit code {exitcode}); "
+            f"check that TCP port {self.port} is free"
+        )
+
+    def _recover(self) -> SharedMotorView:
+        """The physics process stopped publishing: take over the block (or attach to whoever did)."""
+        with self._recover_lock:
+            view = self._read_block()
+            if not view.stale:
+                # Another thread got there first
+                return view
+            print("[Controller] Physics process stopped publishing; taking over.")
+            if self.owner:
+                if self.process and self.process.is_alive():
+                    self.process.terminate()
+                try:
+                    self.shm.unlink()
+                except FileNotFoundError:
+                    pass
+            self._retired.append(self.shm)
+            self._connect()
+            return self._read_block()
+
+    def stop_background_loop(self):
+        """Detach; the owner also shuts down the physics process."""
+        if not self.running:
+            return
+        self.running = False
+        self._mirror_stop.set()
+        with self.tick_condition:
+            self.tick_condition.notify_all()
+        if self._mirror_thread and self._mirror_thread.is_alive():
+            self._mirror_thread.join(timeout=1.0)
+
+        if self.owner and self.process:
+            try:
+                self._send("shutdown")
+            except (RuntimeError, ValueError) as e:
+                print(f"[Controller] Shutdown command failed: {e}")
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            # Workers still attached see a dead block and take over
+            self.block.close()
+            self.shm.close()
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+            print("[Controller] Physics process stopped.")
+        elif self.shm:
+            self.shm.close()
+            print("[Controller] Detached from physics process.")
+        with self._conn_lock:
+            self._close_conn()
+        self.shm = None
+        self.block = None
+
+    def _mirror_loop(self):
+        """
+        Dispatch tick listeners in this process for every tick. The mirror
+        polls a few times per tick; ticks that landed between polls are
+        replayed from the per-tick ring, so listeners still see each one.
+        """
+        last_tick = -1
+        poll = self.publish_dt / 4
+        replay = SharedMotorView()
+        while not self._mirror_stop.wait(poll):
+            if self.block is None:
+                continue
+            if not self._tick_listeners and not self._pending_schedules and not self._tick_waiters:
+                # Nobody to replay to
+                last_tick = -1
+                continue
+            try:
+                self._read()
+            except Exception as e:
+                print(f"[Controller] Physics unavailable: {e}")
+                continue
+            with self.lock:
+                self.motor.load(self.block.read())
+                tick = self.motor.tick
+                if tick == last_tick:
+                    continue
+                if tick < last_tick:
+                    # Physics process restarted (takeover): its ticks start again from 1
+                    last_tick = -1
+                    self._tick_listeners = [(listener, -1) for listener, _ in self._tick_listeners]
+                if self._pending_schedules:
+                    # Completed with the ticks the physics loop actually applied them on
+                    applied = self.block.read_applied()
+                    for handle in self._pending_schedules:
+                        if handle.batch_id in applied:
+                            handle._complete(*applied[handle.batch_id])
+                    self._pending_schedules = [h for h in self._pending_schedules if not h.done.is_set()]
+                if self._tick_listeners:
+                    missed = self.block.read_ticks(last_tick, tick - 1) if last_tick >= 0 else []
+                    if last_tick >= 0 and tick - last_tick - 1 > len(missed):
+                        print(f"[Controller] Mirror fell behind; {tick - last_tick - 1 - len(missed)} tick(s) lost")
+                    replay.dt, replay.token = self.motor.dt, self.motor.token
+                    for record in missed:
+                        replay.load_tick(record)
+                        self._dispatch(replay)
+                    self._dispatch(self.motor)
+                last_tick = tick
+            with self.tick_condition:
+                self.tick_condition.notify_all()
+
+    def _dispatch(self, view: SharedMotorView):
+        for listener, since in self._tick_listeners:
+            if view.tick > since:
+                listener(view.tick, view)
+
+    def _send(self, command: str, value: float = 0.0, **extra):
+        """
+        Send a command and wait for the physics process to acknowledge it.
+        A dropped connection (e.g. after a takeover) is reopened and the
+        command retried once under the same id, so it is never applied twice.
+        Raises RuntimeError if it is not acknowledged, ValueError if rejected.
+        """
+        message = {"cmd": command, "value": value, "id": secrets.randbits(63), **extra}
+        error = None
+        with self._conn_lock:
+            for _ in range(2):
+                message["token"] = self._read().token.hex()
+                try:
+                    if self._conn is None:
+                        self._conn = socket.create_connection(("127.0.0.1", self.port), timeout=COMMAND_TIMEOUT_S)
+                        self._conn_file = self._conn.makefile("rb")
+                    self._conn.sendall(json.dumps(message).encode('utf-8') + b"\n")
+                    line = self._conn_file.readline()
+                    if not line:
+                        raise ConnectionError("connection closed by the physics process")
+                    reply = json.loads(line)
+                    break
+                except OSError as e:
+                    error = e
+                    self._close_conn()
+            else:
+                raise RuntimeError(f"Physics process did not acknowledge '{command}': {error}")
+        if not reply.get("ok"):
+            raise ValueError(f"Physics process rejected '{command}': {reply.get('error')}")
+
+    def _close_conn(self):
+        """Drop the command connection. Caller must hold _conn_lock."""
+        if self._conn is not None:
+            self._conn_file.close()
+            self._conn.close()
+        self._conn = self._conn_file = None
+
+    def _read_block(self) -> SharedMotorView:
+        view = SharedMotorView()
+        if self.block is not None:
+            view.load(self.block.read())
+        return view
+
+    def _read(self) -> SharedMotorView:
+        """Current state; a block whose physics has stopped publishing is taken over first."""
+        view = self._read_block()
+        if self.running and self.block is not None and view.stale:
+            view = self._recover()
+        return view
+
+    # --- Public API (mirrors MotorController) ---
+
+    @property
+    def tick(self) -> int:
+        return self._read().tick
+
+    @property
+    def stopping(self) -> bool:
+        return self._read().stopping
+
+    def add_tick_listener(self, listener):
+        """Register listener(tick, motor_view), called once per observed tick."""
+        with self.lock:
+            self._tick_listeners = self._tick_listeners + [(listener, self.motor.tick)]
+
+    def remove_tick_listener(self, listener):
+        with self.lock:
+            self._tick_listeners = [(l, since) for l, since in self._tick_listeners if l is not listener]
+
+    def wait_for_tick(self, after_tick: int, timeout: float = None) -> int:
+        """Block until the mirror thread has seen a tick later than `after_tick`; returns the current tick."""
+        with self.tick_condition:
+            self._tick_waiters += 1
+            try:
+                self.tick_condition.wait_for(lambda: self.motor.tick > after_tick or not self.running, timeout)
+            finally:
+                self._tick_waiters -= 1
+        return self.motor.tick
+
+    def schedule(self, changes) -> ScheduleHandle:
+        """Queue timestamped setpoint changes in the physics process (see MotorController.schedule)."""
+        view = self._read()
+        entries = resolve_schedule(changes, view.tick, view.dt or self.publish_dt)
+        handle = ScheduleHandle(entries)
+        handle.batch_id = secrets.randbits(63) + 1
+        if entries:
+            # Registered first so a fast completion is never missed
+            with self.lock:
+                self._pending_schedules = self._pending_schedules + [handle]
+            try:
+                # One message, so the batch is queued whole or not at all
+                self._send("schedule", entries=entries, batch=handle.batch_id)
+            except Exception:
+                with self.lock:
+                    self._pending_schedules = [h for h in self._pending_schedules if h is not handle]
+                raise
+            logger.info(f"Scheduled {len(entries)} setpoint change(s) for ticks {handle.first_tick}-{handle.last_tick}")
+        return handle
+
+    def start_motor(self):
+        self._send("start")
+        logger.success("Motor started")
+
+    def stop_motor(self):
+        self._send("stop")
+        logger.warning("Motor stopping (Soft Stop initiated)")
+
+    def set_speed(self, rpm: float):
+        if not self.stopping:
+            self._send("speed", rpm)
+            logger.info(f"Target speed set to {rpm} RPM")
+
+    def set_load(self, nm: float):
+        self._send("load", nm)
+        logger.info(f"Load set to {nm} Nm")
+
+    def build_profile(self, spec, base_dir: str = None) -> WaveformTable:
+        """Validate/precompute locally; the physics process rebuilds it from the spec."""
+        return build_waveform(spec, self.motor.dt or self.publish_dt, base_dir=base_dir)
+
+    def _send_profile(self, target: str, profile):
+        table = profile if isinstance(profile, WaveformTable) else self.build_profile(profile)
+        self._send(f"{target}_profile", spec=table.spec)
+        return table
+
+    def set_speed_profile(self, profile):
+        table = self._send_profile("speed", profile)
+        logger.info(f"Speed profile '{table.spec.get('type')}' started ({table.duration_s:.1f}s)")
+
+    def set_load_profile(self, profile):
+        table = self._send_profile("load", profile)
+        logger.info(f"Load profile '{table.spec.get('type')}' started ({table.duration_s:.1f}s)")
+
+    def clear_profile(self, target: str):
+        self._send(f"{target}_profile", spec=None)
+        logger.info(f"{target.capitalize()} profile cleared")
+
+    def set_motor_profile(self, profile: MotorProfile):
+        """Swap the motor's parameters in the physics process; state carries over."""
+        self.profile = profile
+        self._send("motor_model", spec=asdict(profile))
+        logger.info(f"Motor profile updated (inertia {profile.inertia:.3g}, thermal resistance {profile.thermal_resistance:.3g})")
+
+    def get_status(self):
+        return self._read().snapshot()
+
+    def get_tick_status(self):
+        view = self._read()
+        return view.tick, view.snapshot()
+
+    def get_model_state(self) -> dict:
+        view = self._read()
+        return _model_state(view, view.stopping)
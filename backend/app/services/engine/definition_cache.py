@@ -0,0 +1,197 @@
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+
+CACHE_DIR = os.path.join(os.getcwd(), "cache", "definitions")
+
+# Hits only update last_used/validated_at in memory; the index is written at most this often for them
+INDEX_FLUSH_S = 30.0
+
+
+class DefinitionCache:
+    """
+    Local cache for test definitions downloaded from the `test-files` bucket.
+
+    Blobs are stored content-addressed (`<sha256>.yaml`), with an index
+    mapping storage path -> {hash, version, size, last_used}. A cached entry
+    is revalidated against the bucket's object version (eTag/updated_at)
+    once it is older than `revalidate_after_s`; an unchanged version skips
+    the download entirely. Parsed sequences are kept in memory by hash, so a
+    hit skips the YAML parse as well. Disk usage is bounded by `max_bytes`
+    with least-recently-used eviction. Hits don't rewrite the index; their
+    timestamps are written with the next change, or after `INDEX_FLUSH_S`.
+    """
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = 64 * 1024 * 1024,
+                 revalidate_after_s: float = 30.0, max_parsed: int = 64):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.revalidate_after_s = revalidate_after_s
+        self.max_parsed = max_parsed
+        self._lock = threading.Lock()
+        self._parsed: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"hits": 0, "revalidated": 0, "downloads": 0, "evictions": 0}
+        self._opened = False
+        # Index timestamps changed since the last write
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def _open(self):
+        """Create the cache directory and load the index on first use. Caller holds the lock."""
+        if self._opened:
+            return
+        self._opened = True
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, 'r') as f:
+                    self._index = json.load(f)
+            except Exception as e:
+                print(f"[Cache] Ignoring unreadable index: {e}")
+
+    def get(self, client, storage_path: str) -> Tuple[Dict[str, Any], str]:
+        """Return (parsed definition, content hash) for a storage path."""
+        bucket = client.storage.from_("test-files")
+        now = time.time()
+
+        with self._lock:
+            self._open()
+            entry = self._index.get(storage_path)
+            fresh = entry and now - entry.get("validated_at", 0) < self.revalidate_after_s
+            if fresh and self._blob_exists(entry["hash"]):
+                self.stats["hits"] += 1
+                return self._hit(storage_path, entry, now)
+
+        # Conditional revalidation: compare the remote object version
+        version = self._remote_version(bucket, storage_path)
+        with self._lock:
+            entry = self._index.get(storage_path)
+            if entry and version and entry.get("version") == version and self._blob_exists(entry["hash"]):
+                entry["validated_at"] = now
+                self.stats["revalidated"] += 1
+                return self._hit(storage_path, entry, now)
+
+        print(f"[Cache] Downloading test definition {storage_path}")
+        content = bucket.download(storage_path)
+        digest = hashlib.sha256(content).hexdigest()
+
+        with self._lock:
+            blob_path = self._blob_path(digest)
+            if not os.path.exists(blob_path):
+                self._write_atomic(blob_path, content)
+            self.stats["downloads"] += 1
+            entry = {
+                "hash": digest,
+                "version": version,
+                "size": len(content),
+                "validated_at": now,
+                "last_used": now
+            }
+            self._index[storage_path] = entry
+            result = self._hit(storage_path, entry, now, content)
+            self._evict()
+            return result
+
+    def invalidate(self, storage_path: str):
+        with self._lock:
+            self._open()
+            self._index.pop(storage_path, None)
+            self._save_index()
+
+    def _hit(self, storage_path: str, entry: Dict[str, Any], now: float, content: Optional[bytes] = None):
+        """Caller holds the lock."""
+        entry["last_used"] = now
+        digest = entry["hash"]
+        parsed = self._parsed.get(digest)
+        if parsed is None:
+            if content is None:
+                with open(self._blob_path(digest), 'rb') as f:
+                    content = f.read()
+            parsed = yaml.safe_load(content) or {}
+            self._parsed[digest] = parsed
+            while len(self._parsed) > self.max_parsed:
+                self._parsed.popitem(last=False)
+        else:
+            self._parsed.move_to_end(digest)
+        self._dirty = True
+        if now - self._saved_at >= INDEX_FLUSH_S:
+            self._save_index()
+        # Runners get their own copy; the cached parse stays pristine
+        return copy.deepcopy(parsed), digest
+
+    def _evict(self):
+        """Drop least recently used paths until blobs fit in max_bytes. Caller holds the lock."""
+        blob_sizes = {}
+        for entry in self._index.values():
+            blob_sizes[entry["hash"]] = entry["size"]
+        total = sum(blob_sizes.values())
+
+        for path, entry in sorted(self._index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            del self._index[path]
+            self.stats["evictions"] += 1
+            digest = entry["hash"]
+            if all(e["hash"] != digest for e in self._index.values()):
+                total -= blob_sizes[digest]
+                self._parsed.pop(digest, None)
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+        self._save_index()
+
+    @staticmethod
+    def _remote_version(bucket, storage_path: str) -> Optional[str]:
+        """Object eTag (or update time) from bucket metadata; None if unavailable."""
+        folder, _, name = storage_path.rpartition("/")
+        try:
+            for item in bucket.list(folder, {"search": name}):
+                if item.get("name") == name:
+                    metadata = item.get("metadata") or {}
+                    return metadata.get("eTag") or item.get("updated_at")
+        except Exception as e:
+            print(f"[Cache] Metadata lookup failed for {storage_path}: {e}")
+        return None
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.yaml")
+
+    def _blob_exists(self, digest: str) -> bool:
+        return os.path.exists(self._blob_path(digest))
+
+    def flush(self):
+        """Write timestamps of recent hits to the index."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _save_index(self):
+        """Caller holds the lock."""
+        self._write_atomic(self._index_path, json.dumps(self._index).encode('utf-8'))
+        self._dirty = False
+        self._saved_at = time.time()
+
+    def _write_atomic(self, path: str, data: bytes):
+        # Unique temp name: workers sharing the cache directory never write the same temp file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
@@ -0,0 +1,387 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+# Fallback duration estimate for tests that have never run
+DEFAULT_ESTIMATE_S = 120.0
+# RUNNING jobs are heartbeated by their owning process; silent this long = owner gone
+HEARTBEAT_S = 5.0
+STALE_AFTER_S = 30.0
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+CANCELLED = "CANCELLED"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq           INTEGER PRIMARY KEY AUTOINCREMENT,
+    id            TEXT UNIQUE NOT NULL,
+    source        TEXT NOT NULL,          -- 'local' (configs/ file) or 'cloud' (storage path)
+    filename      TEXT,
+    storage_path  TEXT,
+    db_test_id    TEXT,
+    test_name     TEXT,
+    priority      INTEGER NOT NULL DEFAULT 0,
+    status        TEXT NOT NULL,
+    submitted_at  REAL NOT NULL,
+    started_at    REAL,
+    finished_at   REAL,
+    error         TEXT,
+    owner_pid     INTEGER,                -- process running the job
+    heartbeat_at  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, seq);
+"""
+
+
+class JobQueue:
+    """
+    Persistent, prioritized test job queue backed by SQLite.
+
+    Jobs are dispatched highest priority first (FIFO within a priority), with
+    at most `concurrency` running at once across every worker sharing the DB. `executor(job, register_runner)` runs a
+    job and returns its final status, or `(status, error)` to record why it
+    failed (an exception is recorded as FAIL with its message); it should call
+    `register_runner(runner)` with the TestRunner so the job can be cancelled
+    mid-run.
+    """
+    def __init__(self, db_path: str, executor: Callable[[Dict, Callable], str], concurrency: int = 1):
+        self.db_path = db_path
+        self.executor = executor
+        self.concurrency = max(1, concurrency)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._runners: Dict[str, object] = {}
+        self._thread = None
+        self._stop = False
+
+        self._conn = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """The jobs database, opened (and recovered) on first use rather than at import."""
+        if self._conn is None:
+            with self._open_lock:
+                if self._conn is None:
+                    self._conn = self._open()
+        return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner_pid", "INTEGER"), ("heartbeat_at", "REAL")):
+            if column not in columns:
+                db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._requeue_orphans(db)
+        return db
+
+    @staticmethod
+    def _owner_alive(pid: Optional[int]) -> bool:
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _requeue_orphans(self, db: sqlite3.Connection):
+        """
+        Put RUNNING jobs whose owning process is gone back in line. Jobs owned
+        by live workers (this one or others sharing the DB) are left alone.
+        """
+        now = time.time()
+        requeued = 0
+        for row in db.execute("SELECT id, owner_pid, heartbeat_at FROM jobs WHERE status = ?", (RUNNING,)).fetchall():
+            stale = row["heartbeat_at"] is None or now - row["heartbeat_at"] > STALE_AFTER_S
+            if not stale and self._owner_alive(row["owner_pid"]):
+                continue
+            # Guarded on the owner seen above, so a concurrent heartbeat or claim wins
+            requeued += db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, owner_pid = NULL, heartbeat_at = NULL "
+                "WHERE id = ? AND status = ? AND owner_pid IS ? AND heartbeat_at IS ?",
+                (QUEUED, row["id"], RUNNING, row["owner_pid"], row["heartbeat_at"])
+            ).rowcount
+        if requeued:
+            print(f"[Queue] Re-queued {requeued} job(s) whose worker is gone")
+        # Cancelled while running, but the worker died before finishing it: free its slot
+        db.execute(
+            "UPDATE jobs SET finished_at = ? WHERE status = ? AND finished_at IS NULL AND heartbeat_at < ?",
+            (now, CANCELLED, now - STALE_AFTER_S)
+        )
+
+    def _heartbeat(self):
+        """
+        Refresh this process's RUNNING jobs, and abort those cancelled through
+        another worker (which can only change their status). Caller holds the lock.
+        """
+        ids = list(self._runners)
+        if ids:
+            placeholders = ','.join('?' * len(ids))
+            self._db.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE owner_pid = ? AND id IN ({placeholders})",
+                (time.time(), os.getpid(), *ids)
+            )
+            for row in self._db.execute(
+                f"SELECT id FROM jobs WHERE status = ? AND id IN ({placeholders})", (CANCELLED, *ids)
+            ).fetchall():
+                runner = self._runners.get(row["id"])
+                if runner is not None and not runner.aborted:
+                    print(f"[Queue] Job {row['id']} was cancelled by another worker; aborting")
+                    runner.aborted = True
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._thread.start()
+        print(f"[Queue] Dispatcher started (concurrency={self.concurrency})")
+
+    def stop(self):
+        with self._wakeup:
+            self._stop = True
+            self._wakeup.notify_all()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _dispatch_loop(self):
+        last_sweep = 0.0
+        full = False
+        while True:
+            with self._wakeup:
+                while not self._stop and (full or len(self._runners) >= self.concurrency or not self._has_queued()):
+                    self._wakeup.wait(timeout=HEARTBEAT_S)
+                    full = False
+                    if time.time() - last_sweep >= HEARTBEAT_S:
+                        self._heartbeat()
+                        self._requeue_orphans(self._db)
+                        last_sweep = time.time()
+                if self._stop:
+                    return
+                job = self._claim_next()
+                # Every slot is taken (other workers count too): wait for one to free up
+                full = job is None
+            if job:
+                threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+
+    def _has_queued(self) -> bool:
+        return self._db.execute("SELECT 1 FROM jobs WHERE status = ? LIMIT 1", (QUEUED,)).fetchone() is not None
+
+    def _claim_next(self) -> Optional[Dict]:
+        """
+        Mark the next job RUNNING, owned by this process. Caller holds the lock.
+        Other workers may share the DB, so the concurrency limit counts every
+        RUNNING job, and is checked in the same write transaction as the claim.
+        Returns None when nothing is queued or all slots are taken.
+        """
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            # A cancelled job holds its slot until its worker has wound it down
+            running = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? OR (status = ? AND finished_at IS NULL)", (RUNNING, CANCELLED)
+            ).fetchone()[0]
+            row = None
+            if running < self.concurrency:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, seq LIMIT 1", (QUEUED,)
+                ).fetchone()
+            if row is None:
+                self._db.execute("COMMIT")
+                return None
+            now = time.time()
+            self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner_pid = ?, heartbeat_at = ? WHERE id = ?",
+                (RUNNING, now, os.getpid(), now, row["id"])
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            # e.g. SQLITE_BUSY from another worker; never leave the connection mid-transaction
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            raise
+        self._runners[row["id"]] = None
+        return dict(row, status=RUNNING, started_at=now, owner_pid=os.getpid(), heartbeat_at=now)
+
+    def _run_job(self, job: Dict):
+        def register_runner(runner):
+            with self._lock:
+                self._runners[job["id"]] = runner
+                row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job["id"],)).fetchone()
+                if row and row["status"] == CANCELLED:
+                    runner.aborted = True
+
+        status, error = "FAIL", None
+        try:
+            result = self.executor(job, register_runner)
+            status, error = result if isinstance(result, tuple) else (result, None)
+            status = status or "PASS"
+        except Exception as e:
+            error = str(e)
+            print(f"[Queue] Job {job['id']} failed: {e}")
+        finally:
+            with self._wakeup:
+                self._runners.pop(job["id"], None)
+                current = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job["id"],)).fetchone()
+                if current and current["status"] == CANCELLED:
+                    status = CANCELLED
+                # Only while still ours (it is re-queued if this process was taken for dead)
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ? AND owner_pid = ?",
+                    (status, time.time(), error, job["id"], os.getpid())
+                )
+                self._wakeup.notify_all()
+
+    # --- Public API ---
+
+    def submit(self, jobs: List[Dict]) -> List[Dict]:
+        """
+        Enqueue one or more jobs. Each job needs `source` and either `filename`
+        (local) or `storage_path` (cloud); `priority`, `db_test_id` and
+        `test_name` are optional. Returns the stored jobs.
+        """
+        ids = []
+        now = time.time()
+        with self._wakeup:
+            self._db.execute("BEGIN")
+            for job in jobs:
+                job_id = uuid.uuid4().hex[:12]
+                self._db.execute(
+                    "INSERT INTO jobs (id, source, filename, storage_path, db_test_id, test_name, priority, status, submitted_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, job["source"], job.get("filename"), job.get("storage_path"), job.get("db_test_id"),
+                     job.get("test_name"), int(job.get("priority", 0)), QUEUED, now)
+                )
+                ids.append(job_id)
+            self._db.execute("COMMIT")
+            self._wakeup.notify_all()
+        by_id = {job["id"]: job for job in self.list()}
+        return [by_id.get(job_id) or self.get(job_id) for job_id in ids]
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Cancel a queued job, or abort a running one after its current step. A
+        job running in another worker is aborted by that worker's heartbeat.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == QUEUED:
+                cancelled = self._db.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                    (CANCELLED, time.time(), job_id, QUEUED)
+                ).rowcount
+                if not cancelled:
+                    # Claimed by a worker in the meantime: cancel it as a running job
+                    row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row["status"] == RUNNING:
+                self._db.execute(
+                    "UPDATE jobs SET status = ? WHERE id = ? AND status = ?", (CANCELLED, job_id, RUNNING)
+                )
+                runner = self._runners.get(job_id)
+                if runner is not None:
+                    runner.aborted = True
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """One job; position and ETA only look at running jobs and the queued jobs ahead of it."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job["status"] not in (QUEUED, RUNNING):
+                job["position"] = None
+                return job
+            running = [dict(r) for r in self._db.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY started_at", (RUNNING,)
+            )]
+            queued = []
+            if job["status"] == QUEUED:
+                queued = [dict(r) for r in self._db.execute(
+                    "SELECT * FROM jobs WHERE status = ? AND (priority > ? OR (priority = ? AND seq < ?)) "
+                    "ORDER BY priority DESC, seq", (QUEUED, job["priority"], job["priority"], job["seq"])
+                )] + [job]
+            estimates = self._duration_estimates()
+        self._annotate(running, queued, estimates)
+        return next(j for j in running + queued if j["id"] == job_id)
+
+    def list(self, include_finished: bool = False, limit: int = 100) -> List[Dict]:
+        """Jobs with queue position and ETA (seconds until start/finish)."""
+        with self._lock:
+            running = [dict(r) for r in self._db.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY started_at", (RUNNING,)
+            )]
+            queued = [dict(r) for r in self._db.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY priority DESC, seq", (QUEUED,)
+            )]
+            finished = []
+            if include_finished:
+                finished = [dict(r) for r in self._db.execute(
+                    "SELECT * FROM jobs WHERE status NOT IN (?, ?) ORDER BY seq DESC LIMIT ?", (QUEUED, RUNNING, limit)
+                )]
+            estimates = self._duration_estimates()
+
+        self._annotate(running, queued, estimates)
+        for job in finished:
+            job["position"] = None
+
+        return running + queued + finished
+
+    def _annotate(self, running: List[Dict], queued: List[Dict], estimates: Dict[str, float]):
+        """Set position and ETAs on running jobs and on queued jobs (in dispatch order)."""
+        now = time.time()
+        # Each worker slot frees up when its running job is expected to end
+        slots = []
+        for job in running:
+            remaining = max(0.0, self._estimate(job, estimates) - (now - job["started_at"]))
+            job["position"] = 0
+            job["eta_start_s"] = 0.0
+            job["eta_finish_s"] = remaining
+            slots.append(remaining)
+        slots += [0.0] * max(0, self.concurrency - len(slots))
+
+        for position, job in enumerate(queued, start=1):
+            slots.sort()
+            start = slots[0]
+            finish = start + self._estimate(job, estimates)
+            slots[0] = finish
+            job["position"] = position
+            job["eta_start_s"] = start
+            job["eta_finish_s"] = finish
+
+    def summary(self) -> Dict:
+        with self._lock:
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE status IN (?, ?) GROUP BY status", (QUEUED, RUNNING)
+            ).fetchall())
+        return {"queued": counts.get(QUEUED, 0), "running": counts.get(RUNNING, 0), "concurrency": self.concurrency}
+
+    def _duration_estimates(self) -> Dict[str, float]:
+        """Mean duration of recent finished runs per test. Caller holds the lock."""
+        rows = self._db.execute(
+            "SELECT COALESCE(storage_path, filename) AS test, AVG(finished_at - started_at) AS avg_s "
+            "FROM jobs WHERE status IN ('PASS', 'FAIL') AND started_at IS NOT NULL "
+            "GROUP BY test"
+        ).fetchall()
+        return {row["test"]: row["avg_s"] for row in rows}
+
+    @staticmethod
+    def _estimate(job: Dict, estimates: Dict[str, float]) -> float:
+        return estimates.get(job.get("storage_path") or job.get("filename"), DEFAULT_ESTIMATE_S)
@@ -1,9 +1,10 @@
 import yaml
 import time
+import threading
 import sys
 import os
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any
 
 # Ensure we can import modules
 from app.services.controller.controller import MotorController
@@ -16,8 +17,18 @@ class TestRunner:
         self.aborted = False
         self.builder = ReportBuilder()
         # Global stat trackers
-        self.max_temp = 0.0
+        self.max_temp = None  # None until a monitor step samples
         self.speed_samples = []
+        # Waveform tables prepared for profile steps, keyed by id(step)
+        self.profiles = {}
+        # global_settings: monitor sampling rate (None = every tick) and run deadline
+        self.sample_rate_hz = None
+        self.max_test_time_s = None
+        self.deadline = None
+        # Model-based prediction of the sequence's monitor steps
+        self.prediction = None
+        # Why the last run did not pass (None if it did)
+        self.failure_reason = None
 
     def load_sequence(self, yaml_path: str) -> Dict[str, Any]:
         """Loads and validates the test sequence from YAML."""
@@ -25,23 +36,57 @@ class TestRunner:
             data = yaml.safe_load(f)
         return data
 
-    def run(self, yaml_path: str, db_test_id: str = None, progress_callback=None):
+    def run(self, yaml_path: str, db_test_id: str = None, progress_callback=None) -> str:
         """
-        Main entry point to execute a test.
+        Main entry point to execute a test. Returns the overall status.
         progress_callback: A function(index, total, name) called before each step.
         """
         print(f"--- Loading Test: {yaml_path} ---")
         config = self.load_sequence(yaml_path)
-        
+        base_dir = os.path.dirname(os.path.abspath(yaml_path))
+        return self.run_config(config, base_dir=base_dir, db_test_id=db_test_id, progress_callback=progress_callback)
+
+    def run_config(self, config: Dict[str, Any], base_dir: str = None, db_test_id: str = None, progress_callback=None) -> str:
+        """
+        Execute an already parsed test definition. Returns the overall status.
+        base_dir: directory that relative paths in the sequence (CSV profiles) resolve against.
+        """
         test_info = config.get("test_info", {})
         name = test_info.get("name", "Unnamed Test")
         desc = test_info.get("description", "")
         author = test_info.get("author", "Unknown")
+
+        sequence = config.get("sequence", [])
+        settings = config.get("global_settings") or {}
+        self.sample_rate_hz = settings.get("sample_rate_hz")
+        self.max_test_time_s = settings.get("max_test_time_s")
+
+        # Precompute waveform tables up front so profile steps start instantly
+        self.profiles = {}
+        for step in sequence:
+            if step.get("step") in ("speed_profile", "load_profile"):
+                self.profiles[id(step)] = self.controller.build_profile(step.get("profile", {}), base_dir=base_dir)
         
+        # Opt-in: reject sequences the motor model says cannot pass, before anything runs.
+        # Off by default, since the model ignores setpoint latency, timing drift and injected faults
+        if settings.get("prevalidate", False):
+            self.prediction = self.predict(config)
+            print(f"[Engine] Predicted verdict: {self.prediction['verdict']}")
+            if self.prediction["verdict"] == "FAIL":
+                reasons = [
+                    f"step {m['index'] + 1} ({m.get('description') or 'monitor'}): {', '.join(m['reasons'])}"
+                    for m in self.prediction["monitors"] if m["verdict"] == "FAIL"
+                ]
+                raise ValueError("Sequence cannot pass, rejected before running: " + "; ".join(reasons))
+
         # Start Report
         self.builder.start_test(name, desc, author, db_test_id=db_test_id)
-        
-        sequence = config.get("sequence", [])
+        if self.max_test_time_s:
+            self.deadline = time.monotonic() + float(self.max_test_time_s)
+
+        # Record full-rate telemetry for the whole run
+        recorder = self.builder.start_telemetry()
+        self.controller.add_tick_listener(recorder)
         
         failure_reason = None
         status = "PASS"
@@ -65,6 +110,7 @@ class TestRunner:
                 
                 # Step Timing
                 step_start_iso = datetime.utcnow().isoformat()
+                step_start_tick = self.controller.tick
                 
                 # Execute
                 obs_data = {} # To hold any observed metrics
@@ -86,6 +132,8 @@ class TestRunner:
                         status=step_status,
                         started_at=step_start_iso,
                         ended_at=datetime.utcnow().isoformat(),
+                        start_tick=step_start_tick,
+                        end_tick=self.controller.tick,
                         input_params=step,
                         observed=obs_data,
                         failure_details=fail_details
@@ -103,6 +151,9 @@ class TestRunner:
             failure_reason = str(e)
             
         finally:
+            self.controller.remove_tick_listener(recorder)
+            self.failure_reason = failure_reason
+
             # Calculate final stats
             avg_speed = sum(self.speed_samples) / len(self.speed_samples) if self.speed_samples else 0.0
             stats = {
@@ -111,24 +162,43 @@ class TestRunner:
             }
             self.builder.finish_test(status, failure_reason, stats)
 
+        return status
+
+    def predict(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Predict each monitor step of a definition from the motor model and the current state."""
+        from app.services.motor.operating_map import predict_sequence
+
+        settings = config.get("global_settings") or {}
+        return predict_sequence(
+            self.controller.profile,
+            config.get("sequence", []),
+            self.controller.motor.dt,
+            initial=self.controller.get_model_state(),
+            sample_rate_hz=settings.get("sample_rate_hz")
+        )
+
     def _execute_step(self, step: Dict[str, Any]) -> Dict[str, Any]:
         """Returns observed data if applicable."""
         step_type = step.get("step")
         observed = {}
+        self._check_deadline()
         
         if step_type == "start_motor":
             self.controller.start_motor()
             
         elif step_type == "set_speed":
             rpm = float(step.get("rpm", 0))
-            self.controller.set_speed(rpm)
+            observed = self._apply_setpoint("speed", rpm)
             
         elif step_type == "apply_load":
             load = float(step.get("load_nm", 0))
-            self.controller.set_load(load)
+            observed = self._apply_setpoint("load", load)
             
         elif step_type == "remove_load":
-            self.controller.set_load(0.0)
+            observed = self._apply_setpoint("load", 0.0)
+            
+        elif step_type in ("speed_profile", "load_profile"):
+            observed = self._profile_step(step)
             
         elif step_type == "stop_motor":
             self.controller.stop_motor()
@@ -136,7 +206,7 @@ class TestRunner:
         elif step_type == "wait":
             duration = float(step.get("duration_s", 1.0))
             print(f"  -> Waiting {duration}s...")
-            time.sleep(duration)
+            self._sleep(duration)
             
         elif step_type == "monitor":
             observed = self._monitor_step(step)
@@ -149,51 +219,114 @@ class TestRunner:
             
         return observed
 
+    def _check_deadline(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise RuntimeError(f"Max test time exceeded ({self.max_test_time_s}s)")
+
+    def _sleep(self, duration: float):
+        """Sleep, but never past the test deadline."""
+        if self.deadline is not None and time.monotonic() + duration > self.deadline:
+            time.sleep(max(0.0, self.deadline - time.monotonic()))
+            self._check_deadline()
+        time.sleep(duration)
+
+    def _apply_setpoint(self, command: str, value: float) -> Dict[str, Any]:
+        """Apply a setpoint on the next physics tick and wait until it has landed."""
+        handle = self.controller.schedule([{"command": command, "value": value}])
+        if not handle.wait(timeout=max(1.0, 10 * self.controller.motor.dt)):
+            raise RuntimeError(f"Setpoint '{command}={value}' was not applied (physics loop stalled?)")
+        # The tick the physics loop actually applied it on (later than scheduled if it arrived late)
+        return {"applied_tick": handle.applied_last_tick, "scheduled_tick": handle.last_tick}
+
+    def _profile_step(self, step: Dict[str, Any]) -> Dict[str, Any]:
+        """Start a precomputed profile; optionally wait for it to play out."""
+        table = self.profiles[id(step)]
+        if step.get("step") == "speed_profile":
+            self.controller.set_speed_profile(table)
+        else:
+            self.controller.set_load_profile(table)
+        if step.get("wait", False) and not table.repeat:
+            print(f"  -> Playing profile for {table.duration_s:.1f}s...")
+            self._sleep(table.duration_s)
+        return {"profile_duration_s": table.duration_s}
+
     def _monitor_step(self, step: Dict[str, Any]) -> Dict[str, Any]:
         duration = float(step.get("duration_s", 5.0))
         criteria = step.get("criteria", {})
+        rate_hz = step.get("sample_rate_hz", self.sample_rate_hz)
         
-        print(f"  -> Monitoring for {duration}s... Criteria: {criteria}")
+        # Sample on physics ticks: every tick, or every N ticks for the configured rate
+        dt = self.controller.motor.dt
+        every = max(1, int(round(1.0 / (float(rate_hz) * dt)))) if rate_hz else 1
+        tick = self.controller.tick
+        end_tick = tick + max(1, int(round(duration / dt)))
         
-        start_time = time.time()
+        print(f"  -> Monitoring for {duration}s (every {every} tick(s))... Criteria: {criteria}")
         
         # Local stats for this specific step
         min_speed = float('inf')
         max_speed_local = float('-inf')
         max_temp_local = float('-inf')
-        
-        while time.time() - start_time < duration:
-            status = self.controller.get_status()
-            speed = status["speed_rpm"]
-            temp = status["temperature_c"]
-            
-            # Global tracking
-            self.speed_samples.append(speed)
-            self.max_temp = max(self.max_temp, temp)
-            
-            # Local tracking
-            min_speed = min(min_speed, speed)
-            max_speed_local = max(max_speed_local, speed)
-            max_temp_local = max(max_temp_local, temp)
-            
-            # Check Criteria
-            if "speed_rpm" in criteria:
-                limits = criteria["speed_rpm"]
-                if "min" in limits and speed < limits["min"]:
-                    raise RuntimeError(f"Speed Violation: {speed:.2f} < {limits['min']}")
-                if "max" in limits and speed > limits["max"]:
-                    raise RuntimeError(f"Speed Violation: {speed:.2f} > {limits['max']}")
-            
-            if "temperature_c" in criteria:
-                limits = criteria["temperature_c"]
-                if "max" in limits and temp > limits["max"]:
-                    raise RuntimeError(f"Temp Violation: {temp:.2f} > {limits['max']}")
-            
-            time.sleep(0.1)
-        
-        print("  -> Validation PASSED.")
+        samples = 0
+
+        # The state is captured by a tick listener on the awaited tick itself
+        # (or the first one observed after it), not read after waking up
+        capture_lock = threading.Lock()
+        capture = {"target": None, "sample": None}
+
+        def on_tick(t, motor):
+            with capture_lock:
+                if capture["sample"] is None and capture["target"] is not None and t >= capture["target"]:
+                    capture["sample"] = (t, round(motor.state.speed_rpm, 2), round(motor.state.temperature_c, 2))
+
+        self.controller.add_tick_listener(on_tick)
+        try:
+            while tick < end_tick:
+                self._check_deadline()
+                target = min(tick + every, end_tick)
+                with capture_lock:
+                    capture["target"], capture["sample"] = target, None
+                timeout = (target - tick) * dt + 1.0
+                if self.deadline is not None:
+                    timeout = min(timeout, max(0.0, self.deadline - time.monotonic()))
+
+                new_tick = self.controller.wait_for_tick(target - 1, timeout=timeout)
+                with capture_lock:
+                    sample = capture["sample"]
+                if new_tick < target or sample is None:
+                    self._check_deadline()
+                    raise RuntimeError(f"Physics loop stalled during monitor (tick {new_tick} < {target})")
+                tick, speed, temp = sample
+                samples += 1
+            
+                # Global tracking
+                self.speed_samples.append(speed)
+                self.max_temp = temp if self.max_temp is None else max(self.max_temp, temp)
+            
+                # Local tracking
+                min_speed = min(min_speed, speed)
+                max_speed_local = max(max_speed_local, speed)
+                max_temp_local = max(max_temp_local, temp)
+            
+                # Check Criteria
+                if "speed_rpm" in criteria:
+                    limits = criteria["speed_rpm"]
+                    if "min" in limits and speed < limits["min"]:
+                        raise RuntimeError(f"Speed Violation: {speed:.2f} < {limits['min']}")
+                    if "max" in limits and speed > limits["max"]:
+                        raise RuntimeError(f"Speed Violation: {speed:.2f} > {limits['max']}")
+            
+                if "temperature_c" in criteria:
+                    limits = criteria["temperature_c"]
+                    if "max" in limits and temp > limits["max"]:
+                        raise RuntimeError(f"Temp Violation: {temp:.2f} > {limits['max']}")
+        finally:
+            self.controller.remove_tick_listener(on_tick)
+
+        print(f"  -> Validation PASSED ({samples} samples).")
         
         return {
             "speed_rpm": {"min": min_speed, "max": max_speed_local},
-            "temperature_c": {"max": max_temp_local}
+            "temperature_c": {"max": max_temp_local},
+            "samples": samples
         }
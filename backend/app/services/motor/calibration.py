@@ -0,0 +1,224 @@
+"""
+Fit a MotorProfile to recorded speed, load and temperature traces.
+
+Both model equations (see operating_map.py) are first-order linear systems
+
+    d(speed)/dt = (target - speed) / inertia - load_speed_drop * load
+    d(temp)/dt  = (ambient - temp) / thermal_resistance + load_heat * load + speed_heat * speed
+
+so for a given time constant (inertia, thermal_resistance) the trace is the
+initial-condition decay plus a linear combination of filtered inputs, and the
+remaining coefficients are an ordinary least-squares problem. Calibration
+evaluates a batch of candidate time constants at once: the filtered inputs of
+every candidate come out of one FFT convolution, the per-candidate normal
+equations are solved as one batched `np.linalg.solve`, and the grid is
+narrowed around the best candidate for a few rounds. Fitting is simulation
+error (the model is run open-loop over each trace), not derivative matching,
+so sensor noise does not bias the coefficients.
+
+Traces use the telemetry artifact's columns (t_s, speed_rpm, temperature_c,
+target_speed_rpm, load_nm). Stretches where the motor was stopped (state
+frozen) or speed sat clamped at zero are left out of the fit.
+"""
+import time
+from dataclasses import replace
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .motor_simulator import MotorProfile
+
+TRACE_COLUMNS = ("t_s", "speed_rpm", "temperature_c", "target_speed_rpm", "load_nm")
+
+# Candidate time constants per round, search rounds, and the initial range (s)
+CANDIDATES = 64
+ROUNDS = 4
+TAU_RANGE = (0.05, 5000.0)
+MIN_SEGMENT = 10  # samples
+# Cap on complex FFT elements held per candidate batch
+_FFT_BUDGET = 1 << 23
+
+
+class CalibrationError(ValueError):
+    pass
+
+
+def _segments(t: np.ndarray, active: np.ndarray) -> List[slice]:
+    """Contiguous, evenly sampled runs of active samples."""
+    dt = np.diff(t)
+    period = float(np.median(dt)) if len(dt) else 0.0
+    # A gap in time or an inactive sample ends the run
+    breaks = ~active[1:] | (np.abs(dt - period) > 0.01 * period)
+    out = []
+    start = None
+    for i, brk in enumerate(breaks, start=1):
+        if brk:
+            if start is not None and i - start >= MIN_SEGMENT:
+                out.append(slice(start, i))
+            start = None
+        elif start is None:
+            start = i - 1
+    if start is not None and len(t) - start >= MIN_SEGMENT:
+        out.append(slice(start, len(t)))
+    return out
+
+
+class _Equation:
+    """
+    y' = (fixed - y) / tau + sum(theta_j * free_j), fitted over segments.
+
+    `fixed` is the input whose gain is 1/tau (target speed, ambient); the
+    `free` inputs get least-squares gains.
+    """
+    def __init__(self, name: str, free_names: Sequence[str]):
+        self.name = name
+        self.free_names = list(free_names)
+        self.segments = []  # (y, fixed, free[M, n], period)
+
+    def add(self, y: np.ndarray, fixed: np.ndarray, free: np.ndarray, period: float):
+        self.segments.append((y, fixed, free, period))
+
+    @property
+    def samples(self) -> int:
+        return sum(len(seg[0]) - 1 for seg in self.segments)
+
+    def _normal_equations(self, taus: np.ndarray):
+        """Per-candidate X'X, X'r and r'r, summed over segments."""
+        K, M = len(taus), len(self.free_names)
+        G = np.zeros((K, M, M))
+        g = np.zeros((K, M))
+        rr = np.zeros(K)
+        for y, fixed, free, period in self.segments:
+            n = len(y) - 1
+            size = 1 << int(np.ceil(np.log2(2 * n)))
+            # Zero-order-hold discretization of x' = u - x / tau
+            a = np.exp(-period / taus)
+            b = taus * (1.0 - a)
+            U = np.fft.rfft(np.vstack([fixed[1:], free[:, 1:]]), size)  # (1 + M, F)
+            steps = np.arange(n)
+            batch = max(1, _FFT_BUDGET // ((M + 1) * size))
+            for lo in range(0, K, batch):
+                hi = min(K, lo + batch)
+                kernel = b[lo:hi, None] * a[lo:hi, None] ** steps  # (k, n)
+                H = np.fft.rfft(kernel, size)
+                X = np.fft.irfft(H[:, None, :] * U[None], size)[..., :n]  # (k, 1 + M, n)
+                free_decay = y[0] * a[lo:hi, None] ** (steps + 1)
+                r = y[1:] - free_decay - X[:, 0] / taus[lo:hi, None]
+                Xf = X[:, 1:]
+                G[lo:hi] += np.einsum('kin,kjn->kij', Xf, Xf)
+                g[lo:hi] += np.einsum('kin,kn->ki', Xf, r)
+                rr[lo:hi] += np.einsum('kn,kn->k', r, r)
+        return G, g, rr
+
+    def _solve(self, taus: np.ndarray, excited: np.ndarray):
+        G, g, rr = self._normal_equations(taus)
+        M = len(self.free_names)
+        # Unexcited inputs are pinned at zero gain (callers keep the prior)
+        mask = excited.astype(float)
+        G = G * mask[None, :, None] * mask[None, None, :]
+        g = g * mask[None, :]
+        scale = np.maximum(np.einsum('kii->ki', G).max(axis=1), 1e-300)
+        G = G + (np.eye(M) * np.where(excited, 1e-12, 1.0))[None] * scale[:, None, None]
+        theta = np.linalg.solve(G, g[..., None])[..., 0]
+        sse = np.maximum(rr - np.einsum('ki,ki->k', theta, g), 0.0)
+        return theta, sse
+
+    def fit(self, tau_range=TAU_RANGE, candidates: int = CANDIDATES, rounds: int = ROUNDS) -> Dict:
+        if not self.segments:
+            raise CalibrationError(f"No usable samples for the {self.name} equation")
+        excited = np.array([
+            any(np.any(free[j] != 0) for _, _, free, _ in self.segments)
+            for j in range(len(self.free_names))
+        ])
+        lo, hi = np.log(tau_range[0]), np.log(tau_range[1])
+        evaluated = 0
+        for _ in range(rounds):
+            log_taus = np.linspace(lo, hi, candidates)
+            theta, sse = self._solve(np.exp(log_taus), excited)
+            evaluated += candidates
+            best = int(np.argmin(sse))
+            # Narrow to the neighbouring candidates
+            lo = log_taus[max(best - 1, 0)]
+            hi = log_taus[min(best + 1, candidates - 1)]
+        tau = float(np.exp(log_taus[best]))
+
+        samples = self.samples
+        ys = np.concatenate([seg[0][1:] for seg in self.segments])
+        sst = float(np.sum((ys - ys.mean()) ** 2))
+        rmse = float(np.sqrt(sse[best] / samples))
+        return {
+            "tau": tau,
+            "theta": dict(zip(self.free_names, theta[best].tolist())),
+            "identifiable": dict(zip(self.free_names, excited.tolist())),
+            "rmse": rmse,
+            "r2": (1.0 - float(sse[best]) / sst) if sst > 0 else None,
+            "samples": samples,
+            "segments": len(self.segments),
+            "candidates_evaluated": evaluated,
+        }
+
+
+def calibrate(
+    traces: List[Dict[str, Sequence[float]]],
+    base: MotorProfile,
+    ambient_temp_c: float = 25.0,
+) -> Dict:
+    """
+    Fit inertia, thermal_resistance and the load/speed coefficients of `base`
+    to recorded traces. Ratings (rated_speed_rpm, max_temp_c) are kept.
+
+    Returns {"profile": MotorProfile, "fit": {...}} where "fit" holds the
+    per-equation RMSE, R^2 and sample counts.
+    """
+    started = time.perf_counter()
+    speed_eq = _Equation("speed", ["load_nm"])
+    temp_eq = _Equation("temperature", ["load_nm", "speed_rpm"])
+
+    for index, trace in enumerate(traces):
+        missing = [c for c in TRACE_COLUMNS if c not in trace]
+        if missing:
+            raise CalibrationError(f"Trace {index} is missing columns: {', '.join(missing)}")
+        t, s, T, target, load = (np.asarray(trace[c], dtype=float) for c in TRACE_COLUMNS)
+        if not (len(t) == len(s) == len(T) == len(target) == len(load)):
+            raise CalibrationError(f"Trace {index} has columns of different lengths")
+        if len(t) < MIN_SEGMENT:
+            continue
+
+        # A stopped motor's state is frozen; the model only applies while it runs
+        changed = np.ones(len(t), dtype=bool)
+        changed[1:] = (s[1:] != s[:-1]) | (T[1:] != T[:-1])
+        for seg in _segments(t, changed & (s > 0)):
+            period = float(t[seg][1] - t[seg][0])
+            speed_eq.add(s[seg], target[seg], load[seg][None], period)
+        for seg in _segments(t, changed):
+            period = float(t[seg][1] - t[seg][0])
+            # Speed drives heating; its average over each sample period
+            s_seg = s[seg]
+            s_mid = np.empty_like(s_seg)
+            s_mid[0] = s_seg[0]
+            s_mid[1:] = 0.5 * (s_seg[1:] + s_seg[:-1])
+            ambient = np.full(len(s_seg), ambient_temp_c)
+            temp_eq.add(T[seg], ambient, np.vstack([load[seg], np.abs(s_mid)]), period)
+
+    speed_fit = speed_eq.fit()
+    temp_fit = temp_eq.fit()
+
+    def gain(fit, name, prior, sign=1.0):
+        return sign * fit["theta"][name] if fit["identifiable"][name] else prior
+
+    profile = replace(
+        base,
+        inertia=speed_fit["tau"],
+        load_speed_drop=gain(speed_fit, "load_nm", base.load_speed_drop, -1.0),
+        thermal_resistance=temp_fit["tau"],
+        load_heat=gain(temp_fit, "load_nm", base.load_heat),
+        speed_heat=gain(temp_fit, "speed_rpm", base.speed_heat),
+    )
+    fit = {
+        "ambient_temp_c": ambient_temp_c,
+        "traces": len(traces),
+        "speed": {k: v for k, v in speed_fit.items() if k not in ("tau", "theta")},
+        "temperature": {k: v for k, v in temp_fit.items() if k not in ("tau", "theta")},
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+    return {"profile": profile, "fit": fit}
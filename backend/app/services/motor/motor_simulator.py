@@ -1,6 +1,12 @@
 import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Optional
+
+# Default model coefficients (see update())
+LOAD_SPEED_DROP = 0.1       # d(speed)/dt lost per Nm of load
+LOAD_HEAT = 0.05            # d(temp)/dt per Nm of load
+SPEED_HEAT = 0.002          # d(temp)/dt per rpm
+OVERHEAT_FAULT_HEAT = 2.0   # extra d(temp)/dt while the "overheat" fault is injected
 
 @dataclass
 class MotorProfile:
@@ -8,6 +14,10 @@ class MotorProfile:
     max_temp_c: float
     inertia: float
     thermal_resistance: float
+    # Friction/heat coefficients; calibration.py fits them to recorded traces
+    load_speed_drop: float = LOAD_SPEED_DROP
+    load_heat: float = LOAD_HEAT
+    speed_heat: float = SPEED_HEAT
 
 
 @dataclass
@@ -15,6 +25,12 @@ class MotorInputs:
     target_speed_rpm: float = 0.0
     load_nm: float = 0.0
     ambient_temp_c: float = 25.0
+    # Optional time-varying profiles (WaveformTable); when set they drive
+    # the setpoint above, starting at the given simulation time.
+    speed_profile: Optional[Any] = None
+    speed_profile_t0: float = 0.0
+    load_profile: Optional[Any] = None
+    load_profile_t0: float = 0.0
 
 
 @dataclass
@@ -25,12 +41,41 @@ class MotorState:
     running: bool = False
 
 
+INTEGRATORS = ("euler", "rk4", "adaptive")
+
+
 class MotorSimulator:
-    def __init__(self, profile: MotorProfile, update_dt: float = 0.1):
+    """
+    Digital twin of the motor.
+
+    `update_dt` is the publish period: one `update()` call advances the model
+    by that much time. Internally the model is integrated in sub-steps of
+    `physics_dt` (fixed-step "euler"/"rk4") or with an error-controlled step
+    ("adaptive", Bogacki-Shampine 3(2)), so the physics rate is independent of
+    how often state is published.
+    """
+    def __init__(
+        self,
+        profile: MotorProfile,
+        update_dt: float = 0.1,
+        physics_dt: Optional[float] = None,
+        integrator: str = "euler",
+        rtol: float = 1e-6,
+        atol: float = 1e-6,
+    ):
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator '{integrator}', expected one of {INTEGRATORS}")
         self.profile = profile
         self.inputs = MotorInputs()
         self.state = MotorState(temperature_c=25.0)
         self.dt = update_dt
+        self.integrator = integrator
+        self.substeps = max(1, round(update_dt / physics_dt)) if physics_dt else 1
+        self.physics_dt = update_dt / self.substeps
+        self.rtol = rtol
+        self.atol = atol
+        self._adaptive_h = self.physics_dt
+        self.time_s = 0.0
         self.fault: Optional[str] = None
 
     def start(self):
@@ -38,14 +83,27 @@ class MotorSimulator:
 
     def stop(self):
         self.state.running = False
+        self.inputs.speed_profile = None
         self.inputs.target_speed_rpm = 0.0
 
     def set_target_speed(self, rpm: float):
+        self.inputs.speed_profile = None
         self.inputs.target_speed_rpm = rpm
 
     def set_load(self, load_nm: float):
+        self.inputs.load_profile = None
         self.inputs.load_nm = load_nm
 
+    def set_speed_profile(self, table):
+        """Drive the target speed from a WaveformTable (None clears it)."""
+        self.inputs.speed_profile = table
+        self.inputs.speed_profile_t0 = self.time_s
+
+    def set_load_profile(self, table):
+        """Drive the load from a WaveformTable (None clears it)."""
+        self.inputs.load_profile = table
+        self.inputs.load_profile_t0 = self.time_s
+
     def inject_fault(self, fault_name: str):
         self.fault = fault_name
 
@@ -53,36 +111,146 @@ class MotorSimulator:
         self.fault = None
 
     def update(self):
+        """Advance the model by one publish period (`self.dt`)."""
         if not self.state.running:
             return
 
-        # Speed dynamics
-        speed_error = self.inputs.target_speed_rpm - self.state.speed_rpm
-        accel = speed_error / self.profile.inertia
-        accel -= self.inputs.load_nm * 0.1
-        self.state.speed_rpm += accel * self.dt
+        # Profiles: one table lookup per tick
+        inputs = self.inputs
+        if inputs.speed_profile is not None:
+            t = self.time_s - inputs.speed_profile_t0
+            inputs.target_speed_rpm = inputs.speed_profile.value_at(t)
+            if inputs.speed_profile.finished(t):
+                inputs.speed_profile = None
+        if inputs.load_profile is not None:
+            t = self.time_s - inputs.load_profile_t0
+            inputs.load_nm = inputs.load_profile.value_at(t)
+            if inputs.load_profile.finished(t):
+                inputs.load_profile = None
+        self.time_s += self.dt
+
+        # Inputs are constant over a publish period, so fold them into
+        # per-tick constants once. The model is then:
+        #   d(speed)/dt = speed_bias - speed * inv_inertia
+        #   d(temp)/dt  = heat_bias + |speed| * speed_heat - temp * inv_rth
+        profile = self.profile
+        inv_inertia = 1.0 / profile.inertia
+        inv_rth = 1.0 / profile.thermal_resistance
+        load = self.inputs.load_nm
+        speed_bias = self.inputs.target_speed_rpm * inv_inertia - load * profile.load_speed_drop
+        heat_bias = load * profile.load_heat + self.inputs.ambient_temp_c * inv_rth
+        if self.fault == "overheat":
+            heat_bias += OVERHEAT_FAULT_HEAT
+        speed_heat = profile.speed_heat
+
+        if self.integrator == "adaptive":
+            speed, temp = self._integrate_adaptive(
+                self.state.speed_rpm, self.state.temperature_c,
+                speed_bias, inv_inertia, heat_bias, speed_heat, inv_rth,
+            )
+        else:
+            speed, temp = self._integrate_fixed(
+                self.state.speed_rpm, self.state.temperature_c,
+                speed_bias, inv_inertia, heat_bias, speed_heat, inv_rth,
+            )
 
-        # Clamp speed
-        self.state.speed_rpm = max(0.0, self.state.speed_rpm)
+        self.state.speed_rpm = speed
+        self.state.temperature_c = temp
 
         # Torque approximation
-        self.state.torque_nm = self.inputs.load_nm
+        self.state.torque_nm = load
 
-        # Temperature dynamics
-        heat_generated = abs(self.state.speed_rpm) * 0.002 + self.inputs.load_nm * 0.05
-        heat_dissipated = (
-            (self.state.temperature_c - self.inputs.ambient_temp_c)
-            / self.profile.thermal_resistance
-        )
+        if temp > self.profile.max_temp_c:
+            self.stop()
 
-        self.state.temperature_c += (heat_generated - heat_dissipated) * self.dt
+    def _integrate_fixed(self, s, T, sb, ki, hb, kh, kr):
+        """Fixed-step sub-stepping. Locals only: no allocation per sub-step."""
+        h = self.physics_dt
+        max_temp = self.profile.max_temp_c
+        rk4 = self.integrator == "rk4"
+        h2 = h * 0.5
+        h6 = h / 6.0
 
-        # Fault behavior
-        if self.fault == "overheat":
-            self.state.temperature_c += 2.0 * self.dt
+        for _ in range(self.substeps):
+            if rk4:
+                k1s = sb - s * ki
+                k1t = hb + abs(s) * kh - T * kr
+                s2 = s + h2 * k1s
+                T2 = T + h2 * k1t
+                k2s = sb - s2 * ki
+                k2t = hb + abs(s2) * kh - T2 * kr
+                s3 = s + h2 * k2s
+                T3 = T + h2 * k2t
+                k3s = sb - s3 * ki
+                k3t = hb + abs(s3) * kh - T3 * kr
+                s4 = s + h * k3s
+                T4 = T + h * k3t
+                k4s = sb - s4 * ki
+                k4t = hb + abs(s4) * kh - T4 * kr
+                s = s + h6 * (k1s + 2.0 * (k2s + k3s) + k4s)
+                T = T + h6 * (k1t + 2.0 * (k2t + k3t) + k4t)
+                if s < 0.0:
+                    s = 0.0
+            else:
+                # Semi-implicit Euler: temperature uses the updated speed
+                s += (sb - s * ki) * h
+                if s < 0.0:
+                    s = 0.0
+                T += (hb + abs(s) * kh - T * kr) * h
 
-        if self.state.temperature_c > self.profile.max_temp_c:
-            self.stop()
+            if T > max_temp:
+                break
+        return s, T
+
+    def _integrate_adaptive(self, s, T, sb, ki, hb, kh, kr):
+        """Bogacki-Shampine 3(2) with step-size control over one publish period."""
+        remaining = self.dt
+        h = min(self._adaptive_h, remaining)
+        h_min = self.dt * 1e-6
+        rtol = self.rtol
+        atol = self.atol
+        max_temp = self.profile.max_temp_c
+
+        k1s = sb - s * ki
+        k1t = hb + abs(s) * kh - T * kr
+        while remaining > 0.0:
+            if h > remaining:
+                h = remaining
+            s2 = s + 0.5 * h * k1s
+            T2 = T + 0.5 * h * k1t
+            k2s = sb - s2 * ki
+            k2t = hb + abs(s2) * kh - T2 * kr
+            s3 = s + 0.75 * h * k2s
+            T3 = T + 0.75 * h * k2t
+            k3s = sb - s3 * ki
+            k3t = hb + abs(s3) * kh - T3 * kr
+            sn = s + h * (2.0 * k1s + 3.0 * k2s + 4.0 * k3s) / 9.0
+            Tn = T + h * (2.0 * k1t + 3.0 * k2t + 4.0 * k3t) / 9.0
+            if sn < 0.0:
+                sn = 0.0
+            k4s = sb - sn * ki
+            k4t = hb + abs(sn) * kh - Tn * kr
+
+            # Difference between the 3rd and embedded 2nd order solutions
+            es = h * (-5.0 * k1s + 6.0 * k2s + 8.0 * k3s - 9.0 * k4s) / 72.0
+            et = h * (-5.0 * k1t + 6.0 * k2t + 8.0 * k3t - 9.0 * k4t) / 72.0
+            err = max(
+                abs(es) / (atol + rtol * max(abs(s), abs(sn))),
+                abs(et) / (atol + rtol * max(abs(T), abs(Tn))),
+            )
+
+            if err <= 1.0 or h <= h_min:
+                # Accept (FSAL: k4 is k1 of the next step)
+                s, T = sn, Tn
+                k1s, k1t = k4s, k4t
+                remaining -= h
+                if T > max_temp:
+                    break
+            factor = 5.0 if err == 0.0 else min(5.0, max(0.2, 0.9 * err ** (-1.0 / 3.0)))
+            h = max(h * factor, h_min)
+
+        self._adaptive_h = h
+        return s, T
 
     def snapshot(self) -> dict:
         return {
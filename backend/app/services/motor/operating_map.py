@@ -0,0 +1,370 @@
+"""
+Steady-state operating map and sequence pre-validation.
+
+Between setpoint changes the motor model (see MotorSimulator.update) is a
+linear system with constant inputs, apart from the speed clamp at 0:
+
+    d(speed)/dt = (target - speed) / inertia - load_speed_drop * load
+    d(temp)/dt  = load_heat * load + speed_heat * speed - (temp - ambient) / thermal_resistance
+
+so speed and temperature have closed-form solutions (sums of two
+exponentials). `propagate` evaluates them with numpy for any array of times
+and operating points at once. On top of it:
+
+* `compute_operating_map` - steady-state speed/temperature, settling times
+  and overheat times over a dense (target rpm x load x ambient) grid.
+* `OperatingMapService` - caches maps per profile hash.
+* `predict_sequence` - walks a test sequence through the same model and
+  predicts, per `monitor` step, whether its criteria can pass.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .motor_simulator import MotorProfile
+
+# Settled = within this fraction of the step size (or the absolute floor)
+SETTLE_FRACTION = 0.02
+SETTLE_FLOOR = {"speed_rpm": 1.0, "temperature_c": 0.1}
+
+# The soft stop turns the motor off below this speed (see MotorController._loop)
+STOP_SPEED_RPM = 1.0
+
+# A predicted violation smaller than this is reported MARGINAL, not FAIL
+PREDICTION_MARGIN = {"speed_rpm": 10.0, "temperature_c": 1.0}
+
+
+def _segment(profile: MotorProfile, s0, T0, s_u, heat, t):
+    """Unclamped solution from (s0, T0) toward speed s_u; `heat` = d(temp)/dt terms without speed/temp."""
+    k = 1.0 / profile.inertia
+    r = 1.0 / profile.thermal_resistance
+    e0 = s0 - s_u
+    decay_s = np.exp(-k * t)
+    decay_t = np.exp(-r * t)
+    T_u = (heat + profile.speed_heat * s_u) / r
+    speed = s_u + e0 * decay_s
+    if abs(r - k) < 1e-12:
+        temp = T_u + (T0 - T_u + profile.speed_heat * e0 * t) * decay_t
+    else:
+        C = profile.speed_heat * e0 / (r - k)
+        temp = T_u + (T0 - T_u - C) * decay_t + C * decay_s
+    return speed, temp
+
+
+def propagate(profile: MotorProfile, s0, T0, target, load, ambient, t):
+    """
+    Speed and temperature after `t` seconds of constant inputs, starting from
+    (s0, T0). All arguments broadcast against each other.
+    """
+    s0, T0, target, load, ambient, t = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (s0, T0, target, load, ambient, t))
+    )
+    r = 1.0 / profile.thermal_resistance
+    heat = profile.load_heat * load + ambient * r
+    s_u = target - profile.load_speed_drop * load * profile.inertia
+
+    # Speed heading below 0 is clamped once it reaches 0 (at t_zero)
+    negative = s_u < 0
+    moving = negative & (s0 > 0)
+    ratio = np.where(moving, (s0 - s_u) / np.where(negative, -s_u, 1.0), 1.0)
+    t_zero = np.where(moving, profile.inertia * np.log(ratio), np.where(negative, 0.0, np.inf))
+
+    speed, temp = _segment(profile, s0, T0, s_u, heat, np.minimum(t, t_zero))
+    after = np.maximum(t - t_zero, 0.0)
+    T_rest = heat / r
+    temp_after = T_rest + (temp - T_rest) * np.exp(-r * after)
+    clamped = t > t_zero
+    return np.where(clamped, 0.0, np.maximum(speed, 0.0)), np.where(clamped, temp_after, temp)
+
+
+# --- Operating map ---
+
+def profile_hash(profile: MotorProfile, grid: Dict[str, Any]) -> str:
+    payload = {"profile": asdict(profile), "grid": grid}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def compute_operating_map(profile: MotorProfile, speeds: Sequence[float], loads: Sequence[float],
+                          ambients: Sequence[float], time_points: int = 400, chunk: int = 1024) -> Dict[str, np.ndarray]:
+    """
+    Steady state and settling behaviour (from rest at ambient) for every
+    (target rpm, load, ambient) combination. Arrays are shaped
+    (len(speeds), len(loads), len(ambients)).
+    """
+    target, load, ambient = np.meshgrid(
+        np.asarray(speeds, dtype=np.float64),
+        np.asarray(loads, dtype=np.float64),
+        np.asarray(ambients, dtype=np.float64),
+        indexing="ij"
+    )
+    shape = target.shape
+    target, load, ambient = target.ravel(), load.ravel(), ambient.ravel()
+
+    speed_ss = np.maximum(target - profile.load_speed_drop * load * profile.inertia, 0.0)
+    temp_ss = profile.thermal_resistance * (profile.load_heat * load + profile.speed_heat * speed_ss) + ambient
+
+    # Ten of the slowest time constants is well past any settling time. Times
+    # are spaced geometrically: settling times come out to ~2% resolution.
+    horizon = 10.0 * max(profile.inertia, profile.thermal_resistance)
+    t = np.concatenate(([0.0], np.geomspace(horizon * 1e-3, horizon, time_points - 1)))
+    speed_tol = np.maximum(SETTLE_FRACTION * speed_ss, SETTLE_FLOOR["speed_rpm"])
+    temp_tol = np.maximum(SETTLE_FRACTION * np.abs(temp_ss - ambient), SETTLE_FLOOR["temperature_c"])
+
+    speed_settle = np.empty_like(speed_ss)
+    temp_settle = np.empty_like(temp_ss)
+    overheat_at = np.full_like(temp_ss, np.nan)
+
+    for lo in range(0, target.size, chunk):
+        hi = min(lo + chunk, target.size)
+        column = slice(lo, hi)
+        speed, temp = propagate(
+            profile, 0.0, ambient[column, None], target[column, None], load[column, None], ambient[column, None], t[None, :]
+        )
+        for out, values, final, tol in (
+            (speed_settle, speed, speed_ss, speed_tol),
+            (temp_settle, temp, temp_ss, temp_tol),
+        ):
+            outside = np.abs(values - final[column, None]) > tol[column, None]
+            # Last sample outside the band (+1), or 0 if never outside
+            last = time_points - np.argmax(outside[:, ::-1], axis=1)
+            out[column] = np.where(outside.any(axis=1), t[np.minimum(last, time_points - 1)], 0.0)
+
+        hot = temp > profile.max_temp_c
+        first = np.argmax(hot, axis=1)
+        overheat_at[column] = np.where(hot.any(axis=1), t[first], np.nan)
+
+    return {
+        "speed_rpm": speed_ss.reshape(shape),
+        "temperature_c": temp_ss.reshape(shape),
+        "speed_settle_s": speed_settle.reshape(shape),
+        "temperature_settle_s": temp_settle.reshape(shape),
+        "overheats": (temp_ss > profile.max_temp_c).reshape(shape),
+        "overheat_at_s": overheat_at.reshape(shape),
+    }
+
+
+class OperatingMap:
+    def __init__(self, key: str, profile: MotorProfile, speeds, loads, ambients, values: Dict[str, np.ndarray], compute_ms: float):
+        self.key = key
+        self.profile = profile
+        self.speeds = np.asarray(speeds, dtype=np.float64)
+        self.loads = np.asarray(loads, dtype=np.float64)
+        self.ambients = np.asarray(ambients, dtype=np.float64)
+        self.values = values
+        self.compute_ms = compute_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready map; value arrays are nested [speed][load][ambient], NaN -> None."""
+        def clean(array: np.ndarray):
+            if array.dtype == bool:
+                return array.tolist()
+            rounded = np.round(array, 3)
+            return np.where(np.isnan(rounded), None, rounded).tolist()
+
+        return {
+            "profile_hash": self.key,
+            "profile": asdict(self.profile),
+            "axes": {
+                "target_speed_rpm": self.speeds.tolist(),
+                "load_nm": self.loads.tolist(),
+                "ambient_temp_c": self.ambients.tolist(),
+            },
+            "settle_fraction": SETTLE_FRACTION,
+            "compute_ms": round(self.compute_ms, 2),
+            **{name: clean(array) for name, array in self.values.items()}
+        }
+
+
+class OperatingMapService:
+    """Operating maps computed on demand and cached per profile/grid hash (LRU)."""
+
+    def __init__(self, max_maps: int = 16):
+        self.max_maps = max_maps
+        self._lock = threading.Lock()
+        self._maps: "OrderedDict[str, OperatingMap]" = OrderedDict()
+
+    def get(self, profile: MotorProfile, speed_step: float = 100.0, speed_max: Optional[float] = None,
+            load_step: float = 0.5, load_max: float = 20.0, ambients: Sequence[float] = (15.0, 25.0, 35.0, 45.0)) -> OperatingMap:
+        if speed_step <= 0 or load_step <= 0:
+            raise ValueError("Grid steps must be positive")
+        speed_max = profile.rated_speed_rpm if speed_max is None else speed_max
+        speeds = np.arange(0.0, speed_max + speed_step / 2, speed_step)
+        loads = np.arange(0.0, load_max + load_step / 2, load_step)
+        ambients = sorted(float(a) for a in ambients)
+        grid = {"speeds": [0.0, speed_max, speed_step], "loads": [0.0, load_max, load_step], "ambients": ambients}
+        key = profile_hash(profile, grid)
+
+        with self._lock:
+            cached = self._maps.get(key)
+            if cached is not None:
+                self._maps.move_to_end(key)
+                return cached
+
+        start = time.perf_counter()
+        values = compute_operating_map(profile, speeds, loads, ambients)
+        operating_map = OperatingMap(key, profile, speeds, loads, ambients, values, (time.perf_counter() - start) * 1000)
+
+        with self._lock:
+            self._maps[key] = operating_map
+            while len(self._maps) > self.max_maps:
+                self._maps.popitem(last=False)
+        return operating_map
+
+
+operating_maps = OperatingMapService()
+
+
+# --- Sequence prediction ---
+
+class _Plant:
+    """Model state walked through a sequence, mirroring controller/simulator behaviour."""
+
+    def __init__(self, profile: MotorProfile, dt: float, initial: Dict[str, Any]):
+        self.profile = profile
+        self.dt = dt
+        self.speed = float(initial.get("speed_rpm", 0.0))
+        self.temp = float(initial.get("temperature_c", 25.0))
+        self.running = bool(initial.get("running", False))
+        self.stopping = bool(initial.get("stopping", False))
+        self.target = float(initial.get("target_speed_rpm", 0.0))
+        self.load = float(initial.get("load_nm", 0.0))
+        self.ambient = float(initial.get("ambient_temp_c", 25.0))
+        self.elapsed_s = 0.0
+        self.events: List[Dict[str, Any]] = []
+
+    def trajectory(self, ticks: int):
+        """Speed/temperature at each of the next `ticks` ticks, and advance the state."""
+        if ticks <= 0:
+            return np.empty(0), np.empty(0)
+        if not self.running:
+            self.elapsed_s += ticks * self.dt
+            return np.full(ticks, self.speed), np.full(ticks, self.temp)
+
+        t = np.arange(1, ticks + 1) * self.dt
+        speed, temp = propagate(self.profile, self.speed, self.temp, self.target, self.load, self.ambient, t)
+
+        # The motor switches itself off on overheat, or when a soft stop reaches standstill;
+        # the simulator then holds its state
+        overheat = temp > self.profile.max_temp_c
+        stopped = (speed < STOP_SPEED_RPM) if self.stopping else np.zeros(ticks, dtype=bool)
+        off = overheat | stopped
+        if off.any():
+            i = int(np.argmax(off))
+            speed[i:] = speed[i]
+            temp[i:] = temp[i]
+            self.running = False
+            self.stopping = False
+            self.target = 0.0
+            at = round(self.elapsed_s + t[i], 3)
+            if overheat[i]:
+                self.events.append({"event": "overheat", "at_s": at, "temperature_c": round(float(temp[i]), 2)})
+            else:
+                self.events.append({"event": "stopped", "at_s": at})
+
+        self.speed, self.temp = float(speed[-1]), float(temp[-1])
+        self.elapsed_s += ticks * self.dt
+        return speed, temp
+
+
+def _check(value: float, limit: float, below: bool, margin: float) -> str:
+    """PASS / MARGINAL / FAIL for one predicted extreme against one limit."""
+    excess = (limit - value) if below else (value - limit)
+    if excess > margin:
+        return "FAIL"
+    if excess > -margin:
+        return "MARGINAL"
+    return "PASS"
+
+
+_SEVERITY = {"PASS": 0, "MARGINAL": 1, "UNKNOWN": 2, "FAIL": 3}
+
+
+def predict_sequence(profile: MotorProfile, sequence: List[Dict[str, Any]], dt: float,
+                     initial: Optional[Dict[str, Any]] = None, sample_rate_hz: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Predict every `monitor` step of a sequence from the model alone.
+    Profile (waveform) steps make everything after them UNKNOWN.
+    """
+    plant = _Plant(profile, dt, initial or {})
+    determinate = True
+    monitors = []
+
+    for index, step in enumerate(sequence):
+        step_type = step.get("step")
+
+        if step_type == "start_motor":
+            plant.running = True
+            plant.stopping = False
+        elif step_type == "stop_motor":
+            plant.stopping = True
+            plant.target = 0.0
+        elif step_type == "set_speed":
+            if not plant.stopping:
+                plant.target = float(step.get("rpm", 0))
+        elif step_type == "apply_load":
+            plant.load = float(step.get("load_nm", 0))
+        elif step_type == "remove_load":
+            plant.load = 0.0
+        elif step_type in ("speed_profile", "load_profile"):
+            determinate = False
+            if step.get("wait", False):
+                plant.elapsed_s += float(step.get("profile", {}).get("duration_s", 0.0))
+        elif step_type == "wait":
+            plant.trajectory(int(round(float(step.get("duration_s", 1.0)) / dt)))
+        elif step_type == "monitor":
+            duration = float(step.get("duration_s", 5.0))
+            criteria = step.get("criteria", {}) or {}
+            rate_hz = step.get("sample_rate_hz", sample_rate_hz)
+            every = max(1, int(round(1.0 / (float(rate_hz) * dt)))) if rate_hz else 1
+            ticks = max(1, int(round(duration / dt)))
+            starts_at = plant.elapsed_s
+            speed, temp = plant.trajectory(ticks)
+
+            entry = {"index": index, "description": step.get("description"), "starts_at_s": round(starts_at, 3)}
+            if not determinate:
+                entry.update(verdict="UNKNOWN", reasons=["follows a waveform profile step"])
+                monitors.append(entry)
+                continue
+
+            # The same ticks the runner will sample
+            picks = np.unique(np.append(np.arange(every - 1, ticks, every), ticks - 1))
+            speed, temp = speed[picks], temp[picks]
+            predicted = {
+                "speed_rpm": {"min": round(float(speed.min()), 2), "max": round(float(speed.max()), 2)},
+                "temperature_c": {"min": round(float(temp.min()), 2), "max": round(float(temp.max()), 2)},
+            }
+
+            checks = []
+            for quantity, limits in criteria.items():
+                if quantity not in predicted:
+                    continue
+                margin = PREDICTION_MARGIN[quantity]
+                if "min" in limits:
+                    verdict = _check(predicted[quantity]["min"], float(limits["min"]), True, margin)
+                    checks.append((verdict, f"{quantity} min {predicted[quantity]['min']} vs limit {limits['min']}"))
+                if "max" in limits:
+                    verdict = _check(predicted[quantity]["max"], float(limits["max"]), False, margin)
+                    checks.append((verdict, f"{quantity} max {predicted[quantity]['max']} vs limit {limits['max']}"))
+
+            verdict = max((v for v, _ in checks), key=_SEVERITY.get, default="PASS")
+            entry.update(
+                verdict=verdict,
+                predicted=predicted,
+                reasons=[reason for v, reason in checks if v != "PASS"],
+                setpoint={"target_speed_rpm": plant.target, "load_nm": plant.load}
+            )
+            monitors.append(entry)
+
+    verdict = max((m["verdict"] for m in monitors), key=_SEVERITY.get, default="PASS")
+    return {
+        "verdict": verdict,
+        "predicted_duration_s": round(plant.elapsed_s, 2),
+        "monitors": monitors,
+        "events": plant.events,
+    }
@@ -0,0 +1,90 @@
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, fields
+from typing import Any, Dict, List, Optional
+
+from .motor_simulator import MotorProfile
+
+PROFILE_DIR = os.environ.get("AMT_PROFILE_DIR", os.path.join(os.getcwd(), "data", "profiles"))
+
+_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+_FIELDS = {f.name for f in fields(MotorProfile)}
+
+
+def profile_from_dict(data: Dict[str, Any]) -> MotorProfile:
+    """Build a MotorProfile, ignoring keys it does not know."""
+    return MotorProfile(**{k: float(v) for k, v in data.items() if k in _FIELDS})
+
+
+class ProfileStore:
+    """
+    Named motor profiles on disk, one `<name>.json` per profile holding the
+    profile fields plus how it was obtained (calibration fit, sources).
+    The directory is created on the first save.
+    """
+    def __init__(self, directory: str = PROFILE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid profile name: {name!r}")
+        return os.path.join(self.directory, f"{name}.json")
+
+    def save(self, name: str, profile: MotorProfile, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        path = self._path(name)
+        entry = {
+            "name": name,
+            "profile": asdict(profile),
+            "saved_at": time.time(),
+            **(metadata or {})
+        }
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f, indent=2)
+            os.replace(tmp_path, path)
+        print(f"[Profiles] Saved motor profile '{name}'")
+        return entry
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """The stored entry, or None if there is no such profile."""
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def load(self, name: str) -> MotorProfile:
+        entry = self.get(name)
+        if entry is None:
+            raise KeyError(f"Motor profile not found: {name}")
+        return profile_from_dict(entry["profile"])
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                entries.append(self.get(filename[:-5]))
+            except Exception as e:
+                print(f"[Profiles] Skipping unreadable profile {filename}: {e}")
+        return entries
+
+    def delete(self, name: str) -> bool:
+        path = self._path(name)
+        with self._lock:
+            if not os.path.exists(path):
+                return False
+            os.remove(path)
+        return True
+
+
+profile_store = ProfileStore()
@@ -0,0 +1,194 @@
+import csv
+import io
+import math
+import os
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+WAVEFORM_TYPES = ("ramp", "step", "sine", "pwm", "piecewise", "csv")
+
+# Upper bound on a precomputed table (~14 h at the 50 ms tick, 8 MB)
+MAX_SAMPLES = 1_000_000
+
+
+class WaveformTable:
+    """
+    A setpoint profile precomputed into evenly spaced samples.
+    Evaluating it is an index computation plus (optionally) one linear
+    interpolation, however complex the original profile was.
+    """
+    def __init__(self, samples: array, period_s: float, interpolate: bool = True, repeat: bool = False, spec: Dict = None):
+        if len(samples) == 0:
+            raise ValueError("Waveform has no samples")
+        self.samples = samples
+        self.period_s = period_s
+        self.interpolate = interpolate
+        self.repeat = repeat
+        self.spec = spec or {}
+        self.duration_s = (len(samples) - 1) * period_s
+
+    def value_at(self, t: float) -> float:
+        samples = self.samples
+        last = len(samples) - 1
+        pos = t / self.period_s
+        if self.repeat and last > 0:
+            pos %= last
+        if pos <= 0.0:
+            return samples[0]
+        i = int(pos)
+        if i >= last:
+            return samples[last]
+        if not self.interpolate:
+            return samples[i]
+        frac = pos - i
+        return samples[i] + (samples[i + 1] - samples[i]) * frac
+
+    def finished(self, t: float) -> bool:
+        return not self.repeat and t >= self.duration_s
+
+
+def _sample(fn, duration_s: float, period_s: float) -> array:
+    if not math.isfinite(duration_s) or duration_s < 0:
+        raise ValueError(f"Profile duration must be a finite, non-negative number of seconds, got {duration_s}")
+    n = max(1, int(round(duration_s / period_s)))
+    if n > MAX_SAMPLES:
+        raise ValueError(
+            f"Profile too long: {duration_s:g} s is {n} samples at {period_s:g} s (limit {MAX_SAMPLES})"
+        )
+    return array('d', (fn(i * period_s) for i in range(n + 1)))
+
+
+def _resample_points(points: List[Tuple[float, float]], period_s: float) -> array:
+    """Linear interpolation of (t, v) breakpoints onto the sample grid."""
+    points = sorted((float(t), float(v)) for t, v in points)
+    if not points:
+        raise ValueError("Piecewise profile needs at least one point")
+    times = [p[0] for p in points]
+    values = [p[1] for p in points]
+    t0 = times[0]
+
+    def fn(t):
+        t += t0
+        j = bisect_right(times, t)
+        if j == 0:
+            return values[0]
+        if j >= len(times):
+            return values[-1]
+        ta, tb = times[j - 1], times[j]
+        va, vb = values[j - 1], values[j]
+        return va + (vb - va) * (t - ta) / (tb - ta) if tb > ta else vb
+
+    return _sample(fn, times[-1] - t0, period_s)
+
+
+def _resolve_path(spec: Dict[str, Any], base_dir: Optional[str]) -> str:
+    path = spec["path"]
+    if base_dir and not os.path.isabs(path):
+        path = os.path.join(base_dir, path)
+    return os.path.abspath(path)
+
+
+def _read_csv_points(spec: Dict[str, Any], base_dir: Optional[str]) -> List[Tuple[float, float]]:
+    if "data" in spec:
+        stream = io.StringIO(spec["data"])
+    elif "path" in spec:
+        path = _resolve_path(spec, base_dir)
+        with open(path, 'r', newline='') as f:
+            stream = io.StringIO(f.read())
+    else:
+        raise ValueError("CSV profile needs 'path' or 'data'")
+
+    rows = [row for row in csv.reader(stream) if row]
+    if not rows:
+        raise ValueError("CSV profile is empty")
+
+    # A first row that isn't numeric is a header
+    header = None
+    try:
+        [float(cell) for cell in rows[0]]
+    except ValueError:
+        header = [cell.strip() for cell in rows[0]]
+        rows = rows[1:]
+
+    def column(key):
+        if isinstance(key, str) and not key.isdigit():
+            if header is None or key not in header:
+                raise ValueError(f"CSV column '{key}' not found")
+            return header.index(key)
+        return int(key)
+
+    ti = column(spec.get("time_column", 0))
+    vi = column(spec.get("value_column", 1))
+    points = [(float(row[ti]), float(row[vi])) for row in rows]
+    scale = float(spec.get("scale", 1.0))
+    return [(t, v * scale) for t, v in points]
+
+
+def _frequency(spec: Dict[str, Any]) -> float:
+    frequency = float(spec["frequency_hz"])
+    if not (math.isfinite(frequency) and frequency > 0):
+        raise ValueError(f"frequency_hz must be greater than 0, got {frequency}")
+    return frequency
+
+
+def build_waveform(spec: Dict[str, Any], period_s: float, base_dir: Optional[str] = None) -> WaveformTable:
+    """
+    Precompute a profile spec into a WaveformTable sampled every `period_s`.
+
+    Spec types (all accept `repeat: true`):
+        ramp:      start, end, duration_s
+        step:      before, after, at_s, duration_s
+        sine:      offset, amplitude, frequency_hz, duration_s, phase_deg
+        pwm:       low, high, frequency_hz, duty (0-1), duration_s
+        piecewise: points [[t, value], ...]
+        csv:       path (relative to base_dir) or data, time_column, value_column, scale
+    """
+    kind = spec.get("type")
+    repeat = bool(spec.get("repeat", False))
+    interpolate = True
+
+    if kind == "ramp":
+        start = float(spec.get("start", 0.0))
+        end = float(spec["end"])
+        duration = float(spec["duration_s"])
+        samples = _sample(lambda t: start + (end - start) * min(1.0, t / duration) if duration > 0 else end, duration, period_s)
+
+    elif kind == "step":
+        before = float(spec.get("before", 0.0))
+        after = float(spec["after"])
+        at_s = float(spec.get("at_s", 0.0))
+        duration = float(spec.get("duration_s", at_s))
+        samples = _sample(lambda t: after if t >= at_s else before, max(duration, at_s), period_s)
+        interpolate = False
+
+    elif kind == "sine":
+        offset = float(spec.get("offset", 0.0))
+        amplitude = float(spec["amplitude"])
+        w = 2.0 * math.pi * _frequency(spec)
+        phase = math.radians(float(spec.get("phase_deg", 0.0)))
+        samples = _sample(lambda t: offset + amplitude * math.sin(w * t + phase), float(spec["duration_s"]), period_s)
+
+    elif kind == "pwm":
+        low = float(spec.get("low", 0.0))
+        high = float(spec["high"])
+        cycle = 1.0 / _frequency(spec)
+        duty = float(spec.get("duty", 0.5))
+        if not 0.0 <= duty <= 1.0:
+            raise ValueError("PWM duty must be between 0 and 1")
+        samples = _sample(lambda t: high if (t % cycle) < duty * cycle else low, float(spec["duration_s"]), period_s)
+        interpolate = False
+
+    elif kind == "piecewise":
+        samples = _resample_points(spec["points"], period_s)
+
+    elif kind == "csv":
+        samples = _resample_points(_read_csv_points(spec, base_dir), period_s)
+        if "path" in spec:
+            # Keep the spec self-contained so it can be rebuilt elsewhere
+            spec = dict(spec, path=_resolve_path(spec, base_dir))
+
+    else:
+        raise ValueError(f"Unknown profile type '{kind}', expected one of {WAVEFORM_TYPES}")
+
+    return WaveformTable(samples, period_s, interpolate=interpolate, repeat=repeat, spec=spec)
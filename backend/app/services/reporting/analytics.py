@@ -0,0 +1,241 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+ANALYTICS_DB_PATH = os.environ.get("AMT_ANALYTICS_DB", os.path.join(os.getcwd(), "data", "analytics.db"))
+
+# Durations are histogrammed in log buckets (~5% wide) so percentiles can be
+# merged across days without keeping individual samples.
+BUCKETS_PER_E = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_test_stats (
+    day            TEXT NOT NULL,
+    test_key       TEXT NOT NULL,
+    test_name      TEXT,
+    runs           INTEGER NOT NULL DEFAULT 0,
+    passed         INTEGER NOT NULL DEFAULT 0,
+    failed         INTEGER NOT NULL DEFAULT 0,
+    aborted        INTEGER NOT NULL DEFAULT 0,
+    duration_sum   REAL NOT NULL DEFAULT 0,
+    duration_min   REAL,
+    duration_max   REAL,
+    max_temp_max   REAL,
+    max_temp_sum   REAL NOT NULL DEFAULT 0,
+    max_temp_runs  INTEGER NOT NULL DEFAULT 0,   -- runs that sampled a temperature
+    PRIMARY KEY (day, test_key)
+);
+CREATE TABLE IF NOT EXISTS duration_histogram (
+    day       TEXT NOT NULL,
+    test_key  TEXT NOT NULL,
+    bucket    INTEGER NOT NULL,
+    count     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, test_key, bucket)
+);
+CREATE TABLE IF NOT EXISTS failure_reasons (
+    day       TEXT NOT NULL,
+    test_key  TEXT NOT NULL,
+    reason    TEXT NOT NULL,
+    count     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, test_key, reason)
+);
+"""
+
+
+def _bucket(duration_s: float) -> int:
+    return int(math.floor(math.log(max(duration_s, 1e-3)) * BUCKETS_PER_E))
+
+
+def _bucket_value(bucket: int) -> float:
+    return math.exp((bucket + 0.5) / BUCKETS_PER_E)
+
+
+def normalize_reason(reason: str) -> str:
+    """Group failures that differ only in measured values ('Speed Violation: # < #')."""
+    return re.sub(r"-?\d+(\.\d+)?", "#", reason).strip()[:200]
+
+
+def _percentiles(histogram: Dict[int, int], quantiles=(0.5, 0.9, 0.99)) -> Dict[str, Optional[float]]:
+    total = sum(histogram.values())
+    result = {}
+    for q in quantiles:
+        key = f"p{int(q * 100)}"
+        if total == 0:
+            result[key] = None
+            continue
+        target = q * total
+        seen = 0
+        for bucket in sorted(histogram):
+            seen += histogram[bucket]
+            if seen >= target:
+                result[key] = round(_bucket_value(bucket), 2)
+                break
+    return result
+
+
+class RunAnalytics:
+    """
+    Incrementally maintained aggregates over finished test runs, bucketed by
+    day and test definition. Each finished run is a handful of upserts, and
+    queries read pre-aggregated rows (days x tests), never individual runs.
+    """
+    def __init__(self, db_path: str = ANALYTICS_DB_PATH):
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(daily_test_stats)")}
+        if "max_temp_runs" not in columns:
+            # Older rows counted every run towards the temperature mean
+            self._db.execute("ALTER TABLE daily_test_stats ADD COLUMN max_temp_runs INTEGER NOT NULL DEFAULT 0")
+            self._db.execute("UPDATE daily_test_stats SET max_temp_runs = runs")
+
+    def record_run(self, test_key: str, test_name: str, status: str, ended_at: str,
+                   duration_s: float, max_temperature_c: Optional[float], failure_reason: Optional[str] = None):
+        """Fold one finished run into the daily aggregates (max_temperature_c is None if nothing was sampled)."""
+        day = (ended_at or datetime.utcnow().isoformat())[:10]
+        passed = 1 if status == "PASS" else 0
+        aborted = 1 if status == "ABORTED" else 0
+        failed = 1 - passed - aborted
+
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute(
+                    """
+                    INSERT INTO daily_test_stats
+                        (day, test_key, test_name, runs, passed, failed, aborted,
+                         duration_sum, duration_min, duration_max, max_temp_max, max_temp_sum, max_temp_runs)
+                    VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (day, test_key) DO UPDATE SET
+                        test_name = excluded.test_name,
+                        runs = runs + 1,
+                        passed = passed + excluded.passed,
+                        failed = failed + excluded.failed,
+                        aborted = aborted + excluded.aborted,
+                        duration_sum = duration_sum + excluded.duration_sum,
+                        duration_min = MIN(duration_min, excluded.duration_min),
+                        duration_max = MAX(duration_max, excluded.duration_max),
+                        max_temp_max = COALESCE(MAX(max_temp_max, excluded.max_temp_max), max_temp_max, excluded.max_temp_max),
+                        max_temp_sum = max_temp_sum + excluded.max_temp_sum,
+                        max_temp_runs = max_temp_runs + excluded.max_temp_runs
+                    """,
+                    (day, test_key, test_name, passed, failed, aborted,
+                     duration_s, duration_s, duration_s, max_temperature_c, max_temperature_c or 0.0,
+                     0 if max_temperature_c is None else 1)
+                )
+                self._db.execute(
+                    """
+                    INSERT INTO duration_histogram (day, test_key, bucket, count) VALUES (?, ?, ?, 1)
+                    ON CONFLICT (day, test_key, bucket) DO UPDATE SET count = count + 1
+                    """,
+                    (day, test_key, _bucket(duration_s))
+                )
+                if failure_reason and not passed:
+                    self._db.execute(
+                        """
+                        INSERT INTO failure_reasons (day, test_key, reason, count) VALUES (?, ?, ?, 1)
+                        ON CONFLICT (day, test_key, reason) DO UPDATE SET count = count + 1
+                        """,
+                        (day, test_key, normalize_reason(failure_reason))
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                # e.g. SQLITE_BUSY from another worker; never leave the connection mid-transaction
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                raise
+
+    def query(self, days: int = 30, test_key: Optional[str] = None) -> Dict:
+        """Pass rates, duration percentiles, temperature trends and failure reasons."""
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        where = "day >= ?" + (" AND test_key = ?" if test_key else "")
+        params = (since, test_key) if test_key else (since,)
+
+        with self._lock:
+            stats = [dict(r) for r in self._db.execute(
+                f"SELECT * FROM daily_test_stats WHERE {where} ORDER BY day", params
+            )]
+            hist = [dict(r) for r in self._db.execute(
+                f"SELECT day, test_key, bucket, count FROM duration_histogram WHERE {where}", params
+            )]
+            reasons = [dict(r) for r in self._db.execute(
+                f"SELECT reason, SUM(count) AS count FROM failure_reasons WHERE {where} "
+                "GROUP BY reason ORDER BY count DESC LIMIT 20", params
+            )]
+
+        per_test: Dict[str, Dict] = {}
+        per_day: Dict[str, Dict] = {}
+        for row in stats:
+            for key, group in ((row["test_key"], per_test), (row["day"], per_day)):
+                agg = group.setdefault(key, {
+                    "runs": 0, "passed": 0, "failed": 0, "aborted": 0, "duration_sum": 0.0,
+                    "duration_min": None, "duration_max": None, "max_temp_max": None,
+                    "max_temp_sum": 0.0, "max_temp_runs": 0, "hist": {}, "test_name": row["test_name"]
+                })
+                for field in ("runs", "passed", "failed", "aborted", "duration_sum", "max_temp_sum", "max_temp_runs"):
+                    agg[field] += row[field]
+                agg["duration_min"] = row["duration_min"] if agg["duration_min"] is None else min(agg["duration_min"], row["duration_min"])
+                agg["duration_max"] = row["duration_max"] if agg["duration_max"] is None else max(agg["duration_max"], row["duration_max"])
+                if row["max_temp_max"] is not None:
+                    agg["max_temp_max"] = row["max_temp_max"] if agg["max_temp_max"] is None else max(agg["max_temp_max"], row["max_temp_max"])
+        for row in hist:
+            for key, group in ((row["test_key"], per_test), (row["day"], per_day)):
+                buckets = group[key]["hist"]
+                buckets[row["bucket"]] = buckets.get(row["bucket"], 0) + row["count"]
+
+        def summarize(agg: Dict) -> Dict:
+            runs = agg["runs"] or 1
+            # Bucket midpoints can overshoot the observed range
+            percentiles = {
+                key: None if value is None else min(max(value, agg["duration_min"]), agg["duration_max"])
+                for key, value in _percentiles(agg["hist"]).items()
+            }
+            return {
+                "runs": agg["runs"],
+                "passed": agg["passed"],
+                "failed": agg["failed"],
+                "aborted": agg["aborted"],
+                "pass_rate": round(agg["passed"] / runs, 4),
+                "duration_s": {
+                    "min": agg["duration_min"],
+                    "max": agg["duration_max"],
+                    "mean": round(agg["duration_sum"] / runs, 2),
+                    **percentiles
+                },
+                "max_temperature_c": {
+                    "max": agg["max_temp_max"],
+                    # Only over runs that sampled a temperature
+                    "mean": round(agg["max_temp_sum"] / agg["max_temp_runs"], 2) if agg["max_temp_runs"] else None
+                }
+            }
+
+        return {
+            "range": {"from": since, "days": days},
+            "tests": [
+                {"test_key": key, "test_name": agg["test_name"], **summarize(agg)}
+                for key, agg in sorted(per_test.items(), key=lambda item: -item[1]["runs"])
+            ],
+            "daily": [{"day": day, **summarize(agg)} for day, agg in sorted(per_day.items())],
+            "failure_reasons": reasons
+        }
+
+
+_analytics: Optional[RunAnalytics] = None
+_analytics_lock = threading.Lock()
+
+def get_analytics() -> RunAnalytics:
+    global _analytics
+    if _analytics is None:
+        with _analytics_lock:
+            if _analytics is None:
+                _analytics = RunAnalytics()
+    return _analytics
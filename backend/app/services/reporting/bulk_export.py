@@ -0,0 +1,208 @@
+"""
+Bulk PDF export streamed as a ZIP archive.
+
+Report JSON is fetched by a thread pool, PDFs are rendered in a process pool
+sized to the available cores, and each finished PDF is appended to the ZIP
+and handed to the client straight away. Only a bounded window of reports is
+in flight at any time, so memory does not grow with the size of the export.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .pdf import render_report_pdf
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+PDF_WORKERS = int(os.environ.get("AMT_PDF_WORKERS", "0")) or _available_cores()
+
+# Finished exports kept around for progress queries
+KEEP_FINISHED = 50
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Shared renderer pool, started on first export (spawned: the API process runs threads)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object; the ZIP writer's output is drained after each entry."""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class BulkExport:
+    """One bulk export: the streaming ZIP generator plus its progress counters."""
+
+    def __init__(self, report_paths: List[str], render: Callable[[Dict], bytes] = render_report_pdf,
+                 fetch_workers: int = 8):
+        self.id = uuid.uuid4().hex[:12]
+        self.report_paths = list(report_paths)
+        self.render = render
+        self.fetch_workers = fetch_workers
+        self.status = "PENDING"
+        self.fetched = 0
+        self.rendered = 0
+        self.failed = 0
+        self.bytes_sent = 0
+        self.errors: Dict[str, str] = {}
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def progress(self) -> Dict:
+        with self._lock:
+            done = self.rendered + self.failed
+            elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+            return {
+                "id": self.id,
+                "status": self.status,
+                "total": len(self.report_paths),
+                "fetched": self.fetched,
+                "rendered": self.rendered,
+                "failed": self.failed,
+                "percent": round(100.0 * done / len(self.report_paths), 1) if self.report_paths else 100.0,
+                "bytes_sent": self.bytes_sent,
+                "elapsed_s": round(elapsed, 2),
+                "errors": dict(self.errors)
+            }
+
+    def _export_one(self, client, report_path: str, pool: ProcessPoolExecutor) -> bytes:
+        data = client.storage.from_("test-reports").download(report_path)
+        report_json = json.loads(data)
+        with self._lock:
+            self.fetched += 1
+        return pool.submit(self.render, report_json).result()
+
+    def stream(self, client) -> Iterator[bytes]:
+        """Yield the ZIP archive incrementally, one entry at a time."""
+        self.status = "RUNNING"
+        self.started_at = time.time()
+        pool = get_render_pool()
+        # Enough reports in flight to keep every renderer busy while fetching
+        window = max(2 * PDF_WORKERS, self.fetch_workers)
+        sink = _ChunkSink()
+        names = set()
+        manifest = []
+
+        fetchers = ThreadPoolExecutor(max_workers=min(window, max(1, len(self.report_paths))))
+        pending = {}
+        paths = iter(self.report_paths)
+        try:
+            with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+                while True:
+                    while len(pending) < window:
+                        path = next(paths, None)
+                        if path is None:
+                            break
+                        pending[fetchers.submit(self._export_one, client, path, pool)] = path
+                    if not pending:
+                        break
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = pending.pop(future)
+                        try:
+                            pdf_bytes = future.result()
+                        except Exception as e:
+                            print(f"[PDF Export] {path} failed: {e}")
+                            with self._lock:
+                                self.failed += 1
+                                self.errors[path] = str(e)
+                            manifest.append({"report_path": path, "status": "FAILED", "error": str(e)})
+                            continue
+
+                        name = self._entry_name(path, names)
+                        archive.writestr(name, pdf_bytes)
+                        manifest.append({"report_path": path, "status": "OK", "file": name, "size_bytes": len(pdf_bytes)})
+                        with self._lock:
+                            self.rendered += 1
+                        yield self._emit(sink)
+
+                archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+            yield self._emit(sink)
+            self.status = "COMPLETED" if not self.failed else "COMPLETED_WITH_ERRORS"
+        except GeneratorExit:
+            # Client went away; stop feeding the pools
+            self.status = "CANCELLED"
+            raise
+        except Exception as e:
+            print(f"[PDF Export] Export {self.id} failed: {e}")
+            self.status = "FAILED"
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+            fetchers.shutdown(wait=False, cancel_futures=True)
+            self.finished_at = time.time()
+
+    def _emit(self, sink: _ChunkSink) -> bytes:
+        data = sink.drain()
+        with self._lock:
+            self.bytes_sent += len(data)
+        return data
+
+    @staticmethod
+    def _entry_name(report_path: str, names: set) -> str:
+        base = os.path.basename(report_path)
+        stem = base[:-5] if base.endswith(".json") else base
+        name = f"{stem}.pdf"
+        counter = 1
+        while name in names:
+            counter += 1
+            name = f"{stem}_{counter}.pdf"
+        names.add(name)
+        return name
+
+
+_exports: "OrderedDict[str, BulkExport]" = OrderedDict()
+_exports_lock = threading.Lock()
+
+def register_export(export: BulkExport) -> BulkExport:
+    with _exports_lock:
+        _exports[export.id] = export
+        finished = [key for key, e in _exports.items() if e.finished_at is not None]
+        for key in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del _exports[key]
+    return export
+
+def get_export(export_id: str) -> Optional[BulkExport]:
+    with _exports_lock:
+        return _exports.get(export_id)
@@ -0,0 +1,181 @@
+"""
+Regression comparison of a candidate run against a baseline run.
+
+Steps are aligned by step type (difflib matching, so inserted or removed
+steps don't shift everything after them). For every aligned step the
+telemetry traces are cut to the step window (by tick, like the telemetry
+itself; wall-clock times are only a fallback for older reports), put on step-relative time,
+the candidate is resampled onto the baseline's time grid and compared as
+arrays (RMS / max abs error). Numeric `observed` values are diffed too.
+"""
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+TRACE_COLUMNS = ("speed_rpm", "temperature_c")
+
+DEFAULT_TOLERANCES = {
+    "speed_rpm_rms": 50.0,
+    "temperature_c_rms": 2.0,
+    "duration_s": 5.0,
+}
+
+
+class RunData:
+    """A report plus (optionally) its telemetry columns as numpy arrays."""
+    def __init__(self, name: str, report: Dict[str, Any], telemetry: Optional[Dict[str, np.ndarray]] = None):
+        self.name = name
+        self.report = report
+        self.telemetry = telemetry
+        started = report.get("execution_info", {}).get("started_at")
+        self.t0 = datetime.fromisoformat(started) if started else None
+        artifact = report.get("artifacts", {}).get("telemetry") or {}
+        self.start_tick = artifact.get("start_tick")
+        self.dt = artifact.get("sample_period_s")
+
+    def step_window(self, step: Dict[str, Any]):
+        """(start, end) of a step on the telemetry's time axis (seconds since recording started)."""
+        start_tick, end_tick = step.get("start_tick"), step.get("end_tick")
+        if self.start_tick is not None and self.dt and start_tick is not None and end_tick is not None:
+            # The ticks after start_tick, up to end_tick, are the ones the step's changes can show on
+            return (start_tick + 1 - self.start_tick) * self.dt, (end_tick + 1 - self.start_tick) * self.dt
+        if self.t0 is None or not step.get("started_at") or not step.get("ended_at"):
+            return None
+        start = (datetime.fromisoformat(step["started_at"]) - self.t0).total_seconds()
+        end = (datetime.fromisoformat(step["ended_at"]) - self.t0).total_seconds()
+        return start, end
+
+    def trace(self, window) -> Optional[Dict[str, np.ndarray]]:
+        """Telemetry within a window, with time relative to the window start."""
+        if self.telemetry is None or window is None:
+            return None
+        t = self.telemetry["t_s"]
+        lo, hi = np.searchsorted(t, window, side="left")
+        if hi - lo < 2:
+            return None
+        out = {"t": t[lo:hi] - window[0]}
+        for column in TRACE_COLUMNS:
+            out[column] = self.telemetry[column][lo:hi]
+        return out
+
+
+def _flatten(values: Any, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a nested dict, keyed 'a.b.c'."""
+    flat = {}
+    if isinstance(values, dict):
+        for key, value in values.items():
+            flat.update(_flatten(value, f"{prefix}{key}."))
+    elif isinstance(values, (int, float)) and not isinstance(values, bool):
+        if np.isfinite(values):
+            flat[prefix[:-1]] = float(values)
+    return flat
+
+
+def _compare_traces(base: Dict[str, np.ndarray], cand: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+    # Compare only over the overlapping span of both windows
+    span = min(base["t"][-1], cand["t"][-1])
+    mask = base["t"] <= span
+    grid = base["t"][mask]
+    result = {}
+    for column in TRACE_COLUMNS:
+        resampled = np.interp(grid, cand["t"], cand[column])
+        error = resampled - base[column][mask]
+        result[column] = {
+            "rms": float(np.sqrt(np.mean(error * error))) if error.size else 0.0,
+            "max_abs": float(np.max(np.abs(error))) if error.size else 0.0,
+            "mean": float(np.mean(error)) if error.size else 0.0,
+            "samples": int(error.size),
+        }
+    return result
+
+
+def compare_runs(base: RunData, cand: RunData, tolerances: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Step-by-step comparison with tolerance-based verdicts."""
+    tol = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+    base_steps = base.report.get("steps", [])
+    cand_steps = cand.report.get("steps", [])
+
+    matcher = SequenceMatcher(
+        a=[s.get("step") for s in base_steps],
+        b=[s.get("step") for s in cand_steps],
+        autojunk=False
+    )
+
+    steps = []
+    regressions = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            for i in range(i1, i2):
+                steps.append({"base_index": i, "candidate_index": None, "step": base_steps[i].get("step"), "verdict": "MISSING"})
+            for j in range(j1, j2):
+                steps.append({"base_index": None, "candidate_index": j, "step": cand_steps[j].get("step"), "verdict": "EXTRA"})
+            regressions += (i2 - i1) + (j2 - j1)
+            continue
+
+        for i, j in zip(range(i1, i2), range(j1, j2)):
+            b, c = base_steps[i], cand_steps[j]
+            b_window, c_window = base.step_window(b), cand.step_window(c)
+            reasons = []
+
+            if b.get("status") == "PASS" and c.get("status") != "PASS":
+                reasons.append(f"status {b.get('status')} -> {c.get('status')}")
+
+            duration_delta = None
+            if b_window and c_window:
+                duration_delta = (c_window[1] - c_window[0]) - (b_window[1] - b_window[0])
+                if abs(duration_delta) > tol["duration_s"]:
+                    reasons.append(f"duration changed by {duration_delta:+.2f}s")
+
+            b_obs, c_obs = _flatten(b.get("observed") or {}), _flatten(c.get("observed") or {})
+            observed_deltas = {
+                key: round(c_obs[key] - b_obs[key], 4) for key in b_obs.keys() & c_obs.keys()
+            }
+
+            traces = None
+            b_trace, c_trace = base.trace(b_window), cand.trace(c_window)
+            if b_trace is not None and c_trace is not None:
+                traces = _compare_traces(b_trace, c_trace)
+                for column in TRACE_COLUMNS:
+                    limit = tol[f"{column}_rms"]
+                    if traces[column]["rms"] > limit:
+                        reasons.append(f"{column} RMS {traces[column]['rms']:.2f} > {limit}")
+
+            verdict = "REGRESSION" if reasons else "PASS"
+            regressions += verdict == "REGRESSION"
+            steps.append({
+                "base_index": i,
+                "candidate_index": j,
+                "step": b.get("step"),
+                "description": b.get("description"),
+                "base_status": b.get("status"),
+                "candidate_status": c.get("status"),
+                "duration_delta_s": duration_delta,
+                "observed_deltas": observed_deltas,
+                "traces": traces,
+                "verdict": verdict,
+                "reasons": reasons,
+            })
+
+    base_metrics = _flatten(base.report.get("metrics") or {})
+    cand_metrics = _flatten(cand.report.get("metrics") or {})
+    return {
+        "base": base.name,
+        "candidate": cand.name,
+        "base_result": base.report.get("summary", {}).get("overall_result"),
+        "candidate_result": cand.report.get("summary", {}).get("overall_result"),
+        "telemetry_compared": base.telemetry is not None and cand.telemetry is not None,
+        "tolerances": tol,
+        "metric_deltas": {
+            key: round(cand_metrics[key] - base_metrics[key], 4) for key in base_metrics.keys() & cand_metrics.keys()
+        },
+        "steps": steps,
+        "regressions": regressions,
+        "verdict": "REGRESSION" if regressions else "PASS",
+    }
+
+
+def telemetry_arrays(columns: Dict) -> Dict[str, np.ndarray]:
+    """Wrap TelemetryReader.read_arrays() output without copying."""
+    return {name: np.frombuffer(values, dtype=np.float64) for name, values in columns.items()}
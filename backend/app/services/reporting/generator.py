@@ -1,18 +1,37 @@
 import os
 import json
 import uuid
+from typing import List
 from datetime import datetime
 from .models import TestReport, TestInfo, ExecutionInfo, AppSummary, AppMetrics, StepResult
+from .telemetry import TelemetryRecorder, salvage_part
+from .journal import ReportJournal, scan_journal, compact
+from .analytics import get_analytics
 
 REPORT_DIR = os.path.join(os.getcwd(), "reports")
-if not os.path.exists(REPORT_DIR):
-    os.makedirs(REPORT_DIR)
+JOURNAL_DIR = os.path.join(REPORT_DIR, "journal")
+
+def _telemetry_part_path(test_id: str) -> str:
+    return os.path.join(REPORT_DIR, f"{test_id}.amtc.part")
+
+def _ensure_dir(path: str) -> str:
+    """Create a report directory on first use (not as an import side effect)."""
+    if not os.path.exists(path):
+        os.makedirs(path, exist_ok=True)
+    return path
 
 class ReportBuilder:
+    """
+    Builds a test report incrementally. Step results are appended to an
+    on-disk journal as they complete; only the report header and step
+    counters live in memory (`self.report.steps` stays empty).
+    """
     def __init__(self):
         self.report: TestReport = None
         self.start_time = None
         self.db_test_id = None
+        self.telemetry: TelemetryRecorder = None
+        self.journal: ReportJournal = None
 
     def start_test(self, name: str, description: str, author="Test Engineer", db_test_id: str = None):
         """Initialize a new test report."""
@@ -38,11 +57,29 @@ class ReportBuilder:
             steps=[],
             metrics=AppMetrics()
         )
+
+        # Open the crash-safe journal
+        journal_path = os.path.join(_ensure_dir(JOURNAL_DIR), f"{exec_info.test_id}.ndjson")
+        self.journal = ReportJournal(journal_path)
+        self.journal.append({
+            "type": "start",
+            "report": self._header(),
+            "db_test_id": db_test_id
+        })
         return self.report.execution_info.test_id
 
+    def _header(self) -> dict:
+        return self.report.model_dump(exclude={"steps"})
+
+    def start_telemetry(self) -> TelemetryRecorder:
+        """Create the full-rate telemetry recorder for the current test."""
+        _ensure_dir(REPORT_DIR)
+        self.telemetry = TelemetryRecorder(_telemetry_part_path(self.report.execution_info.test_id))
+        return self.telemetry
+
     def add_step_result(self, result: StepResult):
-        """Add a completed step result."""
-        self.report.steps.append(result)
+        """Journal a completed step result."""
+        self.journal.append({"type": "step", "step": result.model_dump()})
         
         # Update running summary
         if result.status == "PASS":
@@ -66,29 +103,38 @@ class ReportBuilder:
         
         # Update Metrics (if provided)
         if global_stats:
-            self.report.metrics.max_temperature_c = global_stats.get("max_temp", 0.0)
+            self.report.metrics.max_temperature_c = global_stats.get("max_temp")
             self.report.metrics.avg_speed_rpm = global_stats.get("avg_speed", 0.0)
             self.report.metrics.test_duration_s = duration
 
-            # Save to Disk and Upload
+        # Save to Disk and Upload
         return self._save_to_disk()
 
-    def _save_to_disk(self) -> str:
+    def _report_filename(self) -> str:
         # Use simple timestamp: YYYYMMDD_HHMMSS
         timestamp = self.start_time.strftime("%Y%m%d_%H%M%S")
         safe_name = self.report.test_info.name.replace(' ', '_')
-        filename = f"report_{safe_name}_{timestamp}.json"
-        
+        return f"report_{safe_name}_{timestamp}.json"
+
+    def _save_to_disk(self, seal: bool = True) -> str:
+        filename = self._report_filename()
         filepath = os.path.join(REPORT_DIR, filename)
-        
-        json_content = self.report.model_dump_json(indent=2)
-        with open(filepath, 'w') as f:
-            f.write(json_content)
+
+        # Telemetry artifact goes first so the JSON can reference it
+        if self.telemetry:
+            self._save_telemetry(filename.replace('.json', '.amtc'))
+
+        # Seal the journal, then stream it into the final report
+        header = self._header()
+        if seal:
+            self.journal.append({"type": "finish", "report": header})
+        compact(self.journal.path, filepath, header)
             
         print(f"[Report] Saved to {filepath}")
         
         # Upload to Supabase and cleanup on success
-        upload_success = self._upload_to_supabase(filename, json_content)
+        with open(filepath, 'rb') as f:
+            upload_success = self._upload_to_supabase(filename, f.read())
         
         # Delete local file after successful upload
         if upload_success:
@@ -97,10 +143,60 @@ class ReportBuilder:
                 print(f"[Report] Cleaned up local file: {filename}")
             except Exception as e:
                 print(f"[Report] Failed to delete local file: {e}")
+
+        # The compacted report is now the source of truth; the journal lock
+        # is held until it is gone so no other worker recovers it
+        try:
+            os.remove(self.journal.path)
+        except Exception as e:
+            print(f"[Report] Failed to delete journal: {e}")
+        self.journal.close()
+
+        self._record_analytics()
         
         return filename
 
-    def _upload_to_supabase(self, filename: str, content: str) -> bool:
+    def _record_analytics(self):
+        """Fold this run into the cross-run aggregates behind /reports/analytics."""
+        try:
+            info = self.report.execution_info
+            get_analytics().record_run(
+                test_key=self.db_test_id or self.report.test_info.name,
+                test_name=self.report.test_info.name,
+                status=self.report.summary.overall_result,
+                ended_at=info.ended_at,
+                duration_s=info.duration_s,
+                max_temperature_c=self.report.metrics.max_temperature_c,
+                failure_reason=self.report.summary.failure_reason
+            )
+        except Exception as e:
+            print(f"[Report] Failed to update analytics: {e}")
+
+    def _save_telemetry(self, artifact_name: str):
+        """Finalize the telemetry file, upload it and reference it from the report."""
+        artifact = self.telemetry.close()
+        self._publish_telemetry(self.telemetry.writer.path, artifact, artifact_name)
+
+    def _publish_telemetry(self, part_path: str, artifact: dict, artifact_name: str):
+        local_path = os.path.join(REPORT_DIR, artifact_name)
+        os.replace(part_path, local_path)
+        artifact["path"] = artifact_name
+        self.report.artifacts["telemetry"] = artifact
+        print(f"[Report] Telemetry saved to {local_path} ({artifact['rows']} rows, {artifact['size_bytes']} bytes)")
+
+        try:
+            from app.core.supabase import get_supabase
+            client = get_supabase()
+            with open(local_path, 'rb') as f:
+                client.storage.from_("test-reports").upload(
+                    artifact_name, f.read(), {"content-type": "application/octet-stream"}
+                )
+            print(f"[Report] Uploaded {artifact_name} to Supabase Storage")
+            os.remove(local_path)
+        except Exception as e:
+            print(f"[Report] Failed to upload telemetry artifact: {e}")
+
+    def _upload_to_supabase(self, filename: str, content: bytes) -> bool:
         """Upload report to Supabase Storage and insert record in test_runs table.
         Returns True if successful, False otherwise."""
         try:
@@ -108,8 +204,7 @@ class ReportBuilder:
             client = get_supabase()
             
             # 1. Upload JSON as Blob
-            blob = content.encode('utf-8')
-            client.storage.from_("test-reports").upload(filename, blob)
+            client.storage.from_("test-reports").upload(filename, content)
             print(f"[Report] Uploaded {filename} to Supabase Storage")
             
             # 2. Insert Run Record
@@ -132,3 +227,71 @@ class ReportBuilder:
             print(f"[Report] Failed to upload to Supabase: {e}")
             return False
 
+
+
+def recover_partial_reports() -> List[str]:
+    """
+    Rebuild reports from journals left behind by a crashed process.
+    Unfinished runs are closed out as ABORTED with whatever steps were journaled,
+    plus whatever telemetry chunks reached disk. Journals still locked by a live
+    run (in this or another worker) are left alone.
+    Returns the recovered report filenames.
+    """
+    recovered = []
+    if not os.path.exists(JOURNAL_DIR):
+        return recovered
+    for name in sorted(os.listdir(JOURNAL_DIR)):
+        if not name.endswith(".ndjson"):
+            continue
+        path = os.path.join(JOURNAL_DIR, name)
+        journal = ReportJournal.claim(path)
+        if journal is None:
+            continue
+        try:
+            info = scan_journal(path)
+            if info["start"] is None:
+                print(f"[Report] Discarding empty journal: {name}")
+                os.remove(path)
+                journal.close()
+                continue
+
+            builder = ReportBuilder()
+            builder.report = TestReport(**info["start"]["report"])
+            builder.db_test_id = info["start"].get("db_test_id")
+            builder.start_time = datetime.fromisoformat(builder.report.execution_info.started_at)
+            builder.journal = journal
+
+            sealed = info["finish"] is not None
+            if sealed:
+                # Crashed between sealing the journal and compacting it
+                builder.report = TestReport(**info["finish"]["report"])
+            else:
+                builder.report.summary.passed_steps = info["passed"]
+                builder.report.summary.failed_steps = info["failed"]
+                ended_at = info["last_ended_at"] or builder.report.execution_info.started_at
+                duration = (datetime.fromisoformat(ended_at) - builder.start_time).total_seconds()
+                builder.report.execution_info.ended_at = ended_at
+                builder.report.execution_info.duration_s = duration
+                builder.report.execution_info.status = "ABORTED"
+                builder.report.summary.overall_result = "ABORTED"
+                builder.report.summary.failure_reason = "Interrupted: backend stopped before the test finished"
+                builder.report.metrics.test_duration_s = duration
+
+            part_path = _telemetry_part_path(builder.report.execution_info.test_id)
+            if os.path.exists(part_path):
+                try:
+                    artifact = salvage_part(part_path)
+                    builder._publish_telemetry(
+                        part_path, artifact, builder._report_filename().replace('.json', '.amtc')
+                    )
+                except Exception as e:
+                    print(f"[Report] Discarding unreadable telemetry {part_path}: {e}")
+                    os.remove(part_path)
+
+            recovered.append(builder._save_to_disk(seal=not sealed))
+            print(f"[Report] Recovered partial report from journal {name}")
+        except Exception as e:
+            print(f"[Report] Failed to recover journal {name}: {e}")
+        finally:
+            journal.close()
+    return recovered
@@ -0,0 +1,127 @@
+"""
+Append-only NDJSON journal for in-progress test reports.
+
+One record per line:
+    {"type": "start",  "report": {...header without steps...}, "db_test_id": ...}
+    {"type": "step",   "step": {...StepResult...}}
+    {"type": "finish", "report": {...final header...}}
+
+Every record is flushed and fsync'd as it is written, so a crash loses at most
+the step that was executing. `compact` streams the journal into the final
+report JSON without ever holding more than one step in memory.
+
+The writer holds an exclusive flock on the journal until it is removed, so
+recovery (in any worker) only ever claims journals whose owner is gone.
+"""
+import os
+import json
+import fcntl
+from typing import Dict, Iterator, Optional
+
+# Top-level TestReport fields in serialization order; "steps" is streamed.
+HEADER_FIELDS = ("test_info", "execution_info", "summary")
+TRAILER_FIELDS = ("metrics", "artifacts")
+
+
+class ReportJournal:
+    def __init__(self, path: str, _file=None):
+        self.path = path
+        if _file is None:
+            # Lock before the file appears under its final name, so recovery never sees it unlocked
+            tmp_path = path + ".new"
+            _file = open(tmp_path, 'a', encoding='utf-8')
+            fcntl.flock(_file.fileno(), fcntl.LOCK_EX)
+            os.replace(tmp_path, path)
+        self._file = _file
+
+    @classmethod
+    def claim(cls, path: str) -> Optional["ReportJournal"]:
+        """Take over a journal whose writer is gone; None if it is still held or was removed."""
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        if os.fstat(fd).st_nlink == 0:
+            # Finished and removed before we got the lock
+            os.close(fd)
+            return None
+        return cls(path, os.fdopen(fd, 'a', encoding='utf-8'))
+
+    def append(self, record: Dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_journal(path: str) -> Iterator[Dict]:
+    """Yield records in order, ignoring a torn final line left by a crash."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                break
+
+
+def scan_journal(path: str) -> Dict:
+    """
+    Single pass over a journal. Returns the start/finish records plus step
+    counts and the last step end time, without retaining the steps.
+    """
+    info = {"start": None, "finish": None, "passed": 0, "failed": 0, "last_ended_at": None}
+    for record in read_journal(path):
+        kind = record.get("type")
+        if kind == "start":
+            info["start"] = record
+        elif kind == "step":
+            step = record["step"]
+            if step.get("status") == "PASS":
+                info["passed"] += 1
+            else:
+                info["failed"] += 1
+            info["last_ended_at"] = step.get("ended_at") or info["last_ended_at"]
+        elif kind == "finish":
+            info["finish"] = record
+    return info
+
+
+def compact(path: str, out_path: str, final: Optional[Dict] = None):
+    """
+    Stream the journal into a TestReport-shaped JSON file.
+    `final` is the finished report header; defaults to the journal's finish record.
+    """
+    if final is None:
+        final = scan_journal(path)["finish"]["report"]
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write("{\n")
+        for field in HEADER_FIELDS:
+            out.write(f'  "{field}": {json.dumps(final[field])},\n')
+
+        out.write('  "steps": [')
+        first = True
+        for record in read_journal(path):
+            if record.get("type") != "step":
+                continue
+            out.write("\n    " if first else ",\n    ")
+            out.write(json.dumps(record["step"]))
+            first = False
+        out.write("\n  ],\n" if not first else "],\n")
+
+        for i, field in enumerate(TRAILER_FIELDS):
+            sep = ",\n" if i < len(TRAILER_FIELDS) - 1 else "\n"
+            out.write(f'  "{field}": {json.dumps(final.get(field, {}))}{sep}')
+        out.write("}\n")
+    os.replace(tmp_path, out_path)
@@ -21,6 +21,9 @@ class StepResult(BaseModel):
     status: str = "PENDING"
     started_at: str
     ended_at: Optional[str] = None
+    # Controller ticks at the step's start and end (telemetry is sliced by these)
+    start_tick: Optional[int] = None
+    end_tick: Optional[int] = None
     input_params: Dict[str, Any] = Field(default_factory=dict)
     observed: Optional[Dict[str, Any]] = None
     failure_details: Optional[Dict[str, Any]] = None
@@ -32,7 +35,8 @@ class AppSummary(BaseModel):
     failure_reason: Optional[str] = None
 
 class AppMetrics(BaseModel):
-    max_temperature_c: float = 0.0
+    # None when no monitor step sampled the motor
+    max_temperature_c: Optional[float] = None
     avg_speed_rpm: float = 0.0
     test_duration_s: float = 0.0
 
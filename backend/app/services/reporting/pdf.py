@@ -0,0 +1,31 @@
+"""
+PDF rendering of stored report JSON.
+
+Kept free of app imports so it can run in worker processes; jinja2 and
+weasyprint are only loaded by the process that actually renders.
+"""
+import os
+from datetime import datetime
+from typing import Dict
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "../../../templates/report_template.html")
+
+_template = None
+
+
+def render_report_pdf(report_json: Dict) -> bytes:
+    """Render one report to PDF bytes."""
+    global _template
+    from weasyprint import HTML
+
+    # The compiled template is reused across renders in the same process
+    if _template is None:
+        from jinja2 import Template
+        with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+            _template = Template(f.read())
+
+    html_content = _template.render(
+        report=report_json,
+        generation_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
+    return HTML(string=html_content).write_pdf()
@@ -0,0 +1,361 @@
+"""
+Columnar telemetry artifact ("AMTC") for full-rate motor traces.
+
+Layout:
+    MAGIC (8 bytes)
+    chunk 0: column 0 block, column 1 block, ...
+    chunk 1: ...
+    footer (JSON index with the offset/length of every block)
+    footer length (uint32 LE) + TAIL (4 bytes)
+
+Each block is one column of up to `chunk_rows` float64 samples, byte-shuffled
+and zlib-compressed. The footer lets a reader fetch only the blocks that cover
+the requested rows and columns (e.g. through HTTP Range requests).
+"""
+import os
+import json
+import zlib
+import struct
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+MAGIC = b"AMTC\x01\x00\x00\x00"
+TAIL = b"AMTC"
+FORMAT = "amtc/1"
+ITEM_SIZE = 8  # float64
+
+TELEMETRY_COLUMNS = (
+    "t_s",
+    "speed_rpm",
+    "torque_nm",
+    "temperature_c",
+    "target_speed_rpm",
+    "load_nm",
+)
+
+
+def _shuffle(raw: bytes) -> bytes:
+    """Group byte i of every sample together (improves zlib ratio on floats)."""
+    return b"".join(raw[i::ITEM_SIZE] for i in range(ITEM_SIZE))
+
+
+def _unshuffle(shuffled: bytes) -> bytes:
+    n = len(shuffled) // ITEM_SIZE
+    out = bytearray(len(shuffled))
+    for i in range(ITEM_SIZE):
+        out[i::ITEM_SIZE] = shuffled[i * n:(i + 1) * n]
+    return bytes(out)
+
+
+class TelemetryWriter:
+    """
+    Streams rows into an AMTC file, keeping only the current chunk in memory.
+    A chunk is written once it has `chunk_rows` rows or is `flush_after_s`
+    old, so a crash loses at most that much; each chunk is flushed and
+    fsync'd (the fsync off the caller's thread, which is often the tick).
+    """
+
+    def __init__(self, path: str, columns=TELEMETRY_COLUMNS, chunk_rows: int = 4096, flush_after_s: float = 5.0):
+        self.path = path
+        self.columns = tuple(columns)
+        self.chunk_rows = chunk_rows
+        self.flush_after_s = flush_after_s
+        self.rows = 0
+        self.closed = False
+        self._buffers = [array('d') for _ in self.columns]
+        self._chunks: List[Dict] = []
+        self._chunk_started = None
+        self._sync_thread = None
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+
+    def append(self, row):
+        """Append one sample; `row` must follow the column order."""
+        for buf, value in zip(self._buffers, row):
+            buf.append(value)
+        self.rows += 1
+        now = time.monotonic()
+        if self._chunk_started is None:
+            self._chunk_started = now
+        if len(self._buffers[0]) >= self.chunk_rows or now - self._chunk_started >= self.flush_after_s:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        count = len(self._buffers[0])
+        if count == 0:
+            return
+        blocks = []
+        for buf in self._buffers:
+            block = zlib.compress(_shuffle(buf.tobytes()), 6)
+            self._file.write(block)
+            blocks.append([self._offset, len(block)])
+            self._offset += len(block)
+        self._chunks.append({"rows": count, "blocks": blocks})
+        self._buffers = [array('d') for _ in self.columns]
+        self._chunk_started = None
+        self._file.flush()
+        self._wait_sync()
+        self._sync_thread = threading.Thread(target=os.fsync, args=(self._file.fileno(),), daemon=True)
+        self._sync_thread.start()
+
+    def _wait_sync(self):
+        if self._sync_thread is not None:
+            self._sync_thread.join()
+            self._sync_thread = None
+
+    def close(self, meta: Optional[Dict] = None):
+        """Flush the tail chunk and write the footer index."""
+        if self.closed:
+            return
+        self._flush_chunk()
+        self._wait_sync()
+        _write_footer(self._file, self.rows, self.chunk_rows, self.columns, self._chunks, meta)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self.closed = True
+
+
+def _write_footer(f, rows: int, chunk_rows: int, columns, chunks: List[Dict], meta: Optional[Dict]):
+    footer = json.dumps({
+        "format": FORMAT,
+        "rows": rows,
+        "chunk_rows": chunk_rows,
+        "columns": list(columns),
+        "chunks": chunks,
+        "meta": meta or {},
+    }, separators=(",", ":")).encode('utf-8')
+    f.write(footer)
+    f.write(struct.pack("<I", len(footer)) + TAIL)
+
+
+def _next_block(data: memoryview, offset: int, piece: int = 65536):
+    """Decompress the zlib block at `offset`; (raw, length), or (None, 0) if it is torn or invalid."""
+    d = zlib.decompressobj()
+    out = []
+    pos = offset
+    try:
+        while not d.eof and pos < len(data):
+            chunk = data[pos:pos + piece]
+            pos += len(chunk)
+            out.append(d.decompress(chunk))
+    except zlib.error:
+        return None, 0
+    if not d.eof:
+        return None, 0
+    return b"".join(out), pos - offset - len(d.unused_data)
+
+
+def salvage_part(path: str, columns=TELEMETRY_COLUMNS) -> Dict:
+    """
+    Finish an AMTC file left without a footer by a crashed run: rebuild the
+    chunk index by walking the zlib blocks, drop a torn final chunk, and
+    append the footer in place. Returns the artifact descriptor.
+    """
+    with open(path, 'rb') as f:
+        data = memoryview(f.read())
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a telemetry artifact")
+
+    offset = len(MAGIC)
+    chunks, rows, period = [], 0, None
+    while offset < len(data):
+        blocks, counts, pos = [], set(), offset
+        for _ in columns:
+            raw, length = _next_block(data, pos)
+            if raw is None:
+                break
+            if period is None and not blocks and columns[0] == "t_s" and len(raw) >= 2 * ITEM_SIZE:
+                t = array('d')
+                t.frombytes(_unshuffle(raw))
+                period = t[1] - t[0]
+            blocks.append([pos, length])
+            counts.add(len(raw) // ITEM_SIZE)
+            pos += length
+        if len(blocks) < len(columns) or len(counts) != 1:
+            break
+        count = counts.pop()
+        chunks.append({"rows": count, "blocks": blocks})
+        rows += count
+        offset = pos
+    data.release()
+
+    with open(path, 'r+b') as f:
+        f.truncate(offset)
+        f.seek(offset)
+        _write_footer(f, rows, chunks[0]["rows"] if chunks else 0, columns, chunks,
+                      {"sample_period_s": period, "salvaged": True})
+    return {
+        "format": FORMAT,
+        "rows": rows,
+        "columns": list(columns),
+        "sample_period_s": period,
+        "size_bytes": os.path.getsize(path),
+    }
+
+
+class TelemetryRecorder:
+    """
+    Tick listener that records every physics update of a MotorController.
+    Register with `controller.add_tick_listener(recorder)`.
+    """
+
+    def __init__(self, path: str, chunk_rows: int = 4096, flush_after_s: float = 5.0):
+        self.writer = TelemetryWriter(path, TELEMETRY_COLUMNS, chunk_rows, flush_after_s)
+        self.start_tick = None
+        self.dt = None
+
+    def __call__(self, tick: int, motor):
+        if self.start_tick is None:
+            self.start_tick = tick
+            self.dt = motor.dt
+        state = motor.state
+        inputs = motor.inputs
+        self.writer.append((
+            (tick - self.start_tick) * motor.dt,
+            state.speed_rpm,
+            state.torque_nm,
+            state.temperature_c,
+            inputs.target_speed_rpm,
+            inputs.load_nm,
+        ))
+
+    @property
+    def rows(self) -> int:
+        return self.writer.rows
+
+    def close(self) -> Dict:
+        """Finish the file and return the artifact descriptor for the report."""
+        meta = {"sample_period_s": self.dt, "start_tick": self.start_tick}
+        self.writer.close(meta)
+        return {
+            "format": FORMAT,
+            "rows": self.writer.rows,
+            "columns": list(TELEMETRY_COLUMNS),
+            "sample_period_s": self.dt,
+            "start_tick": self.start_tick,
+            "size_bytes": os.path.getsize(self.writer.path),
+        }
+
+
+# --- Reading ---
+
+class BytesSource:
+    """Range source over an in-memory artifact."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read_range(self, offset: int, length: int) -> bytes:
+        return self.data[offset:offset + length]
+
+    def read_tail(self, length: int) -> bytes:
+        return self.data[-length:]
+
+
+class HttpRangeSource:
+    """
+    Range source that fetches only the requested bytes from a URL, over one
+    keep-alive session. A server that ignores Range (200 with the whole body)
+    is read once and then served from memory.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._whole: Optional[bytes] = None
+
+    def _get(self, range_header: str) -> Optional[bytes]:
+        """The ranged body, or None once the whole object has been fetched instead."""
+        res = self.session.get(self.url, headers={"Range": range_header}, timeout=self.timeout)
+        res.raise_for_status()
+        if res.status_code == 206:
+            return res.content
+        if res.status_code == 200:
+            print("[Telemetry] Server ignored Range, reading whole object")
+            self._whole = res.content
+            return None
+        raise ValueError(f"Unexpected status {res.status_code} for a range read")
+
+    def read_range(self, offset: int, length: int) -> bytes:
+        data = None if self._whole is not None else self._get(f"bytes={offset}-{offset + length - 1}")
+        if data is None:
+            data = self._whole[offset:offset + length]
+        if len(data) != length:
+            raise ValueError(f"Short range read at {offset}: {len(data)} of {length} bytes")
+        return data
+
+    def read_tail(self, length: int) -> bytes:
+        data = None if self._whole is not None else self._get(f"bytes=-{length}")
+        return self._whole[-length:] if data is None else data
+
+
+class TelemetryReader:
+    """Reads row/column slices from an AMTC artifact via a range source."""
+
+    def __init__(self, source, tail_guess: int = 16384):
+        self.source = source
+        tail = source.read_tail(tail_guess)
+        if len(tail) < 8 or tail[-4:] != TAIL:
+            raise ValueError("Not a telemetry artifact")
+        footer_len = struct.unpack("<I", tail[-8:-4])[0]
+        if footer_len + 8 <= len(tail):
+            footer = tail[-(footer_len + 8):-8]
+        else:
+            footer = source.read_tail(footer_len + 8)[:-8]
+        self.index = json.loads(footer.decode('utf-8'))
+        self.columns: List[str] = self.index["columns"]
+        self.rows: int = self.index["rows"]
+
+    def read(self, start: int = 0, stop: Optional[int] = None, columns: Optional[List[str]] = None) -> Dict[str, List[float]]:
+        """Return {column: values} for rows [start, stop)."""
+        return {name: values.tolist() for name, values in self.read_arrays(start, stop, columns).items()}
+
+    def read_arrays(self, start: int = 0, stop: Optional[int] = None, columns: Optional[List[str]] = None) -> Dict[str, array]:
+        """Like read(), but returns float64 arrays (zero-copy into numpy via np.frombuffer)."""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        start = max(0, start)
+        columns = columns or self.columns
+        for name in columns:
+            if name not in self.columns:
+                raise KeyError(f"Unknown telemetry column: {name}")
+        col_idx = [self.columns.index(name) for name in columns]
+        out = {name: array('d') for name in columns}
+
+        row0 = 0
+        for chunk in self.index["chunks"]:
+            row1 = row0 + chunk["rows"]
+            if row1 > start and row0 < stop:
+                lo, hi = max(start, row0) - row0, min(stop, row1) - row0
+                for name, idx in zip(columns, col_idx):
+                    offset, length = chunk["blocks"][idx]
+                    raw = _unshuffle(zlib.decompress(self.source.read_range(offset, length)))
+                    values = array('d')
+                    values.frombytes(raw)
+                    out[name].extend(values[lo:hi])
+            if row1 >= stop:
+                break
+            row0 = row1
+
+        return out
+
+
+def open_artifact(client, artifact_path: str) -> TelemetryReader:
+    """Open an artifact in the `test-reports` bucket with range reads, falling back to a full download."""
+    from app.core.local_supabase import SignedUrlsUnsupported
+
+    bucket = client.storage.from_("test-reports")
+    try:
+        signed = bucket.create_signed_url(artifact_path, 60)
+        url = signed.get("signedURL") or signed.get("signedUrl")
+        return TelemetryReader(HttpRangeSource(url))
+    except SignedUrlsUnsupported:
+        pass
+    except Exception as e:
+        print(f"[Telemetry] Range read unavailable for {artifact_path}: {e}")
+    return TelemetryReader(BytesSource(bucket.download(artifact_path)))
@@ -282,10 +282,10 @@ export default function ReportDetailPage({
           <CardContent>
             <p className={cn(
               "text-2xl font-semibold",
-              report.metrics.max_temperature_c > 70 && "text-warning",
-              report.metrics.max_temperature_c > 80 && "text-destructive"
+              (report.metrics.max_temperature_c ?? 0) > 70 && "text-warning",
+              (report.metrics.max_temperature_c ?? 0) > 80 && "text-destructive"
             )}>
-              {report.metrics.max_temperature_c.toFixed(1)}°C
+              {report.metrics.max_temperature_c != null ? `${report.metrics.max_temperature_c.toFixed(1)}°C` : "—"}
             </p>
           </CardContent>
         </Card>
@@ -424,7 +424,7 @@ export default function ReportDetailPage({
           <div className="grid grid-cols-3 gap-4">
             <div>
               <p className="text-xs text-muted-foreground mb-1">Max Temperature</p>
-              <p className="text-xl font-semibold">{report.metrics.max_temperature_c.toFixed(2)}°C</p>
+              <p className="text-xl font-semibold">{report.metrics.max_temperature_c != null ? `${report.metrics.max_temperature_c.toFixed(2)}°C` : "—"}</p>
             </div>
             <div>
               <p className="text-xs text-muted-foreground mb-1">Avg Speed</p>
@@ -42,7 +42,7 @@ export interface TestReport {
         failure_details: any
     }[]
     metrics: {
-        max_temperature_c: number
+        max_temperature_c: number | null
         avg_speed_rpm: number
         test_duration_s: number
     }